@@ -0,0 +1,444 @@
+# cli/commands.py
+# Неінтерактивні команди: python3 main.py <command> ...
+# Важкі модулі (pydantic, pyarrow, lance) імпортуються всередині команд, не при старті.
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+
+# ---------- QUOTE ----------
+
+# argparse dest -> QuoteRequest field (only options that were given are passed on).
+_QUOTE_OPTIONS = (
+    ("trade", "trade_id"),
+    ("preset", "preset_id"),
+    ("area", "area_sqft"),
+    ("waste", "waste_pct"),
+    ("labor", "include_labor"),
+    ("materials", "include_materials"),
+    ("labor_rate", "labor_rate_per_sqft"),
+    ("material_rate", "material_rate_per_sqft"),
+    ("full_service", "full_service_materials"),
+    ("handling_fee", "materials_handling_fee"),
+    ("markup_pct", "materials_markup_pct"),
+    ("manual_total", "manual_total"),
+    ("as_of", "as_of"),
+)
+
+
+def cmd_quote(args: argparse.Namespace) -> int:
+    from pydantic import ValidationError
+
+    from core.calculator import calculate_quote
+    from core.config import load_trades
+    from core.models import QuoteRequest
+
+    fields = {field: getattr(args, dest) for dest, field in _QUOTE_OPTIONS if getattr(args, dest) is not None}
+    if args.manual_total is not None:
+        fields["use_manual_total"] = True
+    try:
+        req = QuoteRequest(**fields)
+        trades = load_trades()
+        preset, trade, result = calculate_quote(trades, req, fixed_point=args.fixed_point)
+    except ValidationError as e:
+        for err in e.errors(include_url=False):
+            print(f"❌ {'.'.join(map(str, err['loc']))}: {err['msg']}")
+        return 2
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 2
+
+    if args.json:
+        print(result.model_dump_json())
+    else:
+        from cli.app import print_breakdown
+
+        include_materials = preset.include_materials if req.include_materials is None else req.include_materials
+        waste = (preset.default_waste_pct if req.waste_pct is None else req.waste_pct) if include_materials else None
+        print_breakdown(trade, preset, result, waste_pct=waste)
+
+    if args.save:
+        from core.history import quote_record
+        from core.plans import get_plan
+        from cli.app import save_quote
+
+        record = quote_record(get_plan(trades, req.trade_id, req.preset_id, req.as_of), req, result, client_name=args.client, job_address=args.address)
+        quote_id = save_quote(record)
+        print(f"✅ Saved to history: quote #{quote_id}", file=sys.stderr if args.json else sys.stdout)
+    return 0
+
+
+def cmd_presets(args: argparse.Namespace) -> int:
+    from core.config import load_trades
+
+    for trade_id, trade in load_trades().items():
+        print(f"{trade_id}: {trade.label} (GST {trade.gst_rate:.2%})")
+        for preset_id, preset in trade.presets.items():
+            print(f"  {preset_id:<20} {preset.label} [{preset.pricing_type.value}]")
+    return 0
+
+
+# ---------- SERVE (stdio) ----------
+
+def cmd_serve(args: argparse.Namespace) -> int:
+    if not args.stdio:
+        print("❌ Only --stdio is supported here; for HTTP run main_server.py")
+        return 2
+
+    from cli.stdio import serve_stdio
+
+    return serve_stdio(sys.stdin.buffer, sys.stdout, fixed_point=args.fixed_point, poll_seconds=args.config_poll)
+
+
+# ---------- HISTORY ----------
+
+def cmd_history(args: argparse.Namespace) -> int:
+    from pydantic import ValidationError
+
+    from core.history import HistoryStore
+    from core.models import HistoryQuery
+
+    try:
+        q = HistoryQuery(
+            client_name=args.client,
+            job_address=args.address,
+            trade_id=args.trade,
+            preset_id=args.preset,
+            pricing_type=args.pricing_type,
+            created_from=args.date_from,
+            created_to=args.date_to,
+            total_min=args.total_min,
+            total_max=args.total_max,
+            limit=args.limit,
+            cursor=args.cursor,
+        )
+    except ValidationError as e:
+        print(f"❌ {e}")
+        return 2
+    page = HistoryStore().query(q)
+
+    if args.json:
+        for item in page.items:
+            print(json.dumps(item, ensure_ascii=False))
+        return 0
+
+    for item in page.items:
+        meta, output = item["meta"], item["output"]
+        print(
+            f"{item['quote_id']:>17}  {meta['created_at']}  "
+            f"{meta['trade_id']}/{meta['preset_id']:<16} {meta['client_name'] or '-':<20} "
+            f"${output['total']:>12,.2f}"
+        )
+    if not page.items:
+        print("(no quotes)")
+    if page.next_cursor is not None:
+        print(f"\nMore: --cursor {page.next_cursor}")
+    return 0
+
+
+def cmd_outcome(args: argparse.Namespace) -> int:
+    from core.history import HistoryStore, OutcomeStore
+
+    if not HistoryStore().count(filter=f"quote_id = {args.quote_id}"):
+        print(f"❌ Quote {args.quote_id} not found")
+        return 2
+    OutcomeStore().record(args.quote_id, args.outcome)
+    print(f"✅ Quote #{args.quote_id}: {args.outcome}")
+    return 0
+
+
+# ---------- REPORT ----------
+
+def cmd_report(args: argparse.Namespace) -> int:
+    from pydantic import ValidationError
+
+    from core.analytics import group_history
+    from core.history import HistoryStore, OutcomeStore
+    from core.models import AnalyticsQuery
+
+    try:
+        q = AnalyticsQuery(
+            by=args.by or ["trade"],
+            client_name=args.client,
+            trade_id=args.trade,
+            preset_id=args.preset,
+            created_from=args.date_from,
+            created_to=args.date_to,
+            limit=args.limit,
+        )
+    except ValidationError as e:
+        print(f"❌ {e}")
+        return 2
+    report = group_history(HistoryStore(), OutcomeStore(), q)
+
+    if args.json:
+        print(report.model_dump_json())
+        return 0
+
+    def line(label: str, row) -> str:
+        per_sqft = "-" if row.avg_price_per_sqft is None else f"${row.avg_price_per_sqft:,.2f}"
+        win_rate = "-" if row.win_rate is None else f"{row.win_rate:.0%}"
+        return f"{label:<36} {row.quotes:>7,} ${row.revenue:>14,.2f} {per_sqft:>10} {row.won:>5}/{row.won + row.lost:<5} {win_rate:>5}"
+
+    print(f"{' / '.join(report.by):<36} {'quotes':>7} {'revenue':>15} {'$/sqft':>10} {'won/decided':>11} {'win':>5}")
+    for row in report.rows:
+        print(line(" / ".join(row.key[name] for name in report.by), row))
+    if not report.rows:
+        print("(no quotes)")
+    print(line("TOTAL", report.totals))
+    return 0
+
+
+# ---------- BULK ----------
+
+def cmd_bulk(args: argparse.Namespace) -> int:
+    from core.bulk import bulk_quote
+
+    try:
+        stats = bulk_quote(
+            args.input,
+            args.output,
+            chunk_rows=args.chunk_rows,
+            workers=args.workers,
+            fixed_point=args.fixed_point,
+        )
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        return 2
+
+    print(
+        f"✅ {stats.rows:,} rows -> {args.output} "
+        f"({stats.errors:,} with errors, {stats.chunks} chunks, "
+        f"{stats.seconds:.1f}s, {stats.rows_per_second:,.0f} rows/s)"
+    )
+    return 0
+
+
+# ---------- RE-PRICE ----------
+
+def cmd_reprice(args: argparse.Namespace) -> int:
+    from pydantic import ValidationError
+
+    from core.history import HistoryStore, OutcomeStore
+    from core.models import RepriceQuery
+    from core.reprice import reprice_options, reprice_to_file
+
+    try:
+        q = RepriceQuery(
+            client_name=args.client,
+            trade_id=args.trade,
+            preset_id=args.preset,
+            created_from=args.date_from,
+            created_to=args.date_to,
+            include_decided=args.all,
+            keep_rates=args.keep_rates,
+            changed_only=not args.all_rows,
+        )
+    except ValidationError as e:
+        print(f"❌ {e}")
+        return 2
+    try:
+        stats = reprice_to_file(
+            args.output,
+            HistoryStore(),
+            chunk_rows=args.chunk_rows,
+            workers=args.workers,
+            fixed_point=args.fixed_point,
+            **reprice_options(q, OutcomeStore()),
+        )
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        return 2
+
+    if args.json:
+        print(json.dumps(stats.as_dict()))
+        return 0
+    print(
+        f"✅ {stats.quotes:,} quotes re-priced -> {args.output} "
+        f"({stats.seconds:.1f}s, {stats.rows_per_second:,.0f} rows/s; {stats.skipped_decided:,} won/lost skipped)"
+    )
+    print(f"   changed: {stats.changed:,} (up {stats.increased:,}, down {stats.decreased:,}), errors: {stats.errors:,}")
+    print(f"   total:   ${stats.old_total:,.2f} -> ${stats.new_total:,.2f} ({stats.delta_total:+,.2f})")
+    print(f"   biggest: +${stats.max_increase:,.2f} / -${abs(stats.max_decrease):,.2f}")
+    if stats.rules:
+        print("   rules:   " + ", ".join(f"{name} {count:,}" for name, count in sorted(stats.rules.items())))
+    return 0
+
+
+# ---------- DOCUMENTS ----------
+
+def cmd_document(args: argparse.Namespace) -> int:
+    from core.history import HistoryStore
+    from core.render import render_quote
+
+    record = HistoryStore().get(args.quote_id)
+    if record is None:
+        print(f"❌ Quote {args.quote_id} not found")
+        return 2
+    document = render_quote(record, args.format)
+    if args.output is None:
+        sys.stdout.write(document)
+        return 0
+    args.output.write_text(document, encoding="utf-8")
+    print(f"✅ Saved: {args.output}")
+    return 0
+
+
+def cmd_export(args: argparse.Namespace) -> int:
+    from pydantic import ValidationError
+
+    from core.history import HistoryStore, history_filter
+    from core.models import ExportQuery, HistoryQuery
+    from core.render import export_documents
+
+    try:
+        q = ExportQuery(
+            format=args.format,
+            client_name=args.client,
+            trade_id=args.trade,
+            preset_id=args.preset,
+            created_from=args.date_from,
+            created_to=args.date_to,
+        )
+    except ValidationError as e:
+        print(f"❌ {e}")
+        return 2
+    try:
+        stats = export_documents(
+            args.output,
+            HistoryStore(),
+            fmt=q.format,
+            filter=history_filter(HistoryQuery(**q.model_dump(exclude={"format"}))),
+            workers=args.workers,
+        )
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        return 2
+
+    print(
+        f"✅ {stats.documents:,} documents -> {args.output} "
+        f"({stats.seconds:.1f}s, {stats.documents_per_second:,.0f} docs/s)"
+    )
+    return 0
+
+
+# ---------- PARSER ----------
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="main.py", description="Trade Quote Builder commands")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("quote", help="price one job from options (no prompts)")
+    p.add_argument("--trade", help="trade id (default: tile)")
+    p.add_argument("--preset", required=True, help="preset id (see: main.py presets)")
+    p.add_argument("--area", type=float, required=True, help="actual area, sqft")
+    p.add_argument("--waste", type=float, help="waste %%")
+    p.add_argument("--labor", action=argparse.BooleanOptionalAction, help="include labor (default: preset)")
+    p.add_argument("--materials", action=argparse.BooleanOptionalAction, help="include materials (default: preset)")
+    p.add_argument("--labor-rate", type=float, help="$/sqft")
+    p.add_argument("--material-rate", type=float, help="$/sqft")
+    p.add_argument("--full-service", action="store_true", default=None, help="full-service materials (handling + markup)")
+    p.add_argument("--handling-fee", type=float, help="$ (full service)")
+    p.add_argument("--markup-pct", type=float, help="%% (full service)")
+    p.add_argument("--manual-total", type=float, help="override the subtotal ($)")
+    p.add_argument("--as-of", help="price with the rates in effect at this ISO date/time (default: now)")
+    p.add_argument("--fixed-point", action="store_true", help="price in integer cents")
+    p.add_argument("--json", action="store_true", help="print the QuoteResult as JSON")
+    p.add_argument("--save", action="store_true", help="save to history")
+    p.add_argument("--client", default="", help="client name (with --save)")
+    p.add_argument("--address", default="", help="job address (with --save)")
+    p.set_defaults(func=cmd_quote)
+
+    p = sub.add_parser("presets", help="list trades and presets")
+    p.set_defaults(func=cmd_presets)
+
+    p = sub.add_parser("serve", help="long-running quote daemon")
+    p.add_argument("--stdio", action="store_true", help="JSONL QuoteRequest lines on stdin -> JSONL results on stdout")
+    p.add_argument("--fixed-point", action="store_true", help="price in integer cents")
+    p.add_argument("--config-poll", type=float, default=2.0, help="seconds between trades.json change checks (0 = never)")
+    p.set_defaults(func=cmd_serve)
+
+    p = sub.add_parser("history", help="search saved quotes (newest first)")
+    p.add_argument("--client", help="exact client name")
+    p.add_argument("--address", help="exact job address")
+    p.add_argument("--trade")
+    p.add_argument("--preset")
+    p.add_argument("--pricing-type", choices=["FLAT_MIN_TOTAL", "MIN_RATE_PER_SQFT", "CUSTOM"])
+    p.add_argument("--from", dest="date_from", help="created at or after (ISO date/time)")
+    p.add_argument("--to", dest="date_to", help="created before (ISO date/time)")
+    p.add_argument("--total-min", type=float)
+    p.add_argument("--total-max", type=float)
+    p.add_argument("--limit", type=int, default=20)
+    p.add_argument("--cursor", type=int, help="value printed after 'More:' on the previous page")
+    p.add_argument("--json", action="store_true", help="print JSON lines instead of a table")
+    p.set_defaults(func=cmd_history)
+
+    p = sub.add_parser("outcome", help="mark a saved quote won / lost (open = undecided again)")
+    p.add_argument("quote_id", type=int)
+    p.add_argument("outcome", choices=["won", "lost", "open"])
+    p.set_defaults(func=cmd_outcome)
+
+    p = sub.add_parser("report", help="revenue, $/sqft and win rate grouped by trade, preset, month, client")
+    p.add_argument("--by", action="append", choices=["trade", "preset", "month", "client"],
+                   help="group by (repeat for several; default: trade)")
+    p.add_argument("--client", help="exact client name")
+    p.add_argument("--trade")
+    p.add_argument("--preset")
+    p.add_argument("--from", dest="date_from", help="created at or after (ISO date/time)")
+    p.add_argument("--to", dest="date_to", help="created before (ISO date/time)")
+    p.add_argument("--limit", type=int, help="top N groups by revenue")
+    p.add_argument("--json", action="store_true", help="print the report as JSON")
+    p.set_defaults(func=cmd_report)
+
+    p = sub.add_parser("bulk", help="price a CSV/Parquet file of jobs into a CSV/Parquet file of quotes")
+    p.add_argument("input", type=Path, help="CSV or Parquet; columns = QuoteRequest fields (+ any of your own)")
+    p.add_argument("output", type=Path, help=".csv or .parquet; input columns + quote_* columns + error")
+    p.add_argument("--chunk-rows", type=int, default=65_536, help="rows priced per chunk (memory bound)")
+    p.add_argument("--workers", type=int, default=0, help="process pool size (0 = price in this process)")
+    p.add_argument("--fixed-point", action="store_true", help="price in integer cents")
+    p.set_defaults(func=cmd_bulk)
+
+    p = sub.add_parser("reprice", help="re-price saved quotes against the current trades.json; write a diff report")
+    p.add_argument("output", type=Path, help=".csv or .parquet; old vs new subtotal/GST/total + rule per quote")
+    p.add_argument("--client", help="exact client name")
+    p.add_argument("--trade")
+    p.add_argument("--preset")
+    p.add_argument("--from", dest="date_from", help="created at or after (ISO date/time)")
+    p.add_argument("--to", dest="date_to", help="created before (ISO date/time)")
+    p.add_argument("--all", action="store_true", help="include won / lost quotes (default: open only)")
+    p.add_argument("--keep-rates", action="store_true", help="keep each quote's saved rates (default: current preset rates)")
+    p.add_argument("--all-rows", action="store_true", help="report unchanged quotes too")
+    p.add_argument("--chunk-rows", type=int, default=65_536, help="quotes priced per chunk (memory bound)")
+    p.add_argument("--workers", type=int, default=0, help="process pool size (0 = price in this process)")
+    p.add_argument("--fixed-point", action="store_true", help="price in integer cents")
+    p.add_argument("--json", action="store_true", help="print the summary as JSON")
+    p.set_defaults(func=cmd_reprice)
+
+    p = sub.add_parser("document", help="render one saved quote as a text / HTML document")
+    p.add_argument("quote_id", type=int)
+    p.add_argument("--format", choices=["txt", "html"], default="txt")
+    p.add_argument("-o", "--output", type=Path, help="write to a file instead of stdout")
+    p.set_defaults(func=cmd_document)
+
+    p = sub.add_parser("export", help="render saved quotes into one .zip of documents (+ index.csv)")
+    p.add_argument("output", type=Path, help=".zip")
+    p.add_argument("--format", choices=["txt", "html"], default="html")
+    p.add_argument("--client", help="exact client name")
+    p.add_argument("--trade")
+    p.add_argument("--preset")
+    p.add_argument("--from", dest="date_from", help="created at or after (ISO date/time)")
+    p.add_argument("--to", dest="date_to", help="created before (ISO date/time)")
+    p.add_argument("--workers", type=int, default=0, help="process pool size (0 = render in this process)")
+    p.set_defaults(func=cmd_export)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
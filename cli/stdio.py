@@ -0,0 +1,78 @@
+# cli/stdio.py
+# `main.py serve --stdio`: один процес на сесію, конфіг завантажений один раз, JSONL in -> JSONL out.
+
+from __future__ import annotations
+
+import json
+import time
+from typing import Any, BinaryIO, Optional, TextIO
+
+from pydantic import ValidationError
+
+from core.calculator import calculate_quote
+from core.config import ConfigSnapshot, ConfigStore
+from core.models import QuoteRequest
+
+
+def _error_line(index: int, ident: Any, status: int, error: Any) -> str:
+    record = {"index": index}
+    if ident is not None:
+        record["id"] = ident
+    record.update(status=status, error=error)
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+def quote_line(snapshot: ConfigSnapshot, index: int, line: bytes, *, fixed_point: bool = False) -> str:
+    """
+    One response line, same shape as POST /api/quote/batch:
+    {"index", "result"} or {"index", "status", "error"}. An "id" in the request
+    object is echoed back so callers can match answers to questions.
+    """
+    try:
+        item = json.loads(line)
+    except ValueError as e:
+        return _error_line(index, None, 400, f"Invalid JSON: {e}")
+
+    ident: Optional[Any] = item.get("id") if isinstance(item, dict) else None
+    try:
+        req = QuoteRequest.model_validate(item)
+        _preset, _trade, result = calculate_quote(snapshot.trades, req, fixed_point=fixed_point)
+    except ValidationError as e:
+        return _error_line(index, ident, 422, json.loads(e.json(include_url=False)))
+    except ValueError as e:
+        return _error_line(index, ident, 400, str(e))
+    except Exception as e:  # e.g. OverflowError on a huge area in fixed point: one bad line, not a dead daemon
+        return _error_line(index, ident, 400, f"Invalid request: {e}")
+
+    head = f'{{"index":{index}'
+    if ident is not None:
+        head += ',"id":' + json.dumps(ident, ensure_ascii=False)
+    return f'{head},"result":{result.model_dump_json()}}}\n'
+
+
+def serve_stdio(
+    stdin: BinaryIO,
+    stdout: TextIO,
+    *,
+    fixed_point: bool = False,
+    poll_seconds: float = 2.0,
+) -> int:
+    """
+    Answers every non-blank stdin line until EOF; each answer is flushed right
+    away. data/trades.json is re-checked at most every `poll_seconds` (between
+    lines), so a long-lived daemon picks up rate changes without a restart.
+    """
+    store = ConfigStore()
+    next_check = time.monotonic() + poll_seconds
+
+    index = 0
+    for line in stdin:
+        if not line.strip():
+            continue
+        if poll_seconds > 0 and time.monotonic() >= next_check:
+            store.reload_if_changed()
+            next_check = time.monotonic() + poll_seconds
+        stdout.write(quote_line(store.snapshot, index, line, fixed_point=fixed_point))
+        stdout.flush()
+        index += 1
+    return 0
@@ -0,0 +1,355 @@
+# core/analytics.py
+# Аналітика по історії: агрегати (виручка, $/sqft, win rate) оновлюються інкрементально + ad-hoc group-by на pyarrow.
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Set, Tuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from .history import HistoryStore, OutcomeStore, appended_since, history_filter
+from .models import AnalyticsQuery, AnalyticsReport, AnalyticsRow, HistoryQuery
+
+DIMENSIONS: Tuple[str, ...] = ("trade", "preset", "month", "client")
+
+# Summed per group; everything in a report is derived from these.
+MEASURES: Tuple[str, ...] = ("quotes", "revenue", "subtotal", "area", "won", "lost", "won_revenue")
+
+# History columns analytics reads (alias -> column); nothing else is scanned.
+HISTORY_COLUMNS: Dict[str, str] = {
+    "quote_id": "quote_id",
+    "created_at": "meta.created_at",
+    "trade_id": "meta.trade_id",
+    "preset_id": "meta.preset_id",
+    "client_name": "meta.client_name",
+    "total": "output.total",
+    "subtotal": "output.subtotal",
+    "area": "output.actual_area_sqft",
+}
+
+NO_CLIENT = "(none)"
+
+
+# ---------- GROUP-BY ----------
+
+def _text(col: Any) -> Any:
+    return pc.fill_null(col, "")
+
+
+def dimension_keys(table: pa.Table, dimension: str) -> Any:
+    """One group key per history row (HISTORY_COLUMNS projection)."""
+    if dimension == "trade":
+        return _text(table.column("trade_id"))
+    if dimension == "preset":
+        return pc.binary_join_element_wise(_text(table.column("trade_id")), _text(table.column("preset_id")), "/")
+    if dimension == "month":
+        return pc.fill_null(pc.strftime(table.column("created_at"), format="%Y-%m"), "")
+    if dimension == "client":
+        client = _text(table.column("client_name"))
+        return pc.if_else(pc.equal(client, ""), NO_CLIENT, client)
+    raise ValueError(f"Unknown dimension: {dimension!r} (use one of {', '.join(DIMENSIONS)})")
+
+
+def _ids(decided: Mapping[int, str], outcome: str) -> pa.Array:
+    return pa.array([q for q, o in decided.items() if o == outcome], pa.int64())
+
+
+def measure_table(table: pa.Table, by: Sequence[str], decided: Mapping[int, str]) -> pa.Table:
+    """History projection -> group key columns + MEASURES, one row per quote."""
+    quote_id = table.column("quote_id")
+    total = pc.fill_null(table.column("total"), 0.0)
+    won = pc.is_in(quote_id, value_set=_ids(decided, "won")) if decided else pa.array(np.zeros(table.num_rows, dtype=bool))
+    lost = pc.is_in(quote_id, value_set=_ids(decided, "lost")) if decided else won
+
+    columns = {name: dimension_keys(table, name) for name in by}
+    columns.update(
+        quotes=pa.array(np.ones(table.num_rows, dtype=np.int64)),
+        revenue=total,
+        subtotal=pc.fill_null(table.column("subtotal"), 0.0),
+        area=pc.fill_null(table.column("area"), 0.0),
+        won=pc.cast(won, pa.int64()),
+        lost=pc.cast(lost, pa.int64()),
+        won_revenue=pc.if_else(won, total, 0.0),
+    )
+    return pa.table(columns)
+
+
+class Aggregates:
+    """
+    Running MEASURES sums per group key. fold() adds a table of measure rows
+    with one vectorized group-by, so its cost is per batch, not per quote.
+    """
+
+    def __init__(self, by: Sequence[str]) -> None:
+        self.by = tuple(by)
+        self.groups: Dict[Tuple[str, ...], List[float]] = {}
+
+    def fold(self, measures: pa.Table) -> None:
+        if not measures.num_rows:
+            return
+        grouped = measures.group_by(list(self.by)).aggregate([(m, "sum") for m in MEASURES])
+        keys = zip(*(grouped.column(name).to_pylist() for name in self.by))
+        sums = list(zip(*(grouped.column(m + "_sum").to_pylist() for m in MEASURES)))
+        for key, values in zip(keys, sums):
+            acc = self.groups.get(key)
+            if acc is None:
+                acc = self.groups[key] = [0.0] * len(MEASURES)
+            for i, value in enumerate(values):
+                acc[i] += value
+
+    def report(self, *, limit: Optional[int] = None) -> AnalyticsReport:
+        """Groups by revenue, highest first (ties by key), plus grand totals."""
+        items = sorted(self.groups.items(), key=lambda kv: (-kv[1][1], kv[0]))
+        totals = [sum(values[i] for values in self.groups.values()) for i in range(len(MEASURES))]
+        return AnalyticsReport(
+            by=list(self.by),
+            rows=[_row(dict(zip(self.by, key)), values) for key, values in items[:limit]],
+            totals=_row({}, totals),
+        )
+
+
+def _row(key: Dict[str, str], values: Sequence[float]) -> AnalyticsRow:
+    quotes, revenue, subtotal, area, won, lost, won_revenue = values
+    decided = won + lost
+    return AnalyticsRow(
+        key=key,
+        quotes=int(quotes),
+        revenue=round(revenue, 2),
+        area_sqft=round(area, 2),
+        avg_quote=round(revenue / quotes, 2) if quotes else None,
+        avg_price_per_sqft=round(subtotal / area, 2) if area else None,
+        won=int(won),
+        lost=int(lost),
+        win_rate=round(won / decided, 4) if decided else None,
+        won_revenue=round(won_revenue, 2),
+    )
+
+
+def group_history(
+    history: HistoryStore,
+    outcomes: OutcomeStore,
+    q: AnalyticsQuery,
+    *,
+    batch_size: int = 65536,
+) -> AnalyticsReport:
+    """
+    Ad-hoc group-by: streams only the HISTORY_COLUMNS of the rows matching the
+    filters (index-served, like /api/history) and folds them batch by batch.
+    """
+    by = list(dict.fromkeys(q.by))
+    filters = HistoryQuery(**q.model_dump(exclude={"by", "limit"}))
+    decided = outcomes.latest()
+
+    agg = Aggregates(by)
+    for batch in history.iter_batches(HISTORY_COLUMNS, filter=history_filter(filters), batch_size=batch_size):
+        agg.fold(measure_table(pa.Table.from_batches([batch]), by, decided))
+    return agg.report(limit=q.limit)
+
+
+# ---------- INCREMENTAL ----------
+
+class _Log:
+    """
+    How far an append-only dataset has been folded, as a Lance version: commit
+    order, which ids (issued before their group commits, by several
+    processes) do not follow. Commits folded ahead of the scan (observe(),
+    set_outcome()) are kept until the scan reaches and skips them.
+    """
+
+    def __init__(self) -> None:
+        self.dataset: Any = None  # snapshot at `version` (None while the dataset does not exist)
+        self.version: Optional[int] = None  # None = nothing read yet; 0 = no dataset yet
+        self.ahead: Dict[int, List[int]] = {}  # version -> ids, folded before the scan got there
+
+    @property
+    def loaded(self) -> bool:
+        return self.version is not None
+
+    def folded(self, version: int) -> bool:
+        return version <= self.version or version in self.ahead
+
+    def consumed(self, column: str, ids: Iterable[int]) -> Set[int]:
+        """Those of `ids` (values of `column`) that were folded."""
+        ids = {int(i) for i in ids}
+        found = {i for folded in self.ahead.values() for i in folded if i in ids}
+        if self.dataset is not None and ids - found:
+            listed = ", ".join(str(i) for i in sorted(ids - found))
+            found.update(self.dataset.to_table(columns=[column], filter=f"{column} IN ({listed})").column(column).to_pylist())
+        return found
+
+    def advance(self, ds: Any) -> None:
+        """After a complete scan of `ds` (None: no dataset)."""
+        self.dataset = ds
+        self.version = 0 if ds is None else ds.version
+        self.ahead = {v: ids for v, ids in self.ahead.items() if v > self.version}
+
+
+class AnalyticsStore:
+    """
+    Dashboard aggregates by trade, preset, month and client, kept up to date
+    incrementally: the first report folds the whole history once; after that
+    only new quotes (written by this process via observe(), or by any other
+    process via a scan of the commits since the last one) and new won/lost
+    events are folded.
+    A report is a read of the in-memory groups, so it does not get slower as
+    the history grows.
+    """
+
+    def __init__(
+        self,
+        history: HistoryStore,
+        outcomes: OutcomeStore,
+        *,
+        refresh_seconds: float = 1.0,
+    ) -> None:
+        self.history = history
+        self.outcomes = outcomes
+        self.refresh_seconds = refresh_seconds
+
+        self._aggs = {name: Aggregates((name,)) for name in DIMENSIONS}
+        self._decided: Dict[int, str] = {}
+        self._quotes = _Log()
+        self._events = _Log()
+        self._lock = threading.Lock()
+        self._refreshed_at: Optional[float] = None
+
+    # --- quotes ---
+
+    def _fold(self, table: pa.Table) -> None:
+        if not table.num_rows:
+            return
+        measures = measure_table(table, DIMENSIONS, self._decided)
+        for agg in self._aggs.values():
+            agg.fold(measures)
+
+    def observe(self, rows: Sequence[Mapping[str, Any]], version: int) -> None:
+        """HistoryWriter hook: folds HISTORY_SCHEMA rows right after `version` committed them."""
+        with self._lock:
+            if not self._quotes.loaded or self._quotes.folded(version):
+                return  # the first refresh / a scan since read them from the dataset
+            table = pa.table({
+                "quote_id": pa.array([r["quote_id"] for r in rows], pa.int64()),
+                "created_at": pa.array([r["meta"]["created_at"] for r in rows], pa.timestamp("s")),
+                "trade_id": pa.array([r["meta"]["trade_id"] for r in rows], pa.string()),
+                "preset_id": pa.array([r["meta"]["preset_id"] for r in rows], pa.string()),
+                "client_name": pa.array([r["meta"]["client_name"] for r in rows], pa.string()),
+                "total": pa.array([r["output"]["total"] for r in rows], pa.float64()),
+                "subtotal": pa.array([r["output"]["subtotal"] for r in rows], pa.float64()),
+                "area": pa.array([r["output"]["actual_area_sqft"] for r in rows], pa.float64()),
+            })
+            self._fold(table)
+            self._quotes.ahead[version] = table.column("quote_id").to_pylist()
+
+    def _scan_quotes(self) -> None:
+        log = self._quotes
+        ds = self.history.dataset() if self.history.exists() else None
+        if ds is not None and not log.loaded:
+            for batch in ds.to_batches(columns=HISTORY_COLUMNS):
+                self._fold(pa.Table.from_batches([batch]))
+        elif ds is not None:
+            for version, table in appended_since(ds, log.version, HISTORY_COLUMNS):
+                if log.ahead.pop(version, None) is None:
+                    self._fold(table)
+        log.advance(ds)
+
+    # --- outcomes ---
+
+    def _apply_outcomes(self, events: Iterable[Tuple[int, str]]) -> None:
+        """Updates the decided set and corrects won / lost of quotes already folded."""
+        changes: Dict[int, List[int]] = {}  # quote_id -> [won delta, lost delta]
+        for quote_id, outcome in events:
+            before = self._decided.get(quote_id)
+            after = None if outcome == "open" else outcome
+            if before == after:
+                continue
+            if after is None:
+                self._decided.pop(quote_id, None)
+            else:
+                self._decided[quote_id] = after
+            delta = changes.setdefault(quote_id, [0, 0])
+            delta[0] += (after == "won") - (before == "won")
+            delta[1] += (after == "lost") - (before == "lost")
+        # Quotes not folded yet are folded later, with their outcome.
+        folded = self._quotes.consumed("quote_id", changes) if changes else set()
+        if not folded:
+            return
+
+        ids = ", ".join(str(q) for q in folded)
+        rows = self.history.scan(HISTORY_COLUMNS, filter=f"quote_id IN ({ids})")
+        if not rows.num_rows:
+            return
+        delta = measure_table(rows, DIMENSIONS, {})
+        won = pa.array([changes[q][0] for q in rows.column("quote_id").to_pylist()], pa.int64())
+        lost = pa.array([changes[q][1] for q in rows.column("quote_id").to_pylist()], pa.int64())
+        zeros = pa.array(np.zeros(rows.num_rows))
+        updates = {
+            "quotes": pa.array(np.zeros(rows.num_rows, dtype=np.int64)),
+            "revenue": zeros,
+            "subtotal": zeros,
+            "area": zeros,
+            "won": won,
+            "lost": lost,
+            "won_revenue": pc.multiply(pc.cast(won, pa.float64()), delta.column("revenue")),
+        }
+        for name, values in updates.items():
+            delta = delta.set_column(delta.schema.get_field_index(name), name, values)
+        for agg in self._aggs.values():
+            agg.fold(delta)
+
+    def _scan_outcomes(self) -> None:
+        log = self._events
+        ds = self.outcomes.dataset() if self.outcomes.exists() else None
+        if ds is not None and not log.loaded:
+            # First load: before any quote is folded, so no per-quote corrections.
+            events = ds.to_table().sort_by("event_id")
+            for quote_id, outcome in zip(events.column("quote_id").to_pylist(), events.column("outcome").to_pylist()):
+                if outcome == "open":
+                    self._decided.pop(quote_id, None)
+                else:
+                    self._decided[quote_id] = outcome
+        elif ds is not None:
+            for version, events in appended_since(ds, log.version):
+                if log.ahead.pop(version, None) is None:
+                    events = events.sort_by("event_id")
+                    self._apply_outcomes(zip(events.column("quote_id").to_pylist(), events.column("outcome").to_pylist()))
+        log.advance(ds)
+
+    def set_outcome(self, quote_id: int, outcome: str) -> int:
+        """Records a won / lost / open decision and applies it; returns the event_id."""
+        event_id, version = self.outcomes.append(quote_id, outcome)
+        with self._lock:
+            if self._events.loaded and not self._events.folded(version):
+                self._events.ahead[version] = [event_id]
+                self._apply_outcomes([(int(quote_id), outcome)])
+        return event_id
+
+    # --- read ---
+
+    def refresh(self) -> None:
+        """Folds whatever other writers appended since the last refresh."""
+        with self._lock:
+            if not self._events.loaded:
+                self._scan_outcomes()
+            self._scan_quotes()
+            self._scan_outcomes()
+            self._refreshed_at = time.monotonic()
+
+    def report(self, dimension: str = "trade", *, limit: Optional[int] = None) -> AnalyticsReport:
+        agg = self._aggs.get(dimension)
+        if agg is None:
+            raise ValueError(f"Unknown dimension: {dimension!r} (use one of {', '.join(DIMENSIONS)})")
+        if self._refreshed_at is None or time.monotonic() - self._refreshed_at >= self.refresh_seconds:
+            self.refresh()
+        with self._lock:
+            return agg.report(limit=limit)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "groups": sum(len(agg.groups) for agg in self._aggs.values()),
+            "decided": len(self._decided),
+            "commits_ahead": len(self._quotes.ahead),
+        }
@@ -0,0 +1,541 @@
+# core/batch.py
+# Колонковий (NumPy) прорахунок: той самий calculate_quote, але для масивів рядків.
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Dict, List, Mapping, Optional, Tuple, Union
+
+import numpy as np
+
+from .fixedpoint import (
+    AREA_SCALE, CENTS, FIXED_MAX, GST_SCALE, PCT_SCALE,
+    cost_fixed, effective_area_fixed, gst_fixed, markup_fixed, to_fixed_array,
+)
+from .models import TradeConfig, QuoteRequest, PricingType
+from .plans import PricingPlan, get_plan, plans_for, wall_us
+
+# Numeric QuoteResult fields returned by calculate_quote_batch (same names as the scalar result).
+BATCH_RESULT_FIELDS: Tuple[str, ...] = (
+    "actual_area_sqft",
+    "effective_area_sqft",
+    "labor_cost",
+    "material_cost",
+    "materials_markup_amount",
+    "materials_handling_fee",
+    "subtotal",
+    "gst",
+    "total",
+)
+
+# Which pricing rule fired for each row (replaces per-row notes in the batch path).
+BATCH_FLAG_FIELDS: Tuple[str, ...] = (
+    "labor_rate_clamped",
+    "min_total_applied",
+    "manual_total_used",
+)
+
+_PRICING_CODES = {
+    PricingType.FLAT_MIN_TOTAL: 0,
+    PricingType.MIN_RATE_PER_SQFT: 1,
+    PricingType.CUSTOM: 2,
+}
+
+
+def _money_array(x: np.ndarray) -> np.ndarray:
+    """Vectorized _money: bit-for-bit equal to round(x + 1e-9, 2) for every element."""
+    y = np.asarray(x, dtype=np.float64) + 1e-9
+    out = np.round(y, 2)
+
+    # np.round scales by 100 and uses rint, which can disagree with Python's
+    # correctly-rounded round() only right next to a half-cent boundary.
+    scaled = y * 100.0
+    frac = scaled - np.floor(scaled)
+    near_half = np.abs(frac - 0.5) < 1e-6 + np.abs(scaled) * 1e-15
+    if near_half.any():
+        idx = np.flatnonzero(near_half)
+        out[idx] = [round(float(v), 2) for v in y[idx]]
+    return out
+
+
+def _column(columns: Mapping[str, Any], name: str, n: int) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Returns (values, present) for a request column, or None if the column is absent.
+    present=False marks a null (None / NaN / Arrow null) -> preset default is used.
+    """
+    col = columns.get(name)
+    if col is None:
+        return None
+
+    if np.ndim(col) == 0 and not hasattr(col, "is_null"):  # scalar: same value on every row
+        values = np.full(n, col)
+        present = np.full(n, not (isinstance(col, float) and np.isnan(col)))
+    elif hasattr(col, "is_null"):  # pyarrow Array / ChunkedArray
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        present = ~np.asarray(col.is_null().to_numpy(zero_copy_only=False), dtype=bool)
+        if col.null_count:
+            col = pc.fill_null(col, False if pa.types.is_boolean(col.type) else 0)
+        values = np.asarray(col.to_numpy(zero_copy_only=False))
+    else:
+        values = np.asarray(col)
+        if values.dtype == object:
+            present = np.fromiter((v is not None for v in values), dtype=bool, count=values.size)
+            values = np.where(present, values, 0)
+        elif values.dtype.kind == "f":
+            present = ~np.isnan(values)
+        else:
+            present = np.ones(values.shape, dtype=bool)
+
+    if values.shape != (n,):
+        raise ValueError(f"Column {name!r} has {values.size} rows, expected {n}")
+    return values, present
+
+
+def _float_column(columns, name: str, n: int, default: np.ndarray) -> np.ndarray:
+    """Per row: request value if present, otherwise the preset default."""
+    col = _column(columns, name, n)
+    if col is None:
+        return default.astype(np.float64, copy=True)
+    values, present = col
+    return np.where(present, values.astype(np.float64), default)
+
+
+def _bool_column(columns, name: str, n: int, default: np.ndarray) -> np.ndarray:
+    """Per row: request toggle if present, otherwise the preset default."""
+    col = _column(columns, name, n)
+    if col is None:
+        return default.copy()
+    values, present = col
+    return np.where(present, values.astype(bool), default)
+
+
+def _id_column(columns, name: str, n: int, default: Optional[str]) -> Union[str, np.ndarray]:
+    """Ids per row, or a single str when the whole batch shares one id."""
+    col = columns.get(name)
+    if col is None:
+        if default is None:
+            raise ValueError(f"Column {name!r} is required")
+        return default
+    if isinstance(col, str):
+        return col
+    if hasattr(col, "to_pylist"):
+        col = col.to_pylist()
+    values = np.asarray(col, dtype=object)
+    if values.shape != (n,):
+        raise ValueError(f"Column {name!r} has {values.size} rows, expected {n}")
+    return values
+
+
+def _batch_length(columns: Mapping[str, Any]) -> int:
+    """Row count: the length of the array columns (1 if every column is a scalar)."""
+    lengths = {len(col) for col in columns.values() if col is not None and not isinstance(col, str) and np.ndim(col) > 0}
+    if len(lengths) > 1:
+        raise ValueError(f"Columns have different lengths: {sorted(lengths)}")
+    return lengths.pop() if lengths else 1
+
+
+def _as_of_column(columns: Mapping[str, Any], n: int) -> np.ndarray:
+    """as_of per row as wall_us (see core.plans); absent or null = now."""
+    now = wall_us()
+    col = columns.get("as_of")
+    if col is None:
+        return np.full(n, now, dtype=np.int64)
+    if isinstance(col, str):
+        col = datetime.fromisoformat(col)
+    if isinstance(col, datetime):
+        return np.full(n, wall_us(col), dtype=np.int64)
+
+    if hasattr(col, "is_null"):  # pyarrow Array / ChunkedArray
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        if not pa.types.is_timestamp(col.type):
+            col = pc.cast(col, pa.timestamp("us"))
+        elif col.type.tz is not None:
+            col = pc.local_timestamp(col)
+        col = pc.fill_null(pc.cast(pc.cast(col, pa.timestamp("us")), pa.int64()), now)
+        values = np.asarray(col.to_numpy(zero_copy_only=False), dtype=np.int64)
+    else:
+        values = np.asarray(col)
+        if values.dtype.kind == "M":
+            nat = np.isnat(values)
+            values = np.where(nat, now, values.astype("datetime64[us]").astype(np.int64))
+        else:
+            values = np.fromiter(
+                (now if v is None else wall_us(datetime.fromisoformat(v) if isinstance(v, str) else v) for v in values.ravel()),
+                dtype=np.int64,
+                count=values.size,
+            )
+
+    if values.shape != (n,):
+        raise ValueError(f"Column 'as_of' has {values.size} rows, expected {n}")
+    return values
+
+
+def _split_by_version(
+    keys: List[Tuple[str, str]],
+    plans: List[Optional[PricingPlan]],
+    inverse: np.ndarray,
+    as_of: np.ndarray,
+) -> Tuple[List[Tuple[str, str]], List[Optional[PricingPlan]], np.ndarray]:
+    """
+    Regroups the rows of presets with rate versions by (preset, version): one
+    searchsorted of the rows' as_of over the version starts per preset, so a
+    batch of mixed dates costs O(n log v), with no per-row plan lookup.
+    """
+    keys, plans, inverse = list(keys), list(plans), inverse.copy()
+    order = np.argsort(inverse, kind="stable")
+    bounds = np.searchsorted(inverse[order], np.arange(len(keys) + 1))
+
+    for group in range(len(keys)):
+        plan = plans[group]
+        if plan is None or plan.timeline is None:
+            continue
+        rows = order[bounds[group]:bounds[group + 1]]
+        version = np.searchsorted(np.asarray(plan.timeline.starts, dtype=np.int64), as_of[rows], side="right")
+        for i, v in enumerate(np.unique(version)):
+            target = group
+            if i:  # first version keeps the group; later ones get new groups
+                target = len(plans)
+                keys.append(keys[group])
+                plans.append(None)
+                inverse[rows[version == v]] = target
+            plans[target] = plan.timeline.plans[int(v)]
+    return keys, plans, inverse
+
+
+def resolve_batch(trades: Dict[str, TradeConfig], columns: Any) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """
+    Per-row inputs of calculate_quote_batch with preset defaults applied and
+    QuoteRequest constraints checked: (errors, rows). errors is an object
+    array (None = ok); rows maps names like "area", "labor_rate", "pricing",
+    "min_total", "gst_rate" to arrays (NaN where a preset has no such rule).
+    """
+    if hasattr(columns, "column_names"):  # pyarrow.Table
+        columns = {name: columns.column(name) for name in columns.column_names}
+
+    if columns.get("area_sqft") is None:
+        raise ValueError("Column 'area_sqft' is required")
+    n = _batch_length(columns)
+
+    trade_ids = _id_column(columns, "trade_id", n, QuoteRequest.model_fields["trade_id"].default)
+    preset_ids = _id_column(columns, "preset_id", n, None)
+
+    errors = np.full(n, None, dtype=object)
+
+    # --- Preset parameters, gathered per row via (trade_id, preset_id) codes ---
+    if isinstance(trade_ids, str) and isinstance(preset_ids, str):
+        uniq = [(trade_ids, preset_ids)]
+        inverse = np.zeros(n, dtype=np.intp)
+    else:
+        if isinstance(trade_ids, str):
+            trade_ids = np.full(n, trade_ids, dtype=object)
+        if isinstance(preset_ids, str):
+            preset_ids = np.full(n, preset_ids, dtype=object)
+        codes: Dict[Tuple[str, str], int] = {}
+        inverse = np.fromiter(
+            (codes.setdefault(key, len(codes)) for key in zip(trade_ids, preset_ids)),
+            dtype=np.intp,
+            count=n,
+        )
+        uniq = list(codes)
+
+    # --- Plans per group: (trade_id, preset_id), split by rate version where a preset has them ---
+    index = plans_for(trades)
+    plans = [index.get(key) for key in uniq]
+    if any(plan is not None and plan.timeline is not None for plan in plans):
+        uniq, plans, inverse = _split_by_version(uniq, plans, inverse, _as_of_column(columns, n))
+
+    k = len(uniq)
+    p_known = np.zeros(k, dtype=bool)
+    p_pricing = np.zeros(k, dtype=np.int8)
+    p_incl_labor = np.zeros(k, dtype=bool)
+    p_incl_mat = np.zeros(k, dtype=bool)
+    p_waste = np.zeros(k)
+    p_labor = np.zeros(k)
+    p_material = np.zeros(k)
+    p_min_total = np.full(k, np.nan)
+    p_min_labor = np.full(k, np.nan)
+    p_handling = np.zeros(k)
+    p_markup = np.zeros(k)
+    p_gst = np.zeros(k)
+    p_error = np.full(k, None, dtype=object)
+
+    for i, (trade_id, preset_id) in enumerate(uniq):
+        plan = plans[i]
+        if plan is None:
+            try:
+                get_plan(trades, trade_id, preset_id)
+            except ValueError as e:
+                p_error[i] = str(e)
+            continue
+
+        p_known[i] = True
+        p_pricing[i] = _PRICING_CODES[plan.pricing_type]
+        p_incl_labor[i] = plan.include_labor
+        p_incl_mat[i] = plan.include_materials
+        p_waste[i] = plan.waste_pct
+        p_labor[i] = plan.labor_rate
+        p_material[i] = plan.material_rate
+        if plan.min_total is not None:
+            p_min_total[i] = plan.min_total
+        if plan.min_labor_rate is not None:
+            p_min_labor[i] = plan.min_labor_rate
+        p_handling[i] = plan.handling_fee
+        p_markup[i] = plan.markup_pct
+        p_gst[i] = plan.gst_rate
+
+    unknown = ~p_known[inverse]
+    errors[unknown] = p_error[inverse][unknown]
+
+    pricing = p_pricing[inverse]
+
+    # --- Resolve toggles ---
+    include_labor = _bool_column(columns, "include_labor", n, p_incl_labor[inverse])
+    include_materials = _bool_column(columns, "include_materials", n, p_incl_mat[inverse])
+
+    # --- Resolve inputs ---
+    area = _float_column(columns, "area_sqft", n, np.full(n, np.nan))
+    waste = _float_column(columns, "waste_pct", n, p_waste[inverse])
+
+    labor_rate = _float_column(columns, "labor_rate_per_sqft", n, p_labor[inverse])
+    material_rate = _float_column(columns, "material_rate_per_sqft", n, p_material[inverse])
+
+    full_service = _bool_column(columns, "full_service_materials", n, np.zeros(n, dtype=bool))
+    handling_fee = _float_column(columns, "materials_handling_fee", n, p_handling[inverse])
+    markup_pct = _float_column(columns, "materials_markup_pct", n, p_markup[inverse])
+
+    use_manual = _bool_column(columns, "use_manual_total", n, np.zeros(n, dtype=bool))
+    manual_total = _float_column(columns, "manual_total", n, np.full(n, np.nan))
+
+    # --- Request validation (the Field constraints of QuoteRequest) ---
+    for name, values, bad in (
+        ("area_sqft", area, ~(area >= 0)),
+        ("waste_pct", waste, ~((waste >= 0) & (waste <= 100))),
+        ("labor_rate_per_sqft", labor_rate, ~(labor_rate >= 0)),
+        ("material_rate_per_sqft", material_rate, ~(material_rate >= 0)),
+        ("materials_handling_fee", handling_fee, ~(handling_fee >= 0)),
+        ("materials_markup_pct", markup_pct, ~(markup_pct >= 0)),
+    ):
+        bad &= ~unknown & (errors == None)  # noqa: E711
+        if bad.any():
+            for i in np.flatnonzero(bad):
+                errors[i] = f"Invalid {name}: {values[i]}"
+
+    bad_manual = use_manual & np.isnan(manual_total) & (errors == None)  # noqa: E711
+    errors[bad_manual] = "manual_total is required when use_manual_total=true"
+    bad_manual = use_manual & (manual_total < 0) & (errors == None)  # noqa: E711
+    errors[bad_manual] = "Invalid manual_total"
+
+    return errors, {
+        "pricing": pricing,
+        "include_labor": include_labor,
+        "include_materials": include_materials,
+        "area": area,
+        "waste": waste,
+        "labor_rate": labor_rate,
+        "material_rate": material_rate,
+        "min_labor": p_min_labor[inverse],
+        "full_service": full_service,
+        "handling_fee": handling_fee,
+        "markup_pct": markup_pct,
+        "use_manual": use_manual,
+        "manual_total": manual_total,
+        "min_total": p_min_total[inverse],
+        "gst_rate": p_gst[inverse],
+    }
+
+
+def calculate_quote_batch(
+    trades: Dict[str, TradeConfig],
+    columns: Any,
+    *,
+    fixed_point: bool = False,
+) -> Dict[str, np.ndarray]:
+    """
+    Columnar version of calculate_quote.
+
+    `columns` is a mapping of QuoteRequest field name -> 1-D array (NumPy, list or
+    pyarrow) or a scalar shared by every row, or a pyarrow.Table with the same
+    column names. Only area_sqft and preset_id are required; a missing column or
+    a null value (None / NaN / Arrow null) means "use the preset default",
+    exactly like None in QuoteRequest.
+
+    Returns a dict of result columns: BATCH_RESULT_FIELDS (float64, rounded with
+    the same rules as the scalar path), BATCH_FLAG_FIELDS (bool) and "error"
+    (object: None, or the message calculate_quote/QuoteRequest would raise for
+    that row). Rows with an error have NaN in every numeric column.
+
+    With fixed_point=True the numeric columns are int64 instead: areas in
+    0.01 sqft, money in cents, priced exactly like core.fixedpoint.fixed_quote.
+    Rows with an error have 0 there.
+    """
+    errors, rows = resolve_batch(trades, columns)
+    if fixed_point:
+        return _batch_fixed(errors, rows)
+
+    pricing = rows["pricing"]
+    include_labor = rows["include_labor"]
+    include_materials = rows["include_materials"]
+    area = rows["area"]
+    waste = rows["waste"]
+    labor_rate = rows["labor_rate"]
+    material_rate = rows["material_rate"]
+    full_service = rows["full_service"]
+    handling_fee = rows["handling_fee"]
+    markup_pct = rows["markup_pct"]
+    use_manual = rows["use_manual"]
+    manual_total = rows["manual_total"]
+
+    # MIN_RATE_PER_SQFT: enforce min labor rate
+    min_labor = rows["min_labor"]
+    labor_rate_clamped = (pricing == _PRICING_CODES[PricingType.MIN_RATE_PER_SQFT]) & (labor_rate < min_labor)
+    labor_rate = np.where(labor_rate_clamped, min_labor, labor_rate)
+
+    # Materials effective area uses waste. Labor uses actual area.
+    eff_area = np.where(include_materials, area * (1 + waste / 100.0), area)
+
+    labor_cost = np.where(include_labor, area * labor_rate, 0.0)
+    material_cost = np.where(include_materials, eff_area * material_rate, 0.0)
+
+    # --- Full-service extras ---
+    full_service &= include_materials
+    materials_handling_fee = np.where(full_service, handling_fee, 0.0)
+    materials_markup_amount = np.where(full_service, material_cost * (markup_pct / 100.0), 0.0)
+
+    # --- Pricing mode switch ---
+    auto_subtotal = labor_cost + material_cost + materials_handling_fee + materials_markup_amount
+
+    min_total = rows["min_total"]
+    min_total_applied = (
+        ~use_manual
+        & (pricing == _PRICING_CODES[PricingType.FLAT_MIN_TOTAL])
+        & (auto_subtotal < min_total)
+    )
+    subtotal = np.where(use_manual, manual_total, np.where(min_total_applied, min_total, auto_subtotal))
+
+    gst = subtotal * rows["gst_rate"]
+    total = subtotal + gst
+
+    failed = errors != None  # noqa: E711
+    out: Dict[str, np.ndarray] = {}
+    for name, values in zip(
+        BATCH_RESULT_FIELDS,
+        (area, eff_area, labor_cost, material_cost, materials_markup_amount,
+         materials_handling_fee, subtotal, gst, total),
+    ):
+        values = _money_array(values)
+        values[failed] = np.nan
+        out[name] = values
+
+    for name, values in zip(BATCH_FLAG_FIELDS, (labor_rate_clamped, min_total_applied, use_manual)):
+        out[name] = values & ~failed
+
+    out["error"] = errors
+    return out
+
+
+FIXED_OVERFLOW_ERROR = "Amounts too large for fixed-point pricing"
+
+
+def _fixed_overflow(failed: np.ndarray, rows: Dict[str, np.ndarray]) -> np.ndarray:
+    """Rows whose largest int64 product (see the stages in core.fixedpoint) would exceed FIXED_MAX, estimated in float64."""
+
+    def units(name: str, scale: int) -> np.ndarray:
+        values = rows[name]
+        return np.where(failed | np.isnan(values), 0.0, values) * scale
+
+    with np.errstate(over="ignore", invalid="ignore"):
+        area = units("area", AREA_SCALE)
+        waste = units("waste", PCT_SCALE)
+        labor_rate = np.maximum(units("labor_rate", CENTS), units("min_labor", CENTS))
+        material_rate = units("material_rate", CENTS)
+        markup = units("markup_pct", PCT_SCALE)
+        handling = units("handling_fee", CENTS)
+
+        eff_area = area * (1 + waste / (100 * PCT_SCALE))
+        material = eff_area * material_rate / AREA_SCALE
+        subtotal = np.maximum.reduce([
+            area * labor_rate / AREA_SCALE + material * (1 + markup / (100 * PCT_SCALE)) + handling,
+            units("manual_total", CENTS),
+            units("min_total", CENTS),
+        ])
+        largest = np.maximum.reduce([
+            area * (100 * PCT_SCALE + waste),
+            area * labor_rate,
+            eff_area * material_rate,
+            material * markup,
+            subtotal * units("gst_rate", GST_SCALE),
+            subtotal,
+        ])
+    return ~failed & ~(largest <= FIXED_MAX)  # inf / NaN included
+
+
+def _batch_fixed(errors: np.ndarray, rows: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """int64 arithmetic of calculate_quote_batch(fixed_point=True); inputs already resolved and validated."""
+    failed = errors != None  # noqa: E711
+    overflow = _fixed_overflow(failed, rows)
+    if overflow.any():
+        errors = errors.copy()
+        errors[overflow] = FIXED_OVERFLOW_ERROR
+        failed = failed | overflow
+
+    def fixed(name: str, scale: int) -> np.ndarray:
+        values = rows[name]
+        return to_fixed_array(np.where(failed | np.isnan(values), 0.0, values), scale)
+
+    pricing = rows["pricing"]
+    include_labor = rows["include_labor"]
+    include_materials = rows["include_materials"]
+    use_manual = rows["use_manual"]
+
+    area = fixed("area", AREA_SCALE)
+    waste = fixed("waste", PCT_SCALE)
+    labor_rate = fixed("labor_rate", CENTS)
+    material_rate = fixed("material_rate", CENTS)
+
+    # MIN_RATE_PER_SQFT: enforce min labor rate
+    min_labor = fixed("min_labor", CENTS)
+    labor_rate_clamped = (pricing == _PRICING_CODES[PricingType.MIN_RATE_PER_SQFT]) & (labor_rate < min_labor)
+    labor_rate = np.where(labor_rate_clamped, min_labor, labor_rate)
+
+    eff_area = np.where(include_materials, effective_area_fixed(area, waste), area)
+
+    labor_cost = np.where(include_labor, cost_fixed(area, labor_rate), 0)
+    material_cost = np.where(include_materials, cost_fixed(eff_area, material_rate), 0)
+
+    # --- Full-service extras ---
+    full_service = rows["full_service"] & include_materials
+    materials_handling_fee = np.where(full_service, fixed("handling_fee", CENTS), 0)
+    materials_markup_amount = np.where(full_service, markup_fixed(material_cost, fixed("markup_pct", PCT_SCALE)), 0)
+
+    # --- Pricing mode switch ---
+    auto_subtotal = labor_cost + material_cost + materials_handling_fee + materials_markup_amount
+
+    min_total = fixed("min_total", CENTS)
+    min_total_applied = (
+        ~use_manual
+        & (pricing == _PRICING_CODES[PricingType.FLAT_MIN_TOTAL])
+        & ~np.isnan(rows["min_total"])
+        & (auto_subtotal < min_total)
+    )
+    subtotal = np.where(use_manual, fixed("manual_total", CENTS), np.where(min_total_applied, min_total, auto_subtotal))
+
+    gst = gst_fixed(subtotal, fixed("gst_rate", GST_SCALE))
+    total = subtotal + gst
+
+    out: Dict[str, np.ndarray] = {}
+    for name, values in zip(
+        BATCH_RESULT_FIELDS,
+        (area, eff_area, labor_cost, material_cost, materials_markup_amount,
+         materials_handling_fee, subtotal, gst, total),
+    ):
+        out[name] = np.where(failed, 0, values).astype(np.int64, copy=False)
+
+    for name, values in zip(BATCH_FLAG_FIELDS, (labor_rate_clamped, min_total_applied, use_manual)):
+        out[name] = values & ~failed
+
+    out["error"] = errors
+    return out
@@ -0,0 +1,334 @@
+# core/bulk.py
+# Масовий прорахунок: CSV/Parquet -> chunk-и фіксованого розміру -> calculate_quote_batch -> CSV/Parquet.
+
+from __future__ import annotations
+
+import time
+from collections import deque
+from datetime import datetime
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+from .batch import BATCH_FLAG_FIELDS, BATCH_RESULT_FIELDS, calculate_quote_batch
+from .config import TRADES_PATH, load_trades
+from .fixedpoint import AREA_SCALE, CENTS
+from .models import QuoteRequest, TradeConfig
+
+DEFAULT_CHUNK_ROWS = 65_536
+
+# QuoteRequest fields read from the input (any other column is copied through untouched).
+FLOAT_FIELDS = (
+    "area_sqft",
+    "waste_pct",
+    "labor_rate_per_sqft",
+    "material_rate_per_sqft",
+    "materials_handling_fee",
+    "materials_markup_pct",
+    "manual_total",
+)
+BOOL_FIELDS = ("include_labor", "include_materials", "full_service_materials", "use_manual_total")
+ID_FIELDS = ("trade_id", "preset_id")
+TIME_FIELDS = ("as_of",)  # blank = now
+
+# Output columns appended after the input columns.
+ERROR_COLUMN = "error"
+RESULT_PREFIX = "quote_"
+
+_TRUE = ["true", "t", "yes", "y", "1"]
+_FALSE = ["false", "f", "no", "n", "0"]
+
+
+def file_format(path: Path) -> str:
+    suffix = Path(path).suffix.lower()
+    if suffix in (".parquet", ".pq"):
+        return "parquet"
+    if suffix in (".csv", ".txt"):
+        return "csv"
+    raise ValueError(f"Unsupported file type: {path} (use .csv or .parquet)")
+
+
+# ---------- READ ----------
+
+def _rechunk(batches: Iterator[pa.RecordBatch], rows: int) -> Iterator[pa.Table]:
+    """Regroups record batches into tables of exactly `rows` rows (the last one may be shorter)."""
+    pending: List[pa.RecordBatch] = []
+    count = 0
+    for batch in batches:
+        if not batch.num_rows:
+            continue
+        pending.append(batch)
+        count += batch.num_rows
+        while count >= rows:
+            table = pa.Table.from_batches(pending)
+            yield table.slice(0, rows)
+            rest = table.slice(rows)
+            pending, count = rest.to_batches(), rest.num_rows
+    if count:
+        yield pa.Table.from_batches(pending)
+
+
+def read_chunks(path: Path, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[pa.Table]:
+    """
+    Streams `path` as tables of `chunk_rows` rows; only about one chunk is in
+    memory at a time. CSV columns are read as strings (parsed per row later, so
+    one bad cell does not fail the file); Parquet keeps its own types.
+    """
+    path = Path(path)
+    if file_format(path) == "parquet":
+        yield from _rechunk(pq.ParquetFile(path).iter_batches(batch_size=chunk_rows), chunk_rows)
+        return
+
+    probe = pacsv.open_csv(path)
+    names = probe.schema.names
+    probe.close()
+
+    reader = pacsv.open_csv(
+        path,
+        read_options=pacsv.ReadOptions(block_size=8 << 20),
+        convert_options=pacsv.ConvertOptions(
+            column_types={name: pa.string() for name in names},
+            strings_can_be_null=True,
+        ),
+    )
+    yield from _rechunk(iter(reader), chunk_rows)
+
+
+# ---------- PARSE ----------
+
+def _is_text(col: pa.ChunkedArray) -> bool:
+    return pa.types.is_string(col.type) or pa.types.is_large_string(col.type)
+
+
+def _parse_float(name: str, col: pa.ChunkedArray, errors: np.ndarray) -> pa.ChunkedArray:
+    """String column -> float64; unparsable cells become null and get an error message."""
+    col = pc.utf8_trim_whitespace(col)
+    col = pc.if_else(pc.equal(col, ""), pa.scalar(None, col.type), col)
+    try:
+        return pc.cast(col, pa.float64())
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        pass
+
+    values = []
+    for i, raw in enumerate(col.to_pylist()):
+        if raw is None:
+            values.append(None)
+            continue
+        try:
+            values.append(float(raw.replace(",", ".")))
+        except ValueError:
+            values.append(None)
+            if errors[i] is None:
+                errors[i] = f"Invalid {name}: {raw!r}"
+    return pa.chunked_array([pa.array(values, pa.float64())])
+
+
+def _parse_bool(name: str, col: pa.ChunkedArray, errors: np.ndarray) -> pa.ChunkedArray:
+    """String column -> bool (true/false, yes/no, y/n, 1/0; blank = preset default)."""
+    text = pc.utf8_lower(pc.utf8_trim_whitespace(col))
+    is_true = pc.is_in(text, value_set=pa.array(_TRUE))
+    is_false = pc.is_in(text, value_set=pa.array(_FALSE))
+    blank = pc.or_kleene(pc.is_null(text), pc.equal(text, ""))
+
+    bad = np.asarray(pc.invert(pc.or_(pc.or_(is_true, is_false), pc.fill_null(blank, True))).to_numpy(zero_copy_only=False))
+    for i in np.flatnonzero(bad):
+        if errors[i] is None:
+            errors[i] = f"Invalid {name}: {col[int(i)].as_py()!r}"
+
+    return pc.if_else(pc.or_(pc.fill_null(blank, True), pa.chunked_array([pa.array(bad)])), pa.scalar(None, pa.bool_()), is_true)
+
+
+def _parse_timestamp(name: str, col: pa.ChunkedArray, errors: np.ndarray) -> pa.ChunkedArray:
+    """String column -> timestamp (ISO date or date/time; an offset is converted to local time)."""
+    col = pc.utf8_trim_whitespace(col)
+    col = pc.if_else(pc.equal(col, ""), pa.scalar(None, col.type), col)
+    try:
+        return pc.cast(col, pa.timestamp("us"))
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        pass
+
+    values = []
+    for i, raw in enumerate(col.to_pylist()):
+        if raw is None:
+            values.append(None)
+            continue
+        try:
+            value = datetime.fromisoformat(raw)
+        except ValueError:
+            values.append(None)
+            if errors[i] is None:
+                errors[i] = f"Invalid {name}: {raw!r}"
+            continue
+        values.append(value.astimezone().replace(tzinfo=None) if value.tzinfo else value)
+    return pa.chunked_array([pa.array(values, pa.timestamp("us"))])
+
+
+def request_columns(table: pa.Table) -> Tuple[Dict[str, Any], np.ndarray]:
+    """
+    The calculate_quote_batch columns found in `table`, plus per-row parse
+    errors (object array, None = ok). Blank cells mean "preset default".
+    """
+    errors = np.full(table.num_rows, None, dtype=object)
+    columns: Dict[str, Any] = {}
+    names = set(table.column_names)
+
+    for name in FLOAT_FIELDS:
+        if name in names:
+            col = table.column(name)
+            columns[name] = _parse_float(name, col, errors) if _is_text(col) else col
+    for name in BOOL_FIELDS:
+        if name in names:
+            col = table.column(name)
+            columns[name] = _parse_bool(name, col, errors) if _is_text(col) else col
+    for name in TIME_FIELDS:
+        if name in names:
+            col = table.column(name)
+            columns[name] = _parse_timestamp(name, col, errors) if _is_text(col) else col
+    for name in ID_FIELDS:
+        if name in names:
+            col = pc.cast(table.column(name), pa.string())
+            if name == "trade_id":
+                col = pc.fill_null(col, QuoteRequest.model_fields["trade_id"].default)
+            columns[name] = col
+    return columns, errors
+
+
+# ---------- PRICE ----------
+
+def result_names() -> List[str]:
+    return [RESULT_PREFIX + name for name in BATCH_RESULT_FIELDS + BATCH_FLAG_FIELDS] + [ERROR_COLUMN]
+
+
+def price_table(trades: Dict[str, TradeConfig], table: pa.Table, *, fixed_point: bool = False) -> pa.Table:
+    """
+    Input columns + quote_<field> result columns + `error`. A row with an error
+    (bad cell, unknown preset, out-of-range value) has null results.
+    """
+    for name in ("area_sqft", "preset_id"):
+        if name not in table.column_names:
+            raise ValueError(f"Input has no {name!r} column")
+
+    columns, errors = request_columns(table)
+    out = calculate_quote_batch(trades, columns, fixed_point=fixed_point)
+
+    batch_errors = out["error"]
+    failed_parse = errors != None  # noqa: E711
+    errors = np.where(failed_parse, errors, batch_errors)
+    failed = errors != None  # noqa: E711
+
+    for name in BATCH_RESULT_FIELDS:
+        values = out[name]
+        if fixed_point:  # int64 units -> exact decimal dollars / sqft
+            values = values / (AREA_SCALE if name.endswith("_sqft") else CENTS)
+        table = table.append_column(RESULT_PREFIX + name, pa.array(values, pa.float64(), mask=failed))
+    for name in BATCH_FLAG_FIELDS:
+        table = table.append_column(RESULT_PREFIX + name, pa.array(out[name], pa.bool_(), mask=failed))
+    return table.append_column(ERROR_COLUMN, pa.array(errors.tolist(), pa.string()))
+
+
+# Per-process state of pool workers (trades loaded once per worker).
+_worker_trades: Optional[Dict[str, TradeConfig]] = None
+_worker_fixed_point = False
+
+
+def _init_worker(trades_path: str, fixed_point: bool) -> None:
+    global _worker_trades, _worker_fixed_point
+    _worker_trades = load_trades(Path(trades_path))
+    _worker_fixed_point = fixed_point
+
+
+def _price_in_worker(table: pa.Table) -> pa.Table:
+    return price_table(_worker_trades, table, fixed_point=_worker_fixed_point)
+
+
+# ---------- WRITE ----------
+
+class _Writer:
+    """CSV or Parquet writer opened on the first chunk (its schema fixes the output schema)."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.format = file_format(self.path)
+        self._writer: Any = None
+
+    def write(self, table: pa.Table) -> None:
+        if self._writer is None:
+            if self.format == "parquet":
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            else:
+                self._writer = pacsv.CSVWriter(self.path, table.schema)
+        self._writer.write_table(table.cast(self._writer.schema) if self.format == "parquet" else table)
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+
+
+# ---------- RUN ----------
+
+@dataclass
+class BulkStats:
+    rows: int = 0
+    errors: int = 0
+    chunks: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+def bulk_quote(
+    src: Path,
+    dst: Path,
+    *,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    workers: int = 0,
+    fixed_point: bool = False,
+    trades_path: Path = TRADES_PATH,
+) -> BulkStats:
+    """
+    Prices every row of `src` (CSV/Parquet) into `dst` (CSV/Parquet, picked by
+    extension), chunk by chunk, in input order. workers > 1 spreads chunks over
+    a process pool; at most 2 chunks per worker are in flight, so memory stays
+    bounded by chunk size, not file size.
+    """
+    if chunk_rows <= 0:
+        raise ValueError("chunk_rows must be > 0")
+    file_format(dst)  # fail before reading anything
+    start = time.perf_counter()
+    stats = BulkStats()
+    writer = _Writer(dst)
+
+    def emit(table: pa.Table) -> None:
+        writer.write(table)
+        stats.rows += table.num_rows
+        stats.errors += table.num_rows - table.column(ERROR_COLUMN).null_count
+        stats.chunks += 1
+
+    try:
+        if workers > 1:
+            with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(str(trades_path), fixed_point)) as pool:
+                in_flight: Deque[Future] = deque()
+                for chunk in read_chunks(src, chunk_rows):
+                    in_flight.append(pool.submit(_price_in_worker, chunk))
+                    if len(in_flight) >= 2 * workers:
+                        emit(in_flight.popleft().result())
+                while in_flight:
+                    emit(in_flight.popleft().result())
+        else:
+            trades = load_trades(trades_path)
+            for chunk in read_chunks(src, chunk_rows):
+                emit(price_table(trades, chunk, fixed_point=fixed_point))
+    finally:
+        writer.close()
+
+    stats.seconds = time.perf_counter() - start
+    return stats
@@ -0,0 +1,122 @@
+# core/cache.py
+# LRU-кеш результатів calculate_quote. Ключ = нормалізований запит + версія конфігу.
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Tuple
+
+from .calculator import calculate_with_plan
+from .models import QuoteRequest, QuoteResult, TradeConfig
+from .plans import PricingPlan, get_plan
+
+
+def cache_key(plan: PricingPlan, req: QuoteRequest, version: str) -> Tuple[Hashable, ...]:
+    """
+    Canonical form of a request: preset defaults applied, and fields that cannot
+    change the result (or its notes) for this plan replaced by None. Two
+    requests with the same key always price identically under `version`.
+    """
+    include_labor = plan.include_labor if req.include_labor is None else bool(req.include_labor)
+    include_materials = plan.include_materials if req.include_materials is None else bool(req.include_materials)
+
+    labor_rate = plan.labor_rate if req.labor_rate_per_sqft is None else float(req.labor_rate_per_sqft)
+    if plan.min_labor_rate is not None and labor_rate < plan.min_labor_rate:
+        labor_rate = plan.min_labor_rate
+        clamped = True
+    else:
+        clamped = False
+    if not include_labor:
+        labor_rate = None  # only the clamp note can still show up
+
+    waste = material_rate = None
+    full_service = False
+    handling_fee = markup_pct = None
+    if include_materials:
+        waste = plan.waste_pct if req.waste_pct is None else float(req.waste_pct)
+        material_rate = plan.material_rate if req.material_rate_per_sqft is None else float(req.material_rate_per_sqft)
+        full_service = bool(req.full_service_materials)
+        if full_service:
+            handling_fee = plan.handling_fee if req.materials_handling_fee is None else float(req.materials_handling_fee)
+            markup_pct = plan.markup_pct if req.materials_markup_pct is None else float(req.materials_markup_pct)
+
+    manual_total = float(req.manual_total) if req.use_manual_total and req.manual_total is not None else None
+
+    return (
+        version,
+        plan.trade_id,
+        plan.preset_id,
+        plan.effective_from,
+        float(req.area_sqft),
+        include_labor,
+        labor_rate,
+        clamped,
+        include_materials,
+        waste,
+        material_rate,
+        full_service,
+        handling_fee,
+        markup_pct,
+        bool(req.use_manual_total),
+        manual_total,
+    )
+
+
+class QuoteCache:
+    """
+    Bounded LRU memo for calculate_quote. Cached QuoteResult objects are shared
+    between callers and must be treated as read-only. One cache prices in one
+    mode (float or fixed_point) only.
+    """
+
+    def __init__(self, maxsize: int = 4096, *, fixed_point: bool = False) -> None:
+        if maxsize <= 0:
+            raise ValueError("maxsize must be > 0")
+        self.maxsize = maxsize
+        self.fixed_point = fixed_point
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: "OrderedDict[Tuple[Hashable, ...], QuoteResult]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def calculate(self, trades: Dict[str, TradeConfig], req: QuoteRequest, version: str) -> QuoteResult:
+        """Same as calculate_quote(trades, req)[2]; `version` must identify `trades`."""
+        plan = get_plan(trades, req.trade_id, req.preset_id, req.as_of)
+        key = cache_key(plan, req, version)
+
+        with self._lock:
+            result = self._data.get(key)
+            if result is not None:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return result
+            self.misses += 1
+
+        # Computed outside the lock; a concurrent miss on the same key just stores it twice.
+        result = calculate_with_plan(plan, req, fixed_point=self.fixed_point)
+
+        with self._lock:
+            self._data[key] = result
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+        return result
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "maxsize": self.maxsize,
+                "size": len(self._data),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
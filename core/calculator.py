@@ -1,9 +1,12 @@
 # core/calculator.py
 from __future__ import annotations
 
-from typing import Dict, Tuple
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
 
-from .models import TradeConfig, PresetConfig, QuoteRequest, QuoteResult, PricingType
+from .fixedpoint import fixed_quote
+from .models import TradeConfig, PresetConfig, QuoteRequest, QuoteResult
+from .plans import PricingPlan, get_plan
 from .rules import effective_area
 
 
@@ -11,46 +14,46 @@ def _money(x: float) -> float:
     return round(float(x) + 1e-9, 2)
 
 
-def _pick_bool(req_val, preset_default: bool) -> bool:
-    return preset_default if req_val is None else bool(req_val)
-
-
-def _pick_float(req_val, preset_default: float) -> float:
-    return float(preset_default) if req_val is None else float(req_val)
-
-
 def calculate_quote(
     trades: Dict[str, TradeConfig],
     req: QuoteRequest,
+    *,
+    fixed_point: bool = False,
+    as_of: Optional[datetime] = None,
 ) -> Tuple[PresetConfig, TradeConfig, QuoteResult]:
-    notes: list[str] = []
-
-    if req.trade_id not in trades:
-        raise ValueError(f"Unknown trade_id: {req.trade_id}")
-
-    trade = trades[req.trade_id]
+    """
+    Prices `req` with the preset rates in effect at `as_of` (default: req.as_of,
+    else now). The returned preset carries the rates of that version.
+    """
+    plan = get_plan(trades, req.trade_id, req.preset_id, req.as_of if as_of is None else as_of)
+    return plan.preset, plan.trade, calculate_with_plan(plan, req, fixed_point=fixed_point)
+
+
+def calculate_with_plan(plan: PricingPlan, req: QuoteRequest, *, fixed_point: bool = False) -> QuoteResult:
+    """
+    calculate_quote against an already resolved PricingPlan (see core.plans).
+    fixed_point=True prices in integer cents instead (see core.fixedpoint).
+    """
+    if fixed_point:
+        return fixed_quote(plan, req).to_result()
 
-    if req.preset_id not in trade.presets:
-        raise ValueError(f"Unknown preset_id: {req.preset_id} for trade {req.trade_id}")
-
-    preset = trade.presets[req.preset_id]
+    notes: list[str] = []
 
     # --- Resolve toggles ---
-    include_labor = _pick_bool(req.include_labor, preset.include_labor)
-    include_materials = _pick_bool(req.include_materials, preset.include_materials)
+    include_labor = plan.include_labor if req.include_labor is None else bool(req.include_labor)
+    include_materials = plan.include_materials if req.include_materials is None else bool(req.include_materials)
 
     # --- Resolve inputs ---
     area = float(req.area_sqft)
-    waste = _pick_float(req.waste_pct, preset.default_waste_pct)
+    waste = plan.waste_pct if req.waste_pct is None else float(req.waste_pct)
 
-    labor_rate = _pick_float(req.labor_rate_per_sqft, preset.default_labor_rate_per_sqft)
-    material_rate = _pick_float(req.material_rate_per_sqft, preset.default_material_rate_per_sqft)
+    labor_rate = plan.labor_rate if req.labor_rate_per_sqft is None else float(req.labor_rate_per_sqft)
+    material_rate = plan.material_rate if req.material_rate_per_sqft is None else float(req.material_rate_per_sqft)
 
     # MIN_RATE_PER_SQFT: enforce min labor rate
-    if preset.pricing_type == PricingType.MIN_RATE_PER_SQFT and preset.min_labor_rate_per_sqft is not None:
-        if labor_rate < float(preset.min_labor_rate_per_sqft):
-            notes.append(f"Labor rate raised to min ${preset.min_labor_rate_per_sqft}/sqft")
-            labor_rate = float(preset.min_labor_rate_per_sqft)
+    if plan.min_labor_rate is not None and labor_rate < plan.min_labor_rate:
+        notes.append(plan.min_labor_rate_note)
+        labor_rate = plan.min_labor_rate
 
     # Materials effective area uses waste. Labor uses actual area (практичніше для роботи)
     eff_area = effective_area(area, waste) if include_materials else area
@@ -68,42 +71,33 @@ def calculate_quote(
     materials_markup_amount = 0.0
 
     if req.full_service_materials and include_materials:
-        handling_fee = _pick_float(req.materials_handling_fee, preset.default_full_service_handling_fee)
-        markup_pct = _pick_float(req.materials_markup_pct, preset.default_full_service_markup_pct)
+        handling_fee = plan.handling_fee if req.materials_handling_fee is None else float(req.materials_handling_fee)
+        markup_pct = plan.markup_pct if req.materials_markup_pct is None else float(req.materials_markup_pct)
 
-        materials_handling_fee = float(handling_fee)
-        materials_markup_amount = material_cost * (float(markup_pct) / 100.0)
+        materials_handling_fee = handling_fee
+        materials_markup_amount = material_cost * (markup_pct / 100.0)
 
         notes.append("Full-service materials enabled (handling + markup).")
 
     # --- Pricing mode switch ---
     auto_subtotal = labor_cost + material_cost + materials_handling_fee + materials_markup_amount
 
-    if req.use_manual_total or preset.pricing_type == PricingType.CUSTOM:
-        # For CUSTOM we allow auto OR manual. Manual only if use_manual_total=True.
-        if req.use_manual_total:
-            if req.manual_total is None:
-                raise ValueError("manual_total is required when use_manual_total=true")
-            subtotal = float(req.manual_total)
-            notes.append("CUSTOM pricing: manual total override used (labor/materials shown for reference).")
-            if subtotal < labor_cost:
-                notes.append("⚠️ WARNING: manual total is lower than labor cost.")
-        else:
-            subtotal = auto_subtotal
-            notes.append("CUSTOM pricing: auto calculated.")
+    if req.use_manual_total:
+        # Manual override (any pricing type; the UI offers it for CUSTOM).
+        if req.manual_total is None:
+            raise ValueError("manual_total is required when use_manual_total=true")
+        subtotal = float(req.manual_total)
+        notes.append("CUSTOM pricing: manual total override used (labor/materials shown for reference).")
+        if subtotal < labor_cost:
+            notes.append("⚠️ WARNING: manual total is lower than labor cost.")
     else:
-        subtotal = auto_subtotal
+        # FLAT_MIN_TOTAL floor / CUSTOM note / MIN_RATE_PER_SQFT no-op
+        subtotal, _applied = plan.subtotal_rule(plan, auto_subtotal, notes)
 
-        # FLAT_MIN_TOTAL rule
-        if preset.pricing_type == PricingType.FLAT_MIN_TOTAL and preset.min_total is not None:
-            if subtotal < float(preset.min_total):
-                notes.append(f"Flat minimum applied: ${preset.min_total}")
-                subtotal = float(preset.min_total)
-
-    gst = subtotal * float(trade.gst_rate)
+    gst = subtotal * plan.gst_rate
     total = subtotal + gst
 
-    result = QuoteResult(
+    return QuoteResult(
         actual_area_sqft=_money(area),
         effective_area_sqft=_money(eff_area),
 
@@ -119,4 +113,14 @@ def calculate_quote(
         notes=notes,
     )
 
-    return preset, trade, result
\ No newline at end of file
+
+# The columnar path lives in core.batch (NumPy is only imported when it is used).
+_BATCH_NAMES = ("calculate_quote_batch", "BATCH_RESULT_FIELDS", "BATCH_FLAG_FIELDS")
+
+
+def __getattr__(name: str) -> Any:
+    if name in _BATCH_NAMES:
+        from . import batch
+
+        return getattr(batch, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,148 @@
+# core/config.py
+# Завантаження data/trades.json у версіоновані snapshot-и + hot-reload (mtime polling).
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+from pydantic import ValidationError
+
+from .models import TradeConfig
+from .plans import PlanIndex, plans_for
+
+log = logging.getLogger(__name__)
+
+TRADES_PATH = Path(__file__).resolve().parents[1] / "data" / "trades.json"
+
+
+def parse_trades(raw: bytes) -> Dict[str, TradeConfig]:
+    """Parses and validates trades.json content. Raises ValueError / ValidationError."""
+    data = json.loads(raw)
+    if not isinstance(data, dict):
+        raise ValueError("trades.json must contain an object of trades")
+    return {trade_id: TradeConfig(**cfg) for trade_id, cfg in data.items()}
+
+
+def load_trades(path: Path = TRADES_PATH) -> Dict[str, TradeConfig]:
+    return parse_trades(path.read_bytes())
+
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """
+    One fully validated trades.json load. Never mutated: a reload builds a new
+    snapshot and swaps the reference, so a request that grabbed a snapshot keeps
+    pricing against it until it finishes.
+    """
+
+    version: str  # content hash of the file
+    generation: int  # 1, 2, 3... per successful load in this process
+    loaded_at: float
+    mtime_ns: int
+    trades: Dict[str, TradeConfig]
+    plans: PlanIndex = field(repr=False)
+    trades_json: bytes = field(repr=False)  # pre-serialized /api/trades body
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.version}"'
+
+    @classmethod
+    def build(cls, raw: bytes, *, generation: int, mtime_ns: int) -> "ConfigSnapshot":
+        trades = parse_trades(raw)
+        dumped = {trade_id: trade.model_dump(mode="json") for trade_id, trade in trades.items()}
+        # Registers the plans in the calculator's cache for this trades dict.
+        plans = plans_for(trades)
+        return cls(
+            version=hashlib.sha256(raw).hexdigest()[:16],
+            generation=generation,
+            loaded_at=time.time(),
+            mtime_ns=mtime_ns,
+            trades=trades,
+            plans=plans,
+            trades_json=json.dumps(dumped, ensure_ascii=False, separators=(",", ":")).encode("utf-8"),
+        )
+
+
+class ConfigStore:
+    """
+    Holds the current ConfigSnapshot for a trades file and swaps in a new one
+    when the file changes. A file that fails to parse or validate is logged and
+    ignored; the previous snapshot stays live.
+    """
+
+    def __init__(
+        self,
+        path: Path = TRADES_PATH,
+        *,
+        on_reload: Optional[Callable[[float, Optional[Exception]], None]] = None,
+    ) -> None:
+        self.path = Path(path)
+        self.on_reload = on_reload  # (seconds, error or None) after every reload attempt
+        self._lock = threading.Lock()  # serializes reloads, never taken by readers
+        self._seen: Optional[Tuple[int, int]] = None  # (mtime_ns, size) of the last file examined
+        self._snapshot = self._build(generation=1)
+
+    @property
+    def snapshot(self) -> ConfigSnapshot:
+        return self._snapshot
+
+    def _build(self, *, generation: int) -> ConfigSnapshot:
+        stat = self.path.stat()
+        self._seen = (stat.st_mtime_ns, stat.st_size)
+        raw = self.path.read_bytes()
+        return ConfigSnapshot.build(raw, generation=generation, mtime_ns=stat.st_mtime_ns)
+
+    def reload(self) -> ConfigSnapshot:
+        """Unconditional reload. Raises if the file is invalid (the old snapshot stays)."""
+        start = time.perf_counter()
+        error: Optional[Exception] = None
+        try:
+            with self._lock:
+                current = self._snapshot
+                snapshot = self._build(generation=current.generation + 1)
+                if snapshot.version == current.version:
+                    return current
+                self._snapshot = snapshot
+                log.info("Loaded %s (version %s, generation %d)", self.path, snapshot.version, snapshot.generation)
+                return snapshot
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            if self.on_reload is not None:
+                self.on_reload(time.perf_counter() - start, error)
+
+    def reload_if_changed(self) -> bool:
+        """Cheap mtime/size check; reloads only when the file changed. Returns True on swap."""
+        try:
+            stat = self.path.stat()
+        except OSError as e:
+            log.warning("Cannot stat %s: %s", self.path, e)
+            return False
+
+        if (stat.st_mtime_ns, stat.st_size) == self._seen:
+            return False
+
+        before = self._snapshot
+        try:
+            after = self.reload()
+        except (OSError, ValueError, ValidationError) as e:
+            log.error("Rejected %s, keeping version %s: %s", self.path, before.version, e)
+            return False
+        return after is not before
+
+    async def watch(self, interval: float = 2.0) -> None:
+        """Polls the file forever; run it as an asyncio task. Parsing happens off the event loop."""
+        import asyncio  # not needed (or paid for at startup) by the CLI
+
+        while True:
+            await asyncio.sleep(interval)
+            await asyncio.to_thread(self.reload_if_changed)
@@ -0,0 +1,171 @@
+# core/fixedpoint.py
+# Fixed-point режим: гроші в int центах, площа в сотих sqft, відсотки в сотих %. Без float-шуму.
+
+from __future__ import annotations
+
+import math
+from typing import TYPE_CHECKING, List, NamedTuple, Union
+
+from .models import QuoteRequest, QuoteResult
+from .plans import PricingPlan
+
+# Units (value * SCALE = stored integer):
+CENTS = 100            # money: $12.34 -> 1234
+AREA_SCALE = 100       # area: 124.3 sqft -> 12430
+PCT_SCALE = 100        # waste / markup %: 10% -> 1000 (basis points)
+GST_SCALE = 1_000_000  # gst_rate: 0.05 -> 50000 (ppm, so rates like 0.09975 stay exact)
+
+# Largest intermediate product the int64 batch path accepts (margin below 2**63
+# for the rounding adds); the scalar path uses Python ints and has no limit.
+FIXED_MAX = float(2 ** 62)
+
+if TYPE_CHECKING:
+    import numpy as np
+
+IntLike = Union[int, "np.ndarray"]
+
+
+def to_fixed(x: float, scale: int) -> int:
+    """float -> integer units, rounded half-up (0.285 * 100 -> 29, not 28)."""
+    return int(math.floor(float(x) * scale + 0.5 + 1e-6))
+
+
+def to_fixed_array(x: "np.ndarray", scale: int) -> "np.ndarray":
+    """Vectorized to_fixed -> int64."""
+    import numpy as np
+
+    return np.floor(np.asarray(x, dtype=np.float64) * scale + (0.5 + 1e-6)).astype(np.int64)
+
+
+def div_half_up(num: IntLike, den: int) -> IntLike:
+    """num / den rounded half-up, in integers; num >= 0. Works on ints and int64 arrays."""
+    return (num + den // 2) // den
+
+
+# Rounding stages (every step is integer arithmetic, each product rounded half-up once):
+#   effective area = area * (1 + waste%)         -> 0.01 sqft
+#   labor          = area * labor rate           -> cent
+#   material       = effective area * mat. rate  -> cent
+#   markup         = material * markup%          -> cent
+#   subtotal       = labor + material + handling + markup (exact), or min_total / manual_total
+#   gst            = subtotal * gst_rate         -> cent
+#   total          = subtotal + gst (exact)
+
+def effective_area_fixed(area: IntLike, waste: IntLike) -> IntLike:
+    return div_half_up(area * (100 * PCT_SCALE + waste), 100 * PCT_SCALE)
+
+
+def cost_fixed(area: IntLike, rate: IntLike) -> IntLike:
+    return div_half_up(area * rate, AREA_SCALE)
+
+
+def markup_fixed(amount: IntLike, markup: IntLike) -> IntLike:
+    return div_half_up(amount * markup, 100 * PCT_SCALE)
+
+
+def gst_fixed(subtotal: IntLike, gst_rate: IntLike) -> IntLike:
+    return div_half_up(subtotal * gst_rate, GST_SCALE)
+
+
+class FixedQuote(NamedTuple):
+    """QuoteResult in integer units: areas in 0.01 sqft, money in cents."""
+
+    actual_area_sqft: int
+    effective_area_sqft: int
+    labor_cost: int
+    material_cost: int
+    materials_markup_amount: int
+    materials_handling_fee: int
+    subtotal: int
+    gst: int
+    total: int
+    notes: List[str]
+
+    def to_result(self) -> QuoteResult:
+        return QuoteResult(
+            actual_area_sqft=self.actual_area_sqft / AREA_SCALE,
+            effective_area_sqft=self.effective_area_sqft / AREA_SCALE,
+            labor_cost=self.labor_cost / CENTS,
+            material_cost=self.material_cost / CENTS,
+            materials_markup_amount=self.materials_markup_amount / CENTS,
+            materials_handling_fee=self.materials_handling_fee / CENTS,
+            subtotal=self.subtotal / CENTS,
+            gst=self.gst / CENTS,
+            total=self.total / CENTS,
+            notes=self.notes,
+        )
+
+
+def fixed_quote(plan: PricingPlan, req: QuoteRequest) -> FixedQuote:
+    """calculate_with_plan in integer units; same notes, rounding per the stages above."""
+    notes: list[str] = []
+
+    # --- Resolve toggles ---
+    include_labor = plan.include_labor if req.include_labor is None else bool(req.include_labor)
+    include_materials = plan.include_materials if req.include_materials is None else bool(req.include_materials)
+
+    # --- Resolve inputs ---
+    area = to_fixed(req.area_sqft, AREA_SCALE)
+    waste = to_fixed(plan.waste_pct if req.waste_pct is None else req.waste_pct, PCT_SCALE)
+
+    labor_rate = to_fixed(plan.labor_rate if req.labor_rate_per_sqft is None else req.labor_rate_per_sqft, CENTS)
+    material_rate = to_fixed(plan.material_rate if req.material_rate_per_sqft is None else req.material_rate_per_sqft, CENTS)
+
+    # MIN_RATE_PER_SQFT: enforce min labor rate
+    if plan.min_labor_rate is not None:
+        min_labor_rate = to_fixed(plan.min_labor_rate, CENTS)
+        if labor_rate < min_labor_rate:
+            notes.append(plan.min_labor_rate_note)
+            labor_rate = min_labor_rate
+
+    eff_area = effective_area_fixed(area, waste) if include_materials else area
+
+    labor_cost = cost_fixed(area, labor_rate) if include_labor else 0
+    material_cost = cost_fixed(eff_area, material_rate) if include_materials else 0
+
+    if not include_labor:
+        notes.append("Labor excluded.")
+    if not include_materials:
+        notes.append("Materials excluded.")
+
+    # --- Full-service extras ---
+    handling_fee = 0
+    markup_amount = 0
+
+    if req.full_service_materials and include_materials:
+        handling_fee = to_fixed(plan.handling_fee if req.materials_handling_fee is None else req.materials_handling_fee, CENTS)
+        markup_pct = to_fixed(plan.markup_pct if req.materials_markup_pct is None else req.materials_markup_pct, PCT_SCALE)
+        markup_amount = markup_fixed(material_cost, markup_pct)
+
+        notes.append("Full-service materials enabled (handling + markup).")
+
+    # --- Pricing mode switch ---
+    auto_subtotal = labor_cost + material_cost + handling_fee + markup_amount
+
+    if req.use_manual_total:
+        if req.manual_total is None:
+            raise ValueError("manual_total is required when use_manual_total=true")
+        subtotal = to_fixed(req.manual_total, CENTS)
+        notes.append("CUSTOM pricing: manual total override used (labor/materials shown for reference).")
+        if subtotal < labor_cost:
+            notes.append("⚠️ WARNING: manual total is lower than labor cost.")
+    else:
+        # The plan rule works in dollars; keep the exact cents unless it replaced
+        # the subtotal (FLAT_MIN_TOTAL floor).
+        ruled, applied = plan.subtotal_rule(plan, auto_subtotal / CENTS, notes)
+        subtotal = to_fixed(ruled, CENTS) if applied else auto_subtotal
+
+    gst = gst_fixed(subtotal, to_fixed(plan.gst_rate, GST_SCALE))
+
+    return FixedQuote(
+        actual_area_sqft=area,
+        effective_area_sqft=eff_area,
+        labor_cost=labor_cost,
+        material_cost=material_cost,
+        materials_markup_amount=markup_amount,
+        materials_handling_fee=handling_fee,
+        subtotal=subtotal,
+        gst=gst,
+        total=subtotal + gst,
+        notes=notes,
+    )
@@ -0,0 +1,794 @@
+# core/history.py
+# Історія квот: колонковий append-only датасет (Lance) замість одного JSON-файлу на квоту.
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
+
+import lance
+import pyarrow as pa
+from lance.dataset import ColumnOrdering
+from lance.fragment import write_fragments
+
+from .models import HistoryPage, HistoryQuery, QuoteRequest, QuoteResult
+from .plans import PricingPlan
+
+log = logging.getLogger(__name__)
+
+ROOT = Path(__file__).resolve().parents[1]
+HISTORY_DIR = ROOT / "data" / "history"  # legacy: one JSON file per quote
+HISTORY_DATASET = ROOT / "data" / "history.lance"
+OUTCOMES_DATASET = ROOT / "data" / "history_outcomes.lance"
+
+# Same meta/input/output blocks as the legacy JSON files, stored as struct columns.
+META_TYPE = pa.struct([
+    ("created_at", pa.timestamp("s")),
+    ("trade_id", pa.string()),
+    ("trade_label", pa.string()),
+    ("preset_id", pa.string()),
+    ("preset_label", pa.string()),
+    ("pricing_type", pa.string()),
+    ("client_name", pa.string()),
+    ("job_address", pa.string()),
+])
+
+INPUT_TYPE = pa.struct([
+    ("area_sqft", pa.float64()),
+    ("waste_pct", pa.float64()),
+    ("labor_rate_per_sqft", pa.float64()),
+    ("material_rate_per_sqft", pa.float64()),
+    ("include_labor", pa.bool_()),
+    ("include_materials", pa.bool_()),
+    ("materials_full_service", pa.bool_()),
+    ("materials_handling_fee", pa.float64()),
+    ("materials_markup_pct", pa.float64()),
+    ("manual_total", pa.float64()),
+])
+
+OUTPUT_TYPE = pa.struct([
+    ("actual_area_sqft", pa.float64()),
+    ("effective_area_sqft", pa.float64()),
+    ("labor_cost", pa.float64()),
+    ("material_cost", pa.float64()),
+    ("materials_markup_amount", pa.float64()),
+    ("materials_handling_fee", pa.float64()),
+    ("subtotal", pa.float64()),
+    ("gst", pa.float64()),
+    ("total", pa.float64()),
+    ("notes", pa.list_(pa.string())),
+])
+
+HISTORY_SCHEMA = pa.schema([
+    ("quote_id", pa.int64()),
+    ("meta", META_TYPE),
+    ("input", INPUT_TYPE),
+    ("output", OUTPUT_TYPE),
+    ("source_file", pa.string()),  # legacy JSON file name for migrated quotes, else null
+])
+
+Columns = Union[Sequence[str], Mapping[str, str], None]
+
+# compact_files() default: fragments below this many rows get merged.
+COMPACT_TARGET_ROWS = 1 << 20
+
+# Lance commits optimistically; losing a race to another writer (another
+# process compacting or indexing the same dataset) is reported as an OSError
+# saying so, and nothing was committed: re-plan on the latest version and retry.
+COMMIT_RETRIES = 8
+
+# Unfiltered HistoryQuery pages read newest-first quote_id windows through the
+# index: the first sized for QUERY_WINDOW_ROWS rows per page row at the average
+# id density, each next one QUERY_WINDOW_GROWTH times wider, up to QUERY_WINDOWS;
+# whatever is left below is one last scan. Filtered pages go straight to that
+# scan: Lance evaluates a filter over the whole dataset on every call.
+QUERY_WINDOW_ROWS = 4
+QUERY_WINDOW_GROWTH = 16
+QUERY_WINDOWS = 3
+
+# Secondary indexes, created on first write and brought up to date after every write.
+HISTORY_INDEXES: Dict[str, str] = {
+    "quote_id": "BTREE",
+    "meta.created_at": "BTREE",
+    "meta.client_name": "BTREE",
+    "meta.job_address": "BTREE",
+    "meta.trade_id": "BITMAP",
+    "meta.preset_id": "BITMAP",
+    "meta.pricing_type": "BITMAP",
+    "output.total": "BTREE",
+}
+
+
+# ---------- IDS ----------
+
+# quote_id / event_id layout: ms since epoch << 12 | node << 6 | sequence.
+# Time-ordered, and below 2**53 (survives JSON round trips through JavaScript)
+# until 2039. Older ids (ms * 1024 + pid bits) all sort below new ones.
+ID_NODE_BITS = 6
+ID_SEQ_BITS = 6
+ID_NODES = 1 << ID_NODE_BITS  # writer processes; the last node is for processes without a slot (CLI, scripts)
+ID_SEQUENCE = 1 << ID_SEQ_BITS  # ids per millisecond per process
+
+_id_lock = threading.Lock()
+_id_node = int(os.environ.get("QUOTE_ID_NODE", ID_NODES - 1))
+_last_id_ms = 0
+_id_seq = 0
+
+
+def set_id_node(node: int) -> None:
+    """
+    Node bits of this process's ids. Every process writing the same history
+    at the same time needs its own node (web.server gives each worker its slot).
+    """
+    global _id_node
+    if not 0 <= node < ID_NODES:
+        raise ValueError(f"id node must be in 0..{ID_NODES - 1}, got {node}")
+    _id_node = node
+
+
+def next_quote_id() -> int:
+    """
+    Strictly increasing within a process and unique across processes with
+    distinct nodes. The millisecond part is the wall clock: once a
+    millisecond's sequence is used up, this waits for the next one.
+    """
+    global _last_id_ms, _id_seq
+    with _id_lock:
+        while True:
+            now_ms = time.time_ns() // 1_000_000
+            if now_ms > _last_id_ms:
+                _last_id_ms, _id_seq = now_ms, 0
+                break
+            if _id_seq + 1 < ID_SEQUENCE:
+                _id_seq += 1
+                break
+            time.sleep((_last_id_ms + 1 - now_ms) / 1000)  # also rides out a clock stepping back
+        return (_last_id_ms << (ID_NODE_BITS + ID_SEQ_BITS)) | (_id_node << ID_SEQ_BITS) | _id_seq
+
+
+# ---------- RECORD <-> ROW ----------
+
+def _pick(value: Optional[float], default: float) -> float:
+    return default if value is None else float(value)
+
+
+def quote_record(
+    plan: PricingPlan,
+    req: QuoteRequest,
+    result: QuoteResult,
+    *,
+    client_name: str = "",
+    job_address: str = "",
+    created_at: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    """
+    Builds the {"meta", "input", "output"} history record for a priced request.
+    `input` holds the resolved values (preset defaults applied), like the CLI saves.
+    """
+    include_materials = plan.include_materials if req.include_materials is None else bool(req.include_materials)
+    full_service = bool(req.full_service_materials) and include_materials
+
+    return {
+        "meta": {
+            "created_at": (created_at or datetime.now()).isoformat(timespec="seconds"),
+            "trade_id": plan.trade_id,
+            "trade_label": plan.trade.label,
+            "preset_id": plan.preset_id,
+            "preset_label": plan.preset.label,
+            "pricing_type": plan.pricing_type.value,
+            "client_name": client_name,
+            "job_address": job_address,
+        },
+        "input": {
+            "area_sqft": float(req.area_sqft),
+            "waste_pct": _pick(req.waste_pct, plan.waste_pct) if include_materials else 0.0,
+            "labor_rate_per_sqft": _pick(req.labor_rate_per_sqft, plan.labor_rate),
+            "material_rate_per_sqft": _pick(req.material_rate_per_sqft, plan.material_rate) if include_materials else 0.0,
+            "include_labor": plan.include_labor if req.include_labor is None else bool(req.include_labor),
+            "include_materials": include_materials,
+            "materials_full_service": full_service,
+            "materials_handling_fee": _pick(req.materials_handling_fee, plan.handling_fee) if full_service else 0.0,
+            "materials_markup_pct": _pick(req.materials_markup_pct, plan.markup_pct) if full_service else 0.0,
+            "manual_total": float(req.manual_total) if req.use_manual_total and req.manual_total is not None else None,
+        },
+        "output": result.model_dump(),
+    }
+
+
+def _block(record: Mapping[str, Any], name: str, struct: pa.StructType) -> Dict[str, Any]:
+    block = record.get(name) or {}
+    return {struct.field(i).name: block.get(struct.field(i).name) for i in range(struct.num_fields)}
+
+
+# Output keys written by the v0.4 CLI before it used QuoteResult names.
+_LEGACY_OUTPUT_KEYS = {"sqft_input": "actual_area_sqft", "sqft_with_waste": "effective_area_sqft"}
+
+
+def record_to_row(record: Mapping[str, Any], *, quote_id: Optional[int] = None, source_file: Optional[str] = None) -> Dict[str, Any]:
+    """Legacy-shaped {"meta", "input", "output"} dict -> one HISTORY_SCHEMA row."""
+    meta = _block(record, "meta", META_TYPE)
+    created_at = meta["created_at"]
+    if isinstance(created_at, str):
+        meta["created_at"] = datetime.fromisoformat(created_at)
+    elif created_at is None:
+        meta["created_at"] = datetime.now().replace(microsecond=0)
+
+    output = _block(record, "output", OUTPUT_TYPE)
+    for old, new in _LEGACY_OUTPUT_KEYS.items():
+        if output[new] is None and old in (record.get("output") or {}):
+            output[new] = record["output"][old]
+    output["notes"] = list(output["notes"] or [])
+
+    return {
+        "quote_id": next_quote_id() if quote_id is None else quote_id,
+        "meta": meta,
+        "input": _block(record, "input", INPUT_TYPE),
+        "output": output,
+        "source_file": source_file,
+    }
+
+
+def row_to_record(row: Mapping[str, Any]) -> Dict[str, Any]:
+    """HISTORY_SCHEMA row -> legacy-shaped record (plus quote_id)."""
+    meta = dict(row["meta"])
+    if isinstance(meta.get("created_at"), datetime):
+        meta["created_at"] = meta["created_at"].isoformat(timespec="seconds")
+    return {
+        "quote_id": row["quote_id"],
+        "meta": meta,
+        "input": dict(row["input"]),
+        "output": dict(row["output"]),
+    }
+
+
+# ---------- STORE ----------
+
+def _commit_conflict(error: OSError) -> bool:
+    return "Retryable commit conflict" in str(error)
+
+
+# ---------- DURABILITY ----------
+# Lance's local commit does not fsync. A group is durable once its data files
+# are synced before the commit (the manifest never points at unsynced data),
+# and the new manifest plus the directory entries after it.
+
+def _fsync(path: Path, *, directory: bool = False) -> None:
+    if directory and os.name == "nt":  # directories cannot be opened for fsync there
+        return
+    fd = os.open(path, os.O_RDONLY | (getattr(os, "O_DIRECTORY", 0) if directory else 0))
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def sync_data_files(root: Path, fragments: Iterable[Any]) -> None:
+    """fsyncs the files of `fragments` (FragmentMetadata or LanceFragment) and data/."""
+    for fragment in fragments:
+        for data_file in fragment.data_files():
+            _fsync(root / "data" / data_file.path)
+    _fsync(root / "data", directory=True)
+
+
+def sync_manifest(root: Path, version: int) -> None:
+    """fsyncs the manifest of `version` and the directories that name it."""
+    versions = root / "_versions"
+    for name in (f"{version}.manifest", f"{(1 << 64) - 1 - version:020d}.manifest"):  # v1 / v2 manifest paths
+        if (versions / name).exists():
+            _fsync(versions / name)
+            break
+    for directory in (versions, root / "_transactions", root):
+        if directory.exists():
+            _fsync(directory, directory=True)
+
+
+def retry_commit(op: Callable[[], Any]) -> Any:
+    """Runs op() (which must reopen the dataset itself) until it wins its commit."""
+    for attempt in range(COMMIT_RETRIES):
+        try:
+            return op()
+        except OSError as e:
+            if attempt + 1 == COMMIT_RETRIES or not _commit_conflict(e):
+                raise
+            time.sleep(0.005 * 2 ** attempt * (1 + random.random()))
+
+
+def small_fragments(ds: "lance.LanceDataset") -> int:
+    """Fragments compact_files() would still merge (read from the manifest, no data I/O)."""
+    return sum(1 for fragment in ds.get_fragments() if fragment.metadata.physical_rows < COMPACT_TARGET_ROWS)
+
+
+def ensure_dataset(path: Path, schema: pa.Schema) -> None:
+    """
+    Creates an empty dataset at `path` unless there is one. Lance's
+    mode="create" is not atomic across processes (two creators can both
+    succeed, one of them losing its rows), so the dataset is built in a
+    private directory and renamed into place: exactly one rename wins, and
+    the losers append to the winner's dataset.
+    """
+    if (path / "_versions").exists():
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = Path(tempfile.mkdtemp(prefix=f".{path.name}.", dir=path.parent))
+    try:
+        ds = lance.write_dataset(schema.empty_table(), str(tmp), schema=schema, mode="create")
+        sync_manifest(tmp, ds.version)
+        try:
+            os.rename(tmp, path)
+        except OSError:
+            if not (path / "_versions").exists():
+                raise
+        else:
+            _fsync(path.parent, directory=True)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _unindexed(ds: "lance.LanceDataset", names: Iterable[str]) -> bool:
+    return any(ds.stats.index_stats(name)["num_unindexed_fragments"] for name in names)
+
+
+def appended_since(ds: "lance.LanceDataset", version: int, columns: Columns = None) -> Iterator[Tuple[int, pa.Table]]:
+    """
+    (version, rows it appended) for every version of `ds` after `version`
+    (0 = from the start), in commit order. A commit that adds fragments and
+    drops none is an append; compaction drops the fragments it merges, so its
+    output (rows that were already there) is skipped, and index commits add
+    no fragments. Rows are read from that version's snapshot, so they stay
+    readable after later compactions.
+    """
+    before = {f.fragment_id for f in ds.checkout_version(version).get_fragments()} if version else set()
+    for v in range(version + 1, ds.version + 1):
+        at = ds.checkout_version(v)
+        fragments = at.get_fragments()
+        ids = {f.fragment_id for f in fragments}
+        if before < ids:
+            yield v, at.scanner(columns=columns, fragments=[f for f in fragments if f.fragment_id not in before]).to_table()
+        before = ids
+
+
+class HistoryStore:
+    """
+    Append-only quote history in a Lance dataset.
+
+    append() only buffers (O(1) per quote); every `batch_size` quotes, or on
+    flush(), the buffer is written as one fragment, and once the dataset holds
+    `max_fragments` small fragments they are merged. The count comes from the
+    dataset itself, so short-lived stores (one per CLI save) compact too.
+    Readers project just the columns they need, e.g. scan(["meta.trade_id", "output.total"]).
+
+    Several processes may append to one dataset, but compaction and indexing
+    belong to one of them: the others pass maintain_on_write=False.
+    """
+
+    def __init__(
+        self,
+        path: Path = HISTORY_DATASET,
+        *,
+        batch_size: int = 1000,
+        max_fragments: int = 64,
+        maintain_on_write: bool = True,
+    ) -> None:
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self.max_fragments = max_fragments
+        self.maintain_on_write = maintain_on_write
+        self.maintenance_failures = 0
+        self._buffer: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._maintain_lock = threading.Lock()
+
+    # --- write ---
+
+    def append(self, record: Mapping[str, Any], *, source_file: Optional[str] = None) -> int:
+        """Buffers one quote record and returns its quote_id."""
+        row = record_to_row(record, source_file=source_file)
+        with self._lock:
+            self._buffer.append(row)
+            full = len(self._buffer) >= self.batch_size
+        if full:
+            self.flush()
+        return row["quote_id"]
+
+    def extend(self, records: Iterable[Mapping[str, Any]]) -> List[int]:
+        return [self.append(r) for r in records]
+
+    def flush(self) -> int:
+        """Writes buffered quotes as one fragment. Returns the number of quotes written."""
+        with self._lock:
+            rows, self._buffer = self._buffer, []
+            if not rows:
+                return 0
+            self.write_rows(rows)
+        return len(rows)
+
+    def write_rows(self, rows: List[Dict[str, Any]]) -> int:
+        """
+        Appends `rows` as one commit, fsynced (data files before the commit,
+        manifest after): durable when this returns. Returns the dataset version
+        holding them. Raises only if the rows were not stored (so the caller
+        may safely write them again); the compaction and index upkeep that
+        follow are best effort, see maintain().
+        """
+        table = pa.Table.from_pylist(rows, schema=HISTORY_SCHEMA)
+        ensure_dataset(self.path, HISTORY_SCHEMA)
+        fragments = write_fragments(table, str(self.path), schema=HISTORY_SCHEMA)
+        sync_data_files(self.path, fragments)
+        ds = retry_commit(lambda: lance.LanceDataset.commit(
+            str(self.path), lance.LanceOperation.Append(fragments), read_version=self.dataset().version,
+        ))
+        try:
+            sync_manifest(self.path, ds.version)
+        except OSError as e:  # committed: raising would make the caller write the rows twice
+            log.error("fsync of %s version %d failed: %s", self.path, ds.version, e)
+        if self.maintain_on_write:
+            self.maintain(ds)
+        return ds.version
+
+    def maintain(self, ds: Optional["lance.LanceDataset"] = None) -> bool:
+        """
+        Merges small fragments (past max_fragments) and indexes new ones,
+        whoever wrote them; commits nothing when there is nothing to do.
+        Never raises: a failure is logged and counted, and the next call
+        (next write) picks up whatever is still left to do.
+        """
+        with self._maintain_lock:
+            try:
+                if ds is None:
+                    if not self.exists():
+                        return True
+                    ds = self.dataset()
+                if self.max_fragments and small_fragments(ds) >= self.max_fragments:
+                    retry_commit(lambda: self.dataset().optimize.compact_files())
+                retry_commit(lambda: self._update_indexes(self.dataset()))
+                return True
+            except Exception as e:
+                self.maintenance_failures += 1
+                log.warning("History maintenance of %s failed (retried on the next write): %s", self.path, e)
+                return False
+
+    def _update_indexes(self, ds: "lance.LanceDataset") -> None:
+        """Creates missing indexes; otherwise indexes the fragments written since."""
+        existing = {index.name for index in ds.describe_indices()}
+        missing = [column for column in HISTORY_INDEXES if f"{column}_idx" not in existing]
+        for column in missing:
+            ds.create_scalar_index(column, HISTORY_INDEXES[column])
+        if not missing and _unindexed(ds, existing):
+            ds.optimize.optimize_indices()
+
+    def close(self) -> None:
+        self.flush()
+
+    def __enter__(self) -> "HistoryStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # --- read ---
+
+    def exists(self) -> bool:
+        return (self.path / "_versions").exists()
+
+    def dataset(self) -> "lance.LanceDataset":
+        return lance.dataset(str(self.path))
+
+    def count(self, filter: Optional[str] = None) -> int:
+        if not self.exists():
+            return 0
+        return self.dataset().count_rows(filter=filter)
+
+    def scan(self, columns: Columns = None, *, filter: Optional[str] = None, limit: Optional[int] = None) -> pa.Table:
+        """Reads only `columns` (nested names like "output.total" allowed)."""
+        if not self.exists():
+            return _empty_projection(columns)
+        return self.dataset().to_table(columns=columns, filter=filter, limit=limit)
+
+    def iter_batches(
+        self,
+        columns: Columns = None,
+        *,
+        filter: Optional[str] = None,
+        batch_size: int = 65536,
+    ) -> Iterator[pa.RecordBatch]:
+        """Streams the history in record batches with bounded memory."""
+        if not self.exists():
+            return
+        scanner = self.dataset().scanner(columns=columns, filter=filter, batch_size=batch_size)
+        yield from scanner.to_batches()
+
+    def iter_records(self, *, filter: Optional[str] = None, batch_size: int = 4096) -> Iterator[Dict[str, Any]]:
+        for batch in self.iter_batches(["quote_id", "meta", "input", "output"], filter=filter, batch_size=batch_size):
+            for row in batch.to_pylist():
+                yield row_to_record(row)
+
+    def get(self, quote_id: int) -> Optional[Dict[str, Any]]:
+        table = self.scan(["quote_id", "meta", "input", "output"], filter=f"quote_id = {int(quote_id)}", limit=1)
+        rows = table.to_pylist()
+        return row_to_record(rows[0]) if rows else None
+
+    def query(self, q: HistoryQuery) -> HistoryPage:
+        """
+        Filtered, newest-first page of quotes. Every filter is served by a scalar
+        index (HISTORY_INDEXES); paging is keyset on quote_id, never an offset.
+        The page's ids are found first, reading just the quote_id column (of the
+        windows below the cursor that fill it, when unfiltered: see QUERY_WINDOWS);
+        only then are the page's rows read, by id.
+        """
+        if not self.exists():
+            return HistoryPage()
+
+        ds = self.dataset()
+        where = history_filter(q.model_copy(update={"cursor": None}))  # the cursor is the first window's upper bound
+        need = q.limit + 1
+        ids: List[int] = []
+        upper = None if q.cursor is None else int(q.cursor)  # None: the first window is open above
+        span = _id_span(ds) if where is None else None
+        if span is not None:
+            low, high, count = span
+            top = high + 1 if upper is None else min(upper, high + 1)
+            width = max(1, (high - low + 1) * need * QUERY_WINDOW_ROWS // count)
+            for _ in range(QUERY_WINDOWS):
+                lower = top - width
+                if lower <= low:
+                    break
+                ids += _newest_ids(ds, where, lower, upper, need - len(ids))
+                if len(ids) >= need:
+                    break
+                upper = top = lower
+                width *= QUERY_WINDOW_GROWTH
+        if len(ids) < need:
+            ids += _newest_ids(ds, where, None, upper, need - len(ids))
+
+        rows: List[Dict[str, Any]] = []
+        if ids:
+            table = ds.to_table(columns=["quote_id", "meta", "input", "output"], filter=f"quote_id IN ({', '.join(map(str, ids))})")
+            rows = table.sort_by([("quote_id", "descending")]).to_pylist()
+
+        next_cursor = None
+        if len(rows) > q.limit:
+            rows = rows[: q.limit]
+            next_cursor = rows[-1]["quote_id"]
+        return HistoryPage(items=[row_to_record(row) for row in rows], next_cursor=next_cursor)
+
+    # --- maintenance ---
+
+    def compact(self) -> None:
+        """Merges the small per-flush fragments into larger files."""
+        if self.exists():
+            retry_commit(lambda: self.dataset().optimize.compact_files())
+
+
+def _id_span(ds: "lance.LanceDataset") -> Optional[Tuple[int, int, int]]:
+    """(lowest, highest, count) of the indexed quote_ids, from the index metadata; None without one."""
+    if "quote_id_idx" not in {index.name for index in ds.describe_indices()}:
+        return None
+    stats = ds.stats.index_stats("quote_id_idx")
+    segments = [segment for segment in stats["indices"] if segment.get("min") is not None]
+    if not segments or not stats["num_indexed_rows"]:
+        return None
+    return (
+        min(int(segment["min"]) for segment in segments),
+        max(int(segment["max"]) for segment in segments),
+        stats["num_indexed_rows"],
+    )
+
+
+def _newest_ids(ds: "lance.LanceDataset", where: Optional[str], lower: Optional[int], upper: Optional[int], limit: int) -> List[int]:
+    """Up to `limit` quote_ids matching `where` with lower <= quote_id < upper, newest first."""
+    # Bounds first and lower before upper: Lance 1.0 reads "quote_id < a AND
+    # quote_id >= b" as an index range that includes a.
+    clauses = []
+    if lower is not None:
+        clauses.append(f"quote_id >= {lower}")
+    if upper is not None:
+        clauses.append(f"quote_id < {upper}")
+    if where:
+        clauses.append(where)
+    scanner = ds.scanner(
+        columns=["quote_id"],
+        filter=" AND ".join(clauses) or None,
+        limit=limit,
+        order_by=[ColumnOrdering("quote_id", ascending=False)],
+    )
+    return scanner.to_table().column("quote_id").to_pylist()
+
+
+# ---------- OUTCOMES ----------
+
+QUOTE_OUTCOMES = ("won", "lost", "open")
+
+OUTCOME_SCHEMA = pa.schema([
+    ("event_id", pa.int64()),  # next_quote_id(): time-ordered
+    ("quote_id", pa.int64()),
+    ("outcome", pa.string()),
+    ("decided_at", pa.timestamp("s")),
+])
+
+
+class OutcomeStore:
+    """
+    Won / lost decisions for saved quotes, kept as an append-only event log
+    next to the history (quote rows are never rewritten). The latest event for
+    a quote wins; "open" takes an earlier decision back.
+    """
+
+    def __init__(self, path: Path = OUTCOMES_DATASET, *, max_fragments: int = 64, maintain_on_write: bool = True) -> None:
+        self.path = Path(path)
+        self.max_fragments = max_fragments
+        self.maintain_on_write = maintain_on_write
+        self.maintenance_failures = 0
+        self._lock = threading.Lock()
+
+    def exists(self) -> bool:
+        return (self.path / "_versions").exists()
+
+    def dataset(self) -> "lance.LanceDataset":
+        return lance.dataset(str(self.path))
+
+    def record(self, quote_id: int, outcome: str) -> int:
+        """Appends one decision; returns its event_id."""
+        return self.append(quote_id, outcome)[0]
+
+    def append(self, quote_id: int, outcome: str) -> Tuple[int, int]:
+        """record(), returning (event_id, dataset version holding it)."""
+        if outcome not in QUOTE_OUTCOMES:
+            raise ValueError(f"Unknown outcome: {outcome!r} (use one of {', '.join(QUOTE_OUTCOMES)})")
+        event_id = next_quote_id()
+        table = pa.Table.from_pylist(
+            [{"event_id": event_id, "quote_id": int(quote_id), "outcome": outcome, "decided_at": datetime.now().replace(microsecond=0)}],
+            schema=OUTCOME_SCHEMA,
+        )
+
+        with self._lock:
+            ensure_dataset(self.path, OUTCOME_SCHEMA)
+            ds = retry_commit(lambda: lance.write_dataset(table, str(self.path), schema=OUTCOME_SCHEMA, mode="append"))
+            if self.maintain_on_write:
+                self.maintain(ds)
+        return event_id, ds.version
+
+    def maintain(self, ds: Optional["lance.LanceDataset"] = None) -> bool:
+        """Same contract as HistoryStore.maintain(): best effort, never raises."""
+        try:
+            if ds is None:
+                if not self.exists():
+                    return True
+                ds = self.dataset()
+            if self.max_fragments and small_fragments(ds) >= self.max_fragments:
+                retry_commit(lambda: self.dataset().optimize.compact_files())
+            retry_commit(lambda: self._update_index(self.dataset()))
+            return True
+        except Exception as e:
+            self.maintenance_failures += 1
+            log.warning("Outcome log maintenance of %s failed (retried on the next write): %s", self.path, e)
+            return False
+
+    @staticmethod
+    def _update_index(ds: "lance.LanceDataset") -> None:
+        # Point lookups by event_id.
+        if not ds.describe_indices():
+            ds.create_scalar_index("event_id", "BTREE")
+        elif _unindexed(ds, ["event_id_idx"]):
+            ds.optimize.optimize_indices()
+
+    def scan(self, *, filter: Optional[str] = None) -> pa.Table:
+        """Events ordered by event_id."""
+        if not self.exists():
+            return OUTCOME_SCHEMA.empty_table()
+        table = self.dataset().to_table(filter=filter)
+        return table.sort_by("event_id")
+
+    def latest(self) -> Dict[int, str]:
+        """quote_id -> "won" / "lost" for every decided quote."""
+        decided: Dict[int, str] = {}
+        table = self.scan()
+        for quote_id, outcome in zip(table.column("quote_id").to_pylist(), table.column("outcome").to_pylist()):
+            if outcome == "open":
+                decided.pop(quote_id, None)
+            else:
+                decided[quote_id] = outcome
+        return decided
+
+
+# ---------- FILTERS ----------
+
+def _sql_str(value: str) -> str:
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _sql_timestamp(value: datetime) -> str:
+    # created_at is stored as naive local time (datetime.now() in the CLI/API).
+    if value.tzinfo is not None:
+        value = value.astimezone().replace(tzinfo=None)
+    return f"TIMESTAMP '{value.strftime('%Y-%m-%d %H:%M:%S')}'"
+
+
+def history_filter(q: HistoryQuery) -> Optional[str]:
+    """HistoryQuery -> Lance SQL filter (None = no filter)."""
+    clauses: List[str] = []
+
+    for column in ("client_name", "job_address", "trade_id", "preset_id"):
+        value = getattr(q, column)
+        if value is not None:
+            clauses.append(f"meta.{column} = {_sql_str(value)}")
+    if q.pricing_type is not None:
+        clauses.append(f"meta.pricing_type = {_sql_str(q.pricing_type.value)}")
+
+    if q.created_from is not None:
+        clauses.append(f"meta.created_at >= {_sql_timestamp(q.created_from)}")
+    if q.created_to is not None:
+        clauses.append(f"meta.created_at < {_sql_timestamp(q.created_to)}")
+    if q.total_min is not None:
+        clauses.append(f"output.total >= {float(q.total_min)!r}")
+    if q.total_max is not None:
+        clauses.append(f"output.total <= {float(q.total_max)!r}")
+
+    if q.cursor is not None:
+        clauses.append(f"quote_id < {int(q.cursor)}")
+
+    return " AND ".join(clauses) or None
+
+
+def _empty_projection(columns: Columns) -> pa.Table:
+    table = HISTORY_SCHEMA.empty_table()
+    if columns is None:
+        return table
+    names = list(columns.values()) if isinstance(columns, Mapping) else list(columns)
+    aliases = list(columns.keys()) if isinstance(columns, Mapping) else names
+    arrays = []
+    for name in names:
+        top, _, nested = name.partition(".")
+        column = table.column(top)
+        if nested:
+            column = pa.chunked_array([], type=column.type.field(nested).type)
+        arrays.append(column)
+    return pa.table(arrays, names=aliases)
+
+
+# ---------- MIGRATION ----------
+
+def migrate_json_history(
+    store: HistoryStore,
+    source_dir: Path = HISTORY_DIR,
+) -> int:
+    """
+    One-shot import of legacy data/history/*.json files. Files already imported
+    (matched by source_file) are skipped, so re-running is safe.
+    Returns the number of quotes imported.
+    """
+    done = set(store.scan(["source_file"], filter="source_file IS NOT NULL").column("source_file").to_pylist())
+
+    imported = 0
+    for path in sorted(Path(source_dir).glob("*.json")):
+        if path.name in done:
+            continue
+        record = json.loads(path.read_text(encoding="utf-8"))
+        store.append(record, source_file=path.name)
+        imported += 1
+    store.flush()
+    return imported
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Quote history store")
+    sub = parser.add_subparsers(dest="command", required=True)
+    migrate = sub.add_parser("migrate", help="import legacy data/history/*.json files")
+    migrate.add_argument("--source", type=Path, default=HISTORY_DIR)
+    migrate.add_argument("--dataset", type=Path, default=HISTORY_DATASET)
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        with HistoryStore(args.dataset) as history:
+            count = migrate_json_history(history, args.source)
+        print(f"✅ Imported {count} quotes into {args.dataset}")
@@ -0,0 +1,142 @@
+# core/history_writer.py
+# Group commit для історії: квоти стають у чергу, пишуться групами (одна Lance-транзакція і один fsync на групу).
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Mapping, Optional
+
+from .history import HistoryStore, record_to_row
+
+log = logging.getLogger(__name__)
+
+
+class HistoryWriter:
+    """
+    Queues history records and writes them in groups.
+
+    submit() only builds the row and appends it to an in-memory queue, so it
+    costs microseconds on the request path. A group is written as one dataset
+    commit (one data file + one manifest, fsynced once per group) when
+    `max_batch` rows are waiting or `max_delay` seconds have passed, whichever
+    comes first. A submitted record is durable once the group holding it is
+    written; callers that must not answer before that call flush() themselves.
+
+    Drive it with `await writer.run()` inside an event loop (the API), or call
+    flush() to write everything synchronously (the CLI). aclose() / flush()
+    on shutdown make sure nothing that was submitted is lost.
+
+    `on_write(rows, version)` is called after every successful group write
+    (e.g. to update analytics) with the dataset version that holds the rows;
+    its errors are logged, never raised to the writer.
+    """
+
+    def __init__(
+        self,
+        store: HistoryStore,
+        *,
+        max_batch: int = 500,
+        max_delay: float = 0.05,
+        on_write: Optional[Callable[[List[Dict[str, Any]], int], None]] = None,
+    ) -> None:
+        self.store = store
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.on_write = on_write
+
+        self.submitted = 0
+        self.written = 0
+        self.groups = 0
+        self.failures = 0
+
+        self._queue: Deque[Dict[str, Any]] = deque()
+        self._write_lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._closing = False
+
+    @property
+    def pending(self) -> int:
+        return len(self._queue)
+
+    def submit(self, record: Mapping[str, Any]) -> int:
+        """Queues one {"meta", "input", "output"} record; returns its quote_id. Thread-safe."""
+        if self._closing:
+            raise RuntimeError("HistoryWriter is closed")
+        row = record_to_row(record)
+        self._queue.append(row)
+        self.submitted += 1
+        if len(self._queue) >= self.max_batch and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+        return row["quote_id"]
+
+    def flush(self) -> int:
+        """
+        Writes everything queued right now as one group (blocking, durable on
+        return). Returns rows written. Concurrent callers queue on one lock,
+        so every record submitted before a call is on disk when it returns.
+        """
+        with self._write_lock:
+            rows: List[Dict[str, Any]] = []
+            while self._queue:
+                rows.append(self._queue.popleft())
+            if not rows:
+                return 0
+            try:
+                version = self.store.write_rows(rows)
+            except Exception:
+                # write_rows() raises only when the append did not commit, so
+                # writing the group again cannot duplicate it. Put it back in
+                # front, in order; the next flush retries it.
+                self._queue.extendleft(reversed(rows))
+                self.failures += 1
+                raise
+            self.groups += 1
+            self.written += len(rows)
+            if self.on_write is not None:
+                try:
+                    self.on_write(rows, version)
+                except Exception:
+                    log.exception("History on_write hook failed")
+            return len(rows)
+
+    async def run(self) -> None:
+        """Group-commit loop; returns after aclose()."""
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.max_delay)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            if self._queue:
+                try:
+                    await asyncio.to_thread(self.flush)
+                except Exception as e:
+                    log.error("History group write failed (%d rows kept queued): %s", self.pending, e)
+                    await asyncio.sleep(min(1.0, self.max_delay * 10))
+
+    async def aclose(self) -> None:
+        """Stops accepting records and writes whatever is still queued."""
+        self._closing = True
+        if self._wake is not None:
+            self._wake.set()
+        await asyncio.to_thread(self.flush)
+
+    def close(self) -> None:
+        self._closing = True
+        self.flush()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "pending": self.pending,
+            "submitted": self.submitted,
+            "written": self.written,
+            "groups": self.groups,
+            "failures": self.failures,
+            "maintenance_failures": self.store.maintenance_failures,
+        }
@@ -0,0 +1,84 @@
+# core/job.py
+# Квота на весь об'єкт: багато позицій (різні preset-и), мінімум на job, GST округлюється раз на ставку.
+
+from __future__ import annotations
+
+from typing import Dict, List
+
+from .calculator import calculate_with_plan
+from .fixedpoint import CENTS, GST_SCALE, gst_fixed, to_fixed
+from .models import JobLineResult, JobRequest, JobResult, JobTaxLine, TradeConfig
+from .plans import get_plan
+
+
+def _allocate(amount: int, weights: List[int]) -> List[int]:
+    """Splits `amount` cents proportionally to `weights`; the remainder goes to the largest weight."""
+    total = sum(weights)
+    if total <= 0:
+        return [amount] + [0] * (len(weights) - 1)
+    shares = [amount * w // total for w in weights]
+    shares[weights.index(max(weights))] += amount - sum(shares)
+    return shares
+
+
+def price_job(trades: Dict[str, TradeConfig], job: JobRequest, *, fixed_point: bool = False) -> JobResult:
+    """
+    Prices every line item like calculate_quote (preset minimums apply per
+    item), then totals the job in integer cents:
+
+      items_subtotal = sum of line subtotals
+      subtotal       = max(items_subtotal, job.min_total)
+      gst            = per distinct trade gst_rate: round(taxable * rate), summed
+
+    A job-minimum top-up is spread over the GST rates in proportion to their
+    taxable amounts. Raises ValueError("items[i]: ...") for a bad line.
+    """
+    lines: List[JobLineResult] = []
+    taxable: Dict[float, int] = {}  # gst_rate -> cents, in first-seen order
+
+    for index, item in enumerate(job.items):
+        try:
+            plan = get_plan(trades, item.trade_id, item.preset_id, item.as_of)
+            result = calculate_with_plan(plan, item, fixed_point=fixed_point)
+        except ValueError as e:
+            raise ValueError(f"items[{index}]: {e}") from None
+
+        lines.append(JobLineResult(
+            index=index,
+            label=item.label,
+            trade_id=item.trade_id,
+            preset_id=item.preset_id,
+            result=result,
+        ))
+        # Line subtotals are already whole cents, so this is exact.
+        taxable[plan.gst_rate] = taxable.get(plan.gst_rate, 0) + to_fixed(result.subtotal, CENTS)
+
+    notes: List[str] = []
+    items_subtotal = sum(taxable.values())
+    adjustment = 0
+    if job.min_total is not None:
+        min_total = to_fixed(job.min_total, CENTS)
+        if items_subtotal < min_total:
+            adjustment = min_total - items_subtotal
+            for rate, share in zip(list(taxable), _allocate(adjustment, list(taxable.values()))):
+                taxable[rate] += share
+            notes.append(f"Job minimum applied: ${job.min_total}")
+
+    tax_lines = []
+    gst = 0
+    for rate, amount in taxable.items():
+        rate_gst = gst_fixed(amount, to_fixed(rate, GST_SCALE))
+        gst += rate_gst
+        tax_lines.append(JobTaxLine(gst_rate=rate, taxable=amount / CENTS, gst=rate_gst / CENTS))
+
+    subtotal = items_subtotal + adjustment
+    return JobResult(
+        items=lines,
+        items_subtotal=items_subtotal / CENTS,
+        min_total_adjustment=adjustment / CENTS,
+        subtotal=subtotal / CENTS,
+        gst_by_rate=tax_lines,
+        gst=gst / CENTS,
+        total=(subtotal + gst) / CENTS,
+        notes=notes,
+    )
@@ -0,0 +1,184 @@
+# core/live.py
+# Жива квота: стан сесії + граф залежностей етапів; при зміні поля перераховуються лише залежні етапи.
+
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, List, Mapping, Optional, Set, Tuple
+
+from .calculator import _money, calculate_with_plan
+from .models import QuoteRequest, QuoteResult
+from .plans import PricingPlan
+from .rules import effective_area
+
+# A stage computes one value (plus its notes) from request fields and earlier stages.
+StageFn = Callable[[PricingPlan, QuoteRequest, Dict[str, Any]], Tuple[Any, List[str]]]
+
+
+def _toggles(plan: PricingPlan, req: QuoteRequest, v: Dict[str, Any]) -> Tuple[Any, List[str]]:
+    include_labor = plan.include_labor if req.include_labor is None else bool(req.include_labor)
+    include_materials = plan.include_materials if req.include_materials is None else bool(req.include_materials)
+    notes = []
+    if not include_labor:
+        notes.append("Labor excluded.")
+    if not include_materials:
+        notes.append("Materials excluded.")
+    return (include_labor, include_materials), notes
+
+
+def _labor_rate(plan: PricingPlan, req: QuoteRequest, v: Dict[str, Any]) -> Tuple[Any, List[str]]:
+    labor_rate = plan.labor_rate if req.labor_rate_per_sqft is None else float(req.labor_rate_per_sqft)
+    if plan.min_labor_rate is not None and labor_rate < plan.min_labor_rate:
+        return plan.min_labor_rate, [plan.min_labor_rate_note]
+    return labor_rate, []
+
+
+def _material_rate(plan: PricingPlan, req: QuoteRequest, v: Dict[str, Any]) -> Tuple[Any, List[str]]:
+    return (plan.material_rate if req.material_rate_per_sqft is None else float(req.material_rate_per_sqft)), []
+
+
+def _eff_area(plan: PricingPlan, req: QuoteRequest, v: Dict[str, Any]) -> Tuple[Any, List[str]]:
+    area = float(req.area_sqft)
+    if not v["toggles"][1]:
+        return area, []
+    waste = plan.waste_pct if req.waste_pct is None else float(req.waste_pct)
+    return effective_area(area, waste), []
+
+
+def _labor_cost(plan: PricingPlan, req: QuoteRequest, v: Dict[str, Any]) -> Tuple[Any, List[str]]:
+    return (float(req.area_sqft) * v["labor_rate"] if v["toggles"][0] else 0.0), []
+
+
+def _material_cost(plan: PricingPlan, req: QuoteRequest, v: Dict[str, Any]) -> Tuple[Any, List[str]]:
+    return (v["eff_area"] * v["material_rate"] if v["toggles"][1] else 0.0), []
+
+
+def _extras(plan: PricingPlan, req: QuoteRequest, v: Dict[str, Any]) -> Tuple[Any, List[str]]:
+    """(handling fee, markup amount)."""
+    if not (req.full_service_materials and v["toggles"][1]):
+        return (0.0, 0.0), []
+    handling_fee = plan.handling_fee if req.materials_handling_fee is None else float(req.materials_handling_fee)
+    markup_pct = plan.markup_pct if req.materials_markup_pct is None else float(req.materials_markup_pct)
+    return (handling_fee, v["material_cost"] * (markup_pct / 100.0)), ["Full-service materials enabled (handling + markup)."]
+
+
+def _subtotal(plan: PricingPlan, req: QuoteRequest, v: Dict[str, Any]) -> Tuple[Any, List[str]]:
+    handling_fee, markup_amount = v["extras"]
+    auto_subtotal = v["labor_cost"] + v["material_cost"] + handling_fee + markup_amount
+    notes: List[str] = []
+    if req.use_manual_total:
+        if req.manual_total is None:
+            raise ValueError("manual_total is required when use_manual_total=true")
+        subtotal = float(req.manual_total)
+        notes.append("CUSTOM pricing: manual total override used (labor/materials shown for reference).")
+        if subtotal < v["labor_cost"]:
+            notes.append("⚠️ WARNING: manual total is lower than labor cost.")
+        return subtotal, notes
+    subtotal, _applied = plan.subtotal_rule(plan, auto_subtotal, notes)
+    return subtotal, notes
+
+
+def _gst(plan: PricingPlan, req: QuoteRequest, v: Dict[str, Any]) -> Tuple[Any, List[str]]:
+    return v["subtotal"] * plan.gst_rate, []
+
+
+# Topological order; each stage lists what it reads (request fields or earlier stages).
+# Notes are concatenated in this order, which is the order calculate_with_plan emits them.
+STAGES: Tuple[Tuple[str, Tuple[str, ...], StageFn], ...] = (
+    ("labor_rate", ("labor_rate_per_sqft",), _labor_rate),
+    ("toggles", ("include_labor", "include_materials"), _toggles),
+    ("material_rate", ("material_rate_per_sqft",), _material_rate),
+    ("eff_area", ("area_sqft", "waste_pct", "toggles"), _eff_area),
+    ("labor_cost", ("area_sqft", "labor_rate", "toggles"), _labor_cost),
+    ("material_cost", ("eff_area", "material_rate", "toggles"), _material_cost),
+    ("extras", ("full_service_materials", "materials_handling_fee", "materials_markup_pct", "material_cost", "toggles"), _extras),
+    ("subtotal", ("labor_cost", "material_cost", "extras", "use_manual_total", "manual_total"), _subtotal),
+    ("gst", ("subtotal",), _gst),
+)
+
+STAGE_NAMES: Tuple[str, ...] = tuple(name for name, _inputs, _fn in STAGES)
+
+
+class LiveQuote:
+    """
+    One live-quote session: the last valid request, its plan, and every stage
+    value. update() diffs the new request against the old one and re-runs only
+    the stages downstream of the changed fields; a stage whose value comes out
+    unchanged stops the propagation (e.g. a labor rate still under the
+    minimum). A new trade/preset (plan) recomputes everything.
+
+    fixed_point=True prices with core.fixedpoint on every update instead; its
+    rounding is per stage in integer units, so it is not split up here.
+    """
+
+    def __init__(self, *, fixed_point: bool = False) -> None:
+        self.fixed_point = fixed_point
+        self.plan: Optional[PricingPlan] = None
+        self.req: Optional[QuoteRequest] = None
+        self.result: Optional[QuoteResult] = None
+        self._values: Dict[str, Any] = {}
+        self._notes: Dict[str, List[str]] = {}
+
+    def update(self, plan: PricingPlan, req: QuoteRequest) -> Tuple[QuoteResult, List[str]]:
+        """Prices `req`; returns (result, names of the stages that were recomputed)."""
+        if self.fixed_point:
+            result = calculate_with_plan(plan, req, fixed_point=True)
+            self.plan, self.req, self.result = plan, req, result
+            return result, list(STAGE_NAMES)
+
+        if plan is not self.plan or self.req is None:
+            dirty: Optional[Set[str]] = None  # everything
+        else:
+            dirty = {name for name in QuoteRequest.model_fields if getattr(req, name) != getattr(self.req, name)}
+            if not dirty and self.result is not None:
+                return self.result, []
+
+        values = dict(self._values)
+        notes = dict(self._notes)
+        ran: List[str] = []
+        for name, inputs, fn in STAGES:
+            if dirty is not None and dirty.isdisjoint(inputs):
+                continue
+            value, stage_notes = fn(plan, req, values)  # may raise ValueError; state is untouched then
+            ran.append(name)
+            if dirty is not None and name in values and value == values[name] and stage_notes == notes.get(name):
+                continue  # unchanged: downstream stages stay valid
+            values[name] = value
+            notes[name] = stage_notes
+            if dirty is not None:
+                dirty.add(name)
+
+        self.plan, self.req, self._values, self._notes = plan, req, values, notes
+        self.result = self._build()
+        return self.result, ran
+
+    def _build(self) -> QuoteResult:
+        v = self._values
+        handling_fee, markup_amount = v["extras"]
+        subtotal = v["subtotal"]
+        gst = v["gst"]
+        return QuoteResult(
+            actual_area_sqft=_money(float(self.req.area_sqft)),
+            effective_area_sqft=_money(v["eff_area"]),
+            labor_cost=_money(v["labor_cost"]),
+            material_cost=_money(v["material_cost"]),
+            materials_markup_amount=_money(markup_amount),
+            materials_handling_fee=_money(handling_fee),
+            subtotal=_money(subtotal),
+            gst=_money(gst),
+            total=_money(subtotal + gst),
+            notes=[note for name in STAGE_NAMES for note in self._notes[name]],
+        )
+
+
+def merge_fields(fields: Dict[str, Any], delta: Mapping[str, Any]) -> Dict[str, Any]:
+    """Applies a field delta to the session's raw form; a null value resets the field to its default."""
+    unknown = [name for name in delta if name not in QuoteRequest.model_fields]
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(sorted(unknown))}")
+    merged = dict(fields)
+    for name, value in delta.items():
+        if value is None:
+            merged.pop(name, None)
+        else:
+            merged[name] = value
+    return merged
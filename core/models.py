@@ -1,9 +1,10 @@
 # core/models.py
 from __future__ import annotations
 
+from datetime import datetime
 from enum import Enum
-from typing import Optional, Dict, List
-from pydantic import BaseModel, Field
+from typing import Any, Literal, Optional, Dict, List
+from pydantic import BaseModel, Field, field_validator, model_validator
 
 
 class PricingType(str, Enum):
@@ -32,12 +33,73 @@ class PresetConfig(BaseModel):
     default_full_service_handling_fee: float = 0
     default_full_service_markup_pct: float = 0
 
+    # Effective-dated rate changes; the fields above apply before the first one.
+    versions: List[PresetRateVersion] = Field(default_factory=list)
+
+    @field_validator("versions")
+    @classmethod
+    def _sorted_versions(cls, versions: List[PresetRateVersion]) -> List[PresetRateVersion]:
+        return _sorted_by_start(versions)
+
+
+class PresetRateVersion(BaseModel):
+    """
+    Preset rates from `effective_from` on. Only the fields given change; the
+    others carry over from the previous version (or the preset itself).
+    """
+
+    effective_from: datetime
+
+    default_waste_pct: Optional[float] = None
+    default_labor_rate_per_sqft: Optional[float] = None
+    default_material_rate_per_sqft: Optional[float] = None
+    min_total: Optional[float] = None  # explicit null removes the minimum
+    min_labor_rate_per_sqft: Optional[float] = None
+    default_full_service_handling_fee: Optional[float] = None
+    default_full_service_markup_pct: Optional[float] = None
+
+    @model_validator(mode="after")
+    def _no_null_defaults(self) -> "PresetRateVersion":
+        for name in self.model_fields_set - {"effective_from", "min_total", "min_labor_rate_per_sqft"}:
+            if getattr(self, name) is None:
+                raise ValueError(f"{name} cannot be null")
+        return self
+
+    def changes(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.model_fields_set if name != "effective_from"}
+
+
+class TradeRateVersion(BaseModel):
+    effective_from: datetime
+    gst_rate: float = Field(ge=0, le=1)
+
+
+def _local(when: datetime) -> datetime:
+    """Naive local time (an offset, if given, is converted)."""
+    return when.astimezone().replace(tzinfo=None) if when.tzinfo is not None else when
+
+
+def _sorted_by_start(versions: list) -> list:
+    versions = sorted(versions, key=lambda v: _local(v.effective_from))
+    for before, after in zip(versions, versions[1:]):
+        if _local(before.effective_from) == _local(after.effective_from):
+            raise ValueError(f"Two versions start at {after.effective_from.isoformat()}")
+    return versions
+
 
 class TradeConfig(BaseModel):
     label: str
     gst_rate: float = Field(default=0.05, ge=0, le=1)
     presets: Dict[str, PresetConfig] = Field(default_factory=dict)
 
+    # Effective-dated GST changes; gst_rate applies before the first one.
+    versions: List[TradeRateVersion] = Field(default_factory=list)
+
+    @field_validator("versions")
+    @classmethod
+    def _sorted_versions(cls, versions: List[TradeRateVersion]) -> List[TradeRateVersion]:
+        return _sorted_by_start(versions)
+
 
 # --- Request/Result for calculator/API ---
 
@@ -63,6 +125,9 @@ class QuoteRequest(BaseModel):
     use_manual_total: bool = False
     manual_total: Optional[float] = Field(default=None, ge=0)
 
+    # Price with the rate version in effect at this time (default: now).
+    as_of: Optional[datetime] = None
+
 
 class QuoteResult(BaseModel):
     actual_area_sqft: float
@@ -78,4 +143,242 @@ class QuoteResult(BaseModel):
     gst: float
     total: float
 
-    notes: List[str] = Field(default_factory=list)
\ No newline at end of file
+    notes: List[str] = Field(default_factory=list)
+
+
+# --- Multi-item job ---
+
+MAX_JOB_ITEMS = 500
+
+
+class JobItem(QuoteRequest):
+    """One area of a job (floor, splash, shower...) under its own preset."""
+
+    label: str = ""
+
+
+class JobRequest(BaseModel):
+    items: List[JobItem] = Field(min_length=1, max_length=MAX_JOB_ITEMS)
+    # Job-level minimum on the pre-GST subtotal (on top of each preset's own rules).
+    min_total: Optional[float] = Field(default=None, ge=0)
+
+
+class JobLineResult(BaseModel):
+    index: int
+    label: str
+    trade_id: str
+    preset_id: str
+    # Priced exactly like a single quote; its gst/total are for reference only,
+    # the job's GST is computed once per rate (JobResult.gst_by_rate).
+    result: QuoteResult
+
+
+class JobTaxLine(BaseModel):
+    gst_rate: float
+    taxable: float
+    gst: float
+
+
+class JobResult(BaseModel):
+    items: List[JobLineResult]
+    items_subtotal: float  # sum of line subtotals
+    min_total_adjustment: float  # added to reach JobRequest.min_total
+    subtotal: float
+    gst_by_rate: List[JobTaxLine]
+    gst: float
+    total: float
+    notes: List[str] = Field(default_factory=list)
+
+
+# --- What-if sweep ---
+
+SweepParam = Literal[
+    "area_sqft",
+    "waste_pct",
+    "labor_rate_per_sqft",
+    "material_rate_per_sqft",
+    "materials_handling_fee",
+    "materials_markup_pct",
+]
+
+
+class SweepAxis(BaseModel):
+    """One swept QuoteRequest field: explicit `values`, or start..stop (inclusive) by step."""
+
+    param: SweepParam
+    values: Optional[List[float]] = None
+
+    start: Optional[float] = None
+    stop: Optional[float] = None
+    step: Optional[float] = Field(default=None, gt=0)
+
+    @model_validator(mode="after")
+    def _check_range(self) -> "SweepAxis":
+        has_range = None not in (self.start, self.stop, self.step)
+        if (self.values is None) == (not has_range):
+            raise ValueError("give either values or start/stop/step")
+        if has_range and self.stop < self.start:
+            raise ValueError("stop must be >= start")
+        return self
+
+
+class SweepRequest(BaseModel):
+    base: QuoteRequest
+    axes: List[SweepAxis] = Field(min_length=1, max_length=3)
+
+    @model_validator(mode="after")
+    def _check_axes(self) -> "SweepRequest":
+        params = [axis.param for axis in self.axes]
+        if len(set(params)) != len(params):
+            raise ValueError("each param can be swept only once")
+        return self
+
+
+# --- Reverse solver ---
+
+SolveParam = Literal[
+    "labor_rate_per_sqft",
+    "material_rate_per_sqft",
+    "area_sqft",
+    "materials_markup_pct",
+]
+
+
+class SolveRequest(BaseModel):
+    """Which `solve_for` value makes `base` cost `target_total` (incl. GST)?"""
+
+    base: QuoteRequest
+    solve_for: SolveParam
+    target_total: float = Field(ge=0)
+
+
+class SolveResult(BaseModel):
+    solve_for: SolveParam
+    target_total: float
+    # None = no solution (see `reason`).
+    value: Optional[float] = None  # exact_value rounded up to 0.01 (down on a minimum plateau)
+    exact_value: Optional[float] = None
+    achieved_total: Optional[float] = None  # total priced with `value`
+    # FLAT_MIN_TOTAL plateau: every value up to `value` gives the minimum total.
+    on_minimum: bool = False
+    reason: Optional[str] = None
+    result: Optional[QuoteResult] = None
+
+
+# --- History lookup ---
+
+class HistoryQuery(BaseModel):
+    client_name: Optional[str] = None
+    job_address: Optional[str] = None
+    trade_id: Optional[str] = None
+    preset_id: Optional[str] = None
+    pricing_type: Optional[PricingType] = None
+
+    created_from: Optional[datetime] = None  # inclusive
+    created_to: Optional[datetime] = None  # exclusive
+    total_min: Optional[float] = None
+    total_max: Optional[float] = None
+
+    # Keyset pagination: newest first; pass next_cursor of the previous page.
+    limit: int = Field(default=50, ge=1, le=1000)
+    cursor: Optional[int] = None
+
+
+class HistoryPage(BaseModel):
+    items: List[Dict[str, Any]] = Field(default_factory=list)
+    next_cursor: Optional[int] = None
+
+
+class HistorySaveRequest(BaseModel):
+    quote: QuoteRequest
+    client_name: str = ""
+    job_address: str = ""
+
+
+class HistorySaveResult(BaseModel):
+    quote_id: int
+    result: QuoteResult
+
+
+# ---------- OUTCOMES / ANALYTICS ----------
+
+QuoteOutcome = Literal["won", "lost", "open"]  # "open" clears an earlier decision
+AnalyticsDimension = Literal["trade", "preset", "month", "client"]
+
+
+class OutcomeRequest(BaseModel):
+    outcome: QuoteOutcome
+
+
+class OutcomeResult(BaseModel):
+    quote_id: int
+    outcome: QuoteOutcome
+    event_id: int
+
+
+class AnalyticsQuery(BaseModel):
+    """Ad-hoc group-by over the history; the filters mean the same as in HistoryQuery."""
+
+    by: List[AnalyticsDimension] = Field(default_factory=lambda: ["trade"], min_length=1, max_length=4)
+
+    client_name: Optional[str] = None
+    trade_id: Optional[str] = None
+    preset_id: Optional[str] = None
+    pricing_type: Optional[PricingType] = None
+    created_from: Optional[datetime] = None  # inclusive
+    created_to: Optional[datetime] = None  # exclusive
+
+    limit: Optional[int] = Field(default=None, ge=1, le=10_000)  # top groups by revenue
+
+
+class RepriceQuery(BaseModel):
+    """Which saved quotes to re-price against the current config; the filters mean the same as in HistoryQuery."""
+
+    client_name: Optional[str] = None
+    trade_id: Optional[str] = None
+    preset_id: Optional[str] = None
+    pricing_type: Optional[PricingType] = None
+    created_from: Optional[datetime] = None  # inclusive
+    created_to: Optional[datetime] = None  # exclusive
+
+    include_decided: bool = False  # won / lost quotes too (default: open quotes only)
+    keep_rates: bool = False  # keep each quote's saved rates: only minimums, rules and GST move
+    changed_only: bool = True  # report rows whose total changed (or that now fail)
+
+
+DocumentFormat = Literal["txt", "html"]
+
+
+class ExportQuery(BaseModel):
+    """Saved quotes to render into one zip of documents; the filters mean the same as in HistoryQuery."""
+
+    format: DocumentFormat = "html"
+
+    client_name: Optional[str] = None
+    job_address: Optional[str] = None
+    trade_id: Optional[str] = None
+    preset_id: Optional[str] = None
+    pricing_type: Optional[PricingType] = None
+    created_from: Optional[datetime] = None  # inclusive
+    created_to: Optional[datetime] = None  # exclusive
+    total_min: Optional[float] = None
+    total_max: Optional[float] = None
+
+
+class AnalyticsRow(BaseModel):
+    key: Dict[str, str] = Field(default_factory=dict)
+    quotes: int = 0
+    revenue: float = 0.0  # sum of totals (GST included)
+    area_sqft: float = 0.0
+    avg_quote: Optional[float] = None
+    avg_price_per_sqft: Optional[float] = None  # subtotal / area, before GST
+    won: int = 0
+    lost: int = 0
+    win_rate: Optional[float] = None  # won / (won + lost); open quotes do not count
+    won_revenue: float = 0.0
+
+
+class AnalyticsReport(BaseModel):
+    by: List[AnalyticsDimension]
+    rows: List[AnalyticsRow] = Field(default_factory=list)
+    totals: AnalyticsRow = Field(default_factory=AnalyticsRow)
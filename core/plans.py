@@ -0,0 +1,276 @@
+# core/plans.py
+# Скомпільовані (immutable) плани цін: один PricingPlan на (trade_id, preset_id).
+
+from __future__ import annotations
+
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from .models import TradeConfig, PresetConfig, PricingType
+
+PlanKey = Tuple[str, str]
+PlanIndex = Dict[PlanKey, "PricingPlan"]
+
+# Rule applied to the auto subtotal when no manual total is used:
+# (plan, subtotal, notes) -> (subtotal, applied); applied = the rule replaced the subtotal.
+SubtotalRule = Callable[["PricingPlan", float, List[str]], Tuple[float, bool]]
+
+
+def _rule_flat_min_total(plan: "PricingPlan", subtotal: float, notes: List[str]) -> Tuple[float, bool]:
+    if plan.min_total is not None and subtotal < plan.min_total:
+        notes.append(plan.min_total_note)
+        return plan.min_total, True
+    return subtotal, False
+
+
+def _rule_min_rate_per_sqft(plan: "PricingPlan", subtotal: float, notes: List[str]) -> Tuple[float, bool]:
+    # The min labor rate is enforced on the rate itself (PricingPlan.min_labor_rate).
+    return subtotal, False
+
+
+def _rule_custom(plan: "PricingPlan", subtotal: float, notes: List[str]) -> Tuple[float, bool]:
+    notes.append("CUSTOM pricing: auto calculated.")
+    return subtotal, False
+
+
+_SUBTOTAL_RULES: Dict[PricingType, SubtotalRule] = {
+    PricingType.FLAT_MIN_TOTAL: _rule_flat_min_total,
+    PricingType.MIN_RATE_PER_SQFT: _rule_min_rate_per_sqft,
+    PricingType.CUSTOM: _rule_custom,
+}
+
+
+class PricingPlan:
+    """
+    Preset + trade, resolved once per config load: every default is already a
+    float and the pricing-type rule is already picked. Immutable.
+    """
+
+    __slots__ = (
+        "trade_id",
+        "preset_id",
+        "trade",
+        "preset",
+        "pricing_type",
+        "include_labor",
+        "include_materials",
+        "waste_pct",
+        "labor_rate",
+        "material_rate",
+        "handling_fee",
+        "markup_pct",
+        "min_total",
+        "min_total_note",
+        "min_labor_rate",
+        "min_labor_rate_note",
+        "gst_rate",
+        "subtotal_rule",
+        "effective_from",
+        "timeline",
+    )
+
+    trade_id: str
+    preset_id: str
+    trade: TradeConfig
+    preset: PresetConfig
+    pricing_type: PricingType
+    include_labor: bool
+    include_materials: bool
+    waste_pct: float
+    labor_rate: float
+    material_rate: float
+    handling_fee: float
+    markup_pct: float
+    min_total: Optional[float]
+    min_total_note: str
+    min_labor_rate: Optional[float]  # only set for MIN_RATE_PER_SQFT
+    min_labor_rate_note: str
+    gst_rate: float
+    subtotal_rule: SubtotalRule
+    effective_from: Optional[datetime]  # start of the rate version (None = the base rates)
+    timeline: Optional["PlanTimeline"]  # set on the base plan of a preset with versions
+
+    def __init__(
+        self,
+        trade_id: str,
+        preset_id: str,
+        trade: TradeConfig,
+        preset: PresetConfig,
+        *,
+        gst_rate: Optional[float] = None,
+        effective_from: Optional[datetime] = None,
+    ) -> None:
+        pricing_type = PricingType(preset.pricing_type)
+        min_labor = preset.min_labor_rate_per_sqft
+        if pricing_type != PricingType.MIN_RATE_PER_SQFT:
+            min_labor = None
+
+        init = object.__setattr__
+        init(self, "trade_id", trade_id)
+        init(self, "preset_id", preset_id)
+        init(self, "trade", trade)
+        init(self, "preset", preset)
+        init(self, "pricing_type", pricing_type)
+        init(self, "include_labor", bool(preset.include_labor))
+        init(self, "include_materials", bool(preset.include_materials))
+        init(self, "waste_pct", float(preset.default_waste_pct))
+        init(self, "labor_rate", float(preset.default_labor_rate_per_sqft))
+        init(self, "material_rate", float(preset.default_material_rate_per_sqft))
+        init(self, "handling_fee", float(preset.default_full_service_handling_fee))
+        init(self, "markup_pct", float(preset.default_full_service_markup_pct))
+        init(self, "min_total", None if preset.min_total is None else float(preset.min_total))
+        init(self, "min_total_note", f"Flat minimum applied: ${preset.min_total}")
+        init(self, "min_labor_rate", None if min_labor is None else float(min_labor))
+        init(self, "min_labor_rate_note", f"Labor rate raised to min ${min_labor}/sqft")
+        init(self, "gst_rate", float(trade.gst_rate if gst_rate is None else gst_rate))
+        init(self, "subtotal_rule", _SUBTOTAL_RULES[pricing_type])
+        init(self, "effective_from", effective_from)
+        init(self, "timeline", None)
+
+    def __setattr__(self, name: str, value) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __repr__(self) -> str:
+        since = "" if self.effective_from is None else f", from {self.effective_from.isoformat()}"
+        return f"PricingPlan({self.trade_id!r}, {self.preset_id!r}, {self.pricing_type.value}{since})"
+
+
+# ---------- RATE VERSIONS ----------
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def wall_us(when: Optional[datetime] = None) -> int:
+    """
+    Local wall-clock time as integer microseconds (the version index key).
+    Naive datetimes are local time, like history created_at; aware ones are
+    converted. None = now.
+    """
+    if when is None:
+        when = datetime.now()
+    elif when.tzinfo is not None:
+        when = when.astimezone().replace(tzinfo=None)
+    return (when - _EPOCH) // _MICROSECOND
+
+
+class PlanTimeline:
+    """
+    Every rate version of one preset as a sorted interval index: plans[0] is
+    the base rates, plans[i + 1] applies from starts[i] on. at() is a bisect,
+    O(log n) in the number of versions.
+    """
+
+    __slots__ = ("starts", "plans")
+
+    def __init__(self, starts: Sequence[int], plans: Sequence[PricingPlan]) -> None:
+        self.starts = list(starts)  # wall_us, ascending
+        self.plans = list(plans)
+
+    def index(self, when_us: int) -> int:
+        return bisect_right(self.starts, when_us)
+
+    def at(self, when: Optional[datetime] = None) -> PricingPlan:
+        return self.plans[bisect_right(self.starts, wall_us(when))]
+
+
+def _timeline(trade_id: str, preset_id: str, trade: TradeConfig, preset: PresetConfig, base: PricingPlan) -> PlanTimeline:
+    """Base plan + one plan per distinct start of a preset or trade (GST) version."""
+    changes: Dict[datetime, List] = {}
+    for version in preset.versions:
+        changes.setdefault(version.effective_from, []).append(version)
+    for version in trade.versions:
+        changes.setdefault(version.effective_from, []).append(version)
+
+    starts: List[int] = []
+    plans = [base]
+    rates: Dict[str, object] = {}
+    gst_rate = float(trade.gst_rate)
+    for start in sorted(changes, key=wall_us):
+        for version in changes[start]:
+            if hasattr(version, "gst_rate"):
+                gst_rate = float(version.gst_rate)
+            else:
+                rates.update(version.changes())
+        effective = preset.model_copy(update=rates)
+        starts.append(wall_us(start))
+        plans.append(PricingPlan(trade_id, preset_id, trade, effective, gst_rate=gst_rate, effective_from=start))
+    return PlanTimeline(starts, plans)
+
+
+def compile_plans(trades: Dict[str, TradeConfig]) -> PlanIndex:
+    """
+    Compiles every preset of every trade into a PricingPlan (its base rates).
+    Presets with rate versions (own or the trade's GST) get a PlanTimeline on
+    that base plan; get_plan() picks the version.
+    """
+    plans: PlanIndex = {}
+    for trade_id, trade in trades.items():
+        for preset_id, preset in trade.presets.items():
+            plan = PricingPlan(trade_id, preset_id, trade, preset)
+            if preset.versions or trade.versions:
+                object.__setattr__(plan, "timeline", _timeline(trade_id, preset_id, trade, preset, plan))
+            plans[(trade_id, preset_id)] = plan
+    return plans
+
+
+# ---------- CACHE ----------
+
+# Compiled plans per trades dict (by identity). A reload builds a new dict, so
+# it gets new plans; the least recently used entry ages out. Trades dicts are
+# treated as immutable once loaded. Compiling happens outside the lock; two
+# threads missing at once both compile and the later insert wins.
+_PLAN_CACHE_SIZE = 16
+_plan_cache_size = _PLAN_CACHE_SIZE
+_plan_cache: "OrderedDict[int, Tuple[Dict[str, TradeConfig], PlanIndex]]" = OrderedDict()
+_plan_cache_lock = threading.Lock()
+
+
+def reserve_plan_cache(entries: int) -> None:
+    """Room for `entries` more live trades dicts (e.g. resident tenant configs) on top of the default."""
+    global _plan_cache_size
+    with _plan_cache_lock:
+        _plan_cache_size = _PLAN_CACHE_SIZE + max(0, entries)
+
+
+def forget_plans(trades: Dict[str, TradeConfig]) -> None:
+    """Drops the compiled plans of a trades dict that is no longer served."""
+    with _plan_cache_lock:
+        entry = _plan_cache.get(id(trades))
+        if entry is not None and entry[0] is trades:
+            del _plan_cache[id(trades)]
+
+
+def plans_for(trades: Dict[str, TradeConfig]) -> PlanIndex:
+    key = id(trades)
+    with _plan_cache_lock:
+        entry = _plan_cache.get(key)
+        if entry is not None and entry[0] is trades:
+            _plan_cache.move_to_end(key)
+            return entry[1]
+
+    plans = compile_plans(trades)
+    with _plan_cache_lock:
+        _plan_cache[key] = (trades, plans)
+        _plan_cache.move_to_end(key)
+        while len(_plan_cache) > _plan_cache_size:
+            _plan_cache.popitem(last=False)
+    return plans
+
+
+def get_plan(trades: Dict[str, TradeConfig], trade_id: str, preset_id: str, as_of: Optional[datetime] = None) -> PricingPlan:
+    """The plan of a preset with the rates in effect at `as_of` (default: now)."""
+    plan = plans_for(trades).get((trade_id, preset_id))
+    if plan is not None:
+        return plan if plan.timeline is None else plan.timeline.at(as_of)
+
+    # Same errors as before plans existed.
+    if trade_id not in trades:
+        raise ValueError(f"Unknown trade_id: {trade_id}")
+    raise ValueError(f"Unknown preset_id: {preset_id} for trade {trade_id}")
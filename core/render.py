@@ -0,0 +1,337 @@
+# core/render.py
+# Документи квот: шаблони (text / HTML) компілюються в Python-функції один раз і кешуються; record -> документ; масовий експорт у zip.
+
+from __future__ import annotations
+
+import csv
+import html
+import io
+import multiprocessing
+import re
+import threading
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterator, List, Mapping, Optional, Tuple
+
+TEMPLATES_DIR = Path(__file__).resolve().parent / "templates"
+
+# Document format -> template file (in TEMPLATES_DIR or a directory of your own).
+FORMATS: Dict[str, str] = {"txt": "quote.txt", "html": "quote.html"}
+MEDIA_TYPES: Dict[str, str] = {"txt": "text/plain; charset=utf-8", "html": "text/html; charset=utf-8"}
+
+DEFAULT_EXPORT_CHUNK = 1024  # records rendered per task
+
+
+class TemplateError(ValueError):
+    pass
+
+
+# ---------- TEMPLATE LANGUAGE ----------
+#
+#   {{ output.total|money }}            value (dotted path into the context) + filters
+#   {% if meta.client_name %} ... {% else %} ... {% endif %}   ("if not ..." too)
+#   {% for note in output.notes %} ... {% endfor %}
+#
+# A newline right after a {% %} tag is dropped, so tags can sit on their own
+# lines. Missing values render as "". .html templates escape every value.
+
+def _money(x: Any) -> str:
+    return "" if x is None else f"${float(x):,.2f}"
+
+
+def _number(x: Any) -> str:
+    return "" if x is None else f"{float(x):,.2f}"
+
+
+def _pct(x: Any) -> str:
+    return "" if x is None else f"{float(x):.2f}%"
+
+
+def _date(x: Any) -> str:
+    if x is None:
+        return ""
+    return x.isoformat()[:10] if isinstance(x, datetime) else str(x)[:10]
+
+
+FILTERS: Dict[str, Callable[[Any], str]] = {
+    "money": _money,
+    "sqft": _number,
+    "number": _number,
+    "pct": _pct,
+    "date": _date,
+    "upper": lambda x: "" if x is None else str(x).upper(),
+}
+
+_TAG = re.compile(r"{{(.*?)}}|{%(.*?)%}\n?", re.S)
+_PATH = re.compile(r"[A-Za-z_]\w*(?:\.[A-Za-z_]\w*)*")
+_NAME = re.compile(r"[A-Za-z_]\w*")
+
+
+def _get(obj: Any, key: str) -> Any:
+    if type(obj) is dict:  # the common case, without the ABC check
+        return obj.get(key)
+    if obj is None:
+        return None
+    if isinstance(obj, Mapping):
+        return obj.get(key)
+    return getattr(obj, key, None)
+
+
+def _text(value: Any) -> str:
+    return "" if value is None else str(value)
+
+
+_RUNTIME: Dict[str, Any] = {
+    "__builtins__": {},
+    "_get": _get,
+    "_text": _text,
+    "_escape": html.escape,
+    **{f"_f_{name}": fn for name, fn in FILTERS.items()},
+}
+
+
+class Template:
+    """A compiled template: render(context) runs plain Python, no parsing per document."""
+
+    def __init__(self, source: str, *, name: str = "<template>", autoescape: bool = False) -> None:
+        self.name = name
+        self.autoescape = autoescape
+        self.code = _compile(source, name, autoescape)
+        namespace = dict(_RUNTIME)
+        exec(compile(self.code, name, "exec"), namespace)
+        self._render: Callable[[Mapping[str, Any]], str] = namespace["render"]
+
+    def render(self, context: Mapping[str, Any]) -> str:
+        return self._render(context)
+
+
+def _compile(source: str, name: str, autoescape: bool) -> str:
+    """Template source -> Python source of `def render(ctx)`."""
+    lines = ["def render(ctx):", " out = []", " w = out.append"]
+    depth = 1
+    blocks: List[Tuple[str, int]] = []  # open if / for tags: (kind, line); an if past its else is "else"
+    loop_names: List[str] = []
+
+    def fail(message: str, pos: int) -> TemplateError:
+        return TemplateError(f"{name}:{source.count(chr(10), 0, pos) + 1}: {message}")
+
+    def path(expr: str, pos: int) -> str:
+        if not _PATH.fullmatch(expr):
+            raise fail(f"Expected a name or dotted path, got {expr!r}", pos)
+        first, *rest = expr.split(".")
+        code = f"v_{first}" if first in loop_names else f"_get(ctx, {first!r})"
+        for key in rest:
+            code = f"_get({code}, {key!r})"
+        return code
+
+    def emit(code: str) -> None:
+        lines.append(" " * depth + code)
+
+    pos = 0
+    for m in _TAG.finditer(source):
+        if m.start() > pos:
+            emit(f"w({source[pos:m.start()]!r})")
+        pos = m.end()
+
+        if m.group(1) is not None:  # {{ value|filter }}
+            expr, *filters = [part.strip() for part in m.group(1).split("|")]
+            code = path(expr, m.start())
+            for f in filters:
+                if f not in FILTERS:
+                    raise fail(f"Unknown filter {f!r} (known: {', '.join(FILTERS)})", m.start())
+                code = f"_f_{f}({code})"
+            code = f"_text({code})"
+            emit(f"w(_escape({code}))" if autoescape else f"w({code})")
+            continue
+
+        words = m.group(2).split()
+        tag = words[0] if words else ""
+        if tag == "if" and len(words) in (2, 3) and (len(words) == 2 or words[1] == "not"):
+            emit(f"if {'not ' if len(words) == 3 else ''}{path(words[-1], m.start())}:")
+            blocks.append(("if", m.start()))
+            depth += 1
+            emit("pass")
+        elif tag == "else" and len(words) == 1:
+            if blocks and blocks[-1][0] == "else":
+                raise fail("duplicate {% else %}", m.start())
+            if not blocks or blocks[-1][0] != "if":
+                raise fail("{% else %} outside {% if %}", m.start())
+            blocks[-1] = ("else", blocks[-1][1])
+            lines.append(" " * (depth - 1) + "else:")
+            emit("pass")
+        elif tag == "for" and len(words) == 4 and words[2] == "in" and _NAME.fullmatch(words[1]):
+            emit(f"for v_{words[1]} in ({path(words[3], m.start())} or ()):")
+            blocks.append(("for", m.start()))
+            loop_names.append(words[1])
+            depth += 1
+            emit("pass")
+        elif tag in ("endif", "endfor") and len(words) == 1:
+            if not blocks or blocks[-1][0] not in (("if", "else") if tag == "endif" else ("for",)):
+                raise fail(f"Unexpected {{% {tag} %}}", m.start())
+            if blocks.pop()[0] == "for":
+                loop_names.pop()
+            depth -= 1
+        else:
+            raise fail(f"Unknown tag {{% {m.group(2).strip()} %}}", m.start())
+
+    if blocks:
+        kind, at = blocks[-1]
+        raise fail(f"{{% {'for' if kind == 'for' else 'if'} %}} is never closed", at)
+    if pos < len(source):
+        emit(f"w({source[pos:]!r})")
+    lines.append(' return "".join(out)')
+    return "\n".join(lines) + "\n"
+
+
+# ---------- CACHE ----------
+
+_templates: Dict[str, Tuple[Tuple[int, int], Template]] = {}  # path -> ((mtime_ns, size), compiled)
+_templates_lock = threading.Lock()
+
+
+def load_template(path: Path) -> Template:
+    """Compiled template of a file; compiled again only when the file changes."""
+    path = Path(path)
+    stat = path.stat()
+    key = str(path)
+    seen = (stat.st_mtime_ns, stat.st_size)
+    cached = _templates.get(key)
+    if cached is not None and cached[0] == seen:
+        return cached[1]
+    template = Template(path.read_text(encoding="utf-8"), name=path.name, autoescape=path.suffix in (".html", ".htm"))
+    with _templates_lock:
+        _templates[key] = (seen, template)
+    return template
+
+
+def template_for(fmt: str, directory: Path = TEMPLATES_DIR) -> Template:
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown document format: {fmt!r} (use {' or '.join(FORMATS)})")
+    return load_template(Path(directory) / FORMATS[fmt])
+
+
+# ---------- DOCUMENTS ----------
+
+def document_context(record: Mapping[str, Any]) -> Dict[str, Any]:
+    """History record ({"meta", "input", "output"} + optional quote_id) -> template context."""
+    return {
+        "quote_id": record.get("quote_id"),
+        "meta": record.get("meta") or {},
+        "input": record.get("input") or {},
+        "output": record.get("output") or {},
+    }
+
+
+def document_name(record: Mapping[str, Any], fmt: str) -> str:
+    quote_id = record.get("quote_id")
+    return f"quote-{quote_id}.{fmt}" if quote_id is not None else f"quote.{fmt}"
+
+
+def render_quote(record: Mapping[str, Any], fmt: str = "txt", *, directory: Path = TEMPLATES_DIR) -> str:
+    """One quote document from a history record (core.history.quote_record / HistoryStore.get)."""
+    return template_for(fmt, directory).render(document_context(record))
+
+
+def _render_chunk(records: List[Dict[str, Any]], fmt: str, directory: str) -> List[Tuple[str, bytes]]:
+    template = template_for(fmt, Path(directory))
+    return [(document_name(r, fmt), template.render(document_context(r)).encode("utf-8")) for r in records]
+
+
+# ---------- BULK EXPORT ----------
+
+MANIFEST_NAME = "index.csv"
+_MANIFEST_COLUMNS = ("quote_id", "created_at", "client_name", "job_address", "trade_id", "preset_id", "total", "file")
+
+
+@dataclass
+class ExportStats:
+    documents: int = 0
+    bytes: int = 0  # rendered, before compression
+    seconds: float = 0.0
+
+    @property
+    def documents_per_second(self) -> float:
+        return self.documents / self.seconds if self.seconds else 0.0
+
+
+def _record_chunks(history: Any, filter: Optional[str], chunk: int) -> Iterator[List[Dict[str, Any]]]:
+    from .history import row_to_record  # pyarrow / lance only for the export
+
+    for batch in history.iter_batches(["quote_id", "meta", "input", "output"], filter=filter, batch_size=chunk):
+        yield [row_to_record(row) for row in batch.to_pylist()]
+
+
+def _zip_time(created_at: Any) -> Tuple[int, int, int, int, int, int]:
+    try:
+        when = created_at if isinstance(created_at, datetime) else datetime.fromisoformat(str(created_at))
+    except ValueError:
+        when = datetime.now()
+    return (max(when.year, 1980), when.month, when.day, when.hour, when.minute, when.second)
+
+
+def export_documents(
+    dst: Path,
+    history: Any,
+    *,
+    fmt: str = "html",
+    filter: Optional[str] = None,
+    workers: int = 0,
+    chunk: int = DEFAULT_EXPORT_CHUNK,
+    directory: Path = TEMPLATES_DIR,
+) -> ExportStats:
+    """
+    Renders every matching history quote into one zip (`dst`: a path or a
+    writable binary file): quote-<id>.<fmt> per quote plus index.csv. The
+    template is compiled once (per worker). workers > 1 renders chunks in a
+    process pool, at most 2 chunks per worker in flight; the zip is written
+    in history order by this process.
+    """
+    template_for(fmt, directory)  # unknown format / broken template: fail before reading anything
+    if chunk <= 0:
+        raise ValueError("chunk must be > 0")
+    stats = ExportStats()
+    start = time.perf_counter()
+    manifest = io.StringIO()
+    writer = csv.writer(manifest)
+    writer.writerow(_MANIFEST_COLUMNS)
+
+    with zipfile.ZipFile(dst, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=6) as zf:
+
+        def add(records: List[Dict[str, Any]], documents: List[Tuple[str, bytes]]) -> None:
+            for record, (name, body) in zip(records, documents):
+                meta = record["meta"]
+                zf.writestr(zipfile.ZipInfo(name, _zip_time(meta.get("created_at"))), body, compress_type=zipfile.ZIP_DEFLATED)
+                writer.writerow((
+                    record.get("quote_id"), meta.get("created_at"), meta.get("client_name"), meta.get("job_address"),
+                    meta.get("trade_id"), meta.get("preset_id"), record["output"].get("total"), name,
+                ))
+                stats.documents += 1
+                stats.bytes += len(body)
+
+        chunks = _record_chunks(history, filter, chunk)
+        if workers > 1:
+            # spawn: the parent holds Lance (not fork-safe) threads; workers only render.
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(workers, mp_context=context) as pool:
+                in_flight: Deque[Tuple[List[Dict[str, Any]], Future]] = deque()
+                for records in chunks:
+                    in_flight.append((records, pool.submit(_render_chunk, records, fmt, str(directory))))
+                    if len(in_flight) >= 2 * workers:
+                        records, future = in_flight.popleft()
+                        add(records, future.result())
+                while in_flight:
+                    records, future = in_flight.popleft()
+                    add(records, future.result())
+        else:
+            for records in chunks:
+                add(records, _render_chunk(records, fmt, str(directory)))
+
+        zf.writestr(MANIFEST_NAME, manifest.getvalue())
+
+    stats.seconds = time.perf_counter() - start
+    return stats
@@ -0,0 +1,308 @@
+# core/reprice.py
+# Перерахунок збереженої історії за поточним trades.json: chunk-и з Lance -> пул процесів -> diff-звіт + підсумки.
+
+from __future__ import annotations
+
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterator, Optional
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from .batch import calculate_quote_batch
+from .bulk import DEFAULT_CHUNK_ROWS, _Writer, file_format
+from .config import TRADES_PATH, load_trades
+from .fixedpoint import CENTS
+from .history import HistoryStore, OutcomeStore, history_filter
+from .models import HistoryQuery, RepriceQuery, TradeConfig
+
+# History columns read (alias -> column). Aliases of the input block are QuoteRequest names.
+SOURCE_COLUMNS: Dict[str, str] = {
+    "quote_id": "quote_id",
+    "created_at": "meta.created_at",
+    "trade_id": "meta.trade_id",
+    "preset_id": "meta.preset_id",
+    "client_name": "meta.client_name",
+    "area_sqft": "input.area_sqft",
+    "waste_pct": "input.waste_pct",
+    "labor_rate_per_sqft": "input.labor_rate_per_sqft",
+    "material_rate_per_sqft": "input.material_rate_per_sqft",
+    "include_labor": "input.include_labor",
+    "include_materials": "input.include_materials",
+    "full_service_materials": "input.materials_full_service",
+    "materials_handling_fee": "input.materials_handling_fee",
+    "materials_markup_pct": "input.materials_markup_pct",
+    "manual_total": "input.manual_total",
+    "old_subtotal": "output.subtotal",
+    "old_gst": "output.gst",
+    "old_total": "output.total",
+}
+
+# The input block stores resolved rates (preset defaults applied when saved).
+# Unless keep_rates is set these are dropped, so the current preset defaults apply.
+RATE_FIELDS = (
+    "waste_pct",
+    "labor_rate_per_sqft",
+    "material_rate_per_sqft",
+    "materials_handling_fee",
+    "materials_markup_pct",
+)
+REQUEST_FIELDS = ("area_sqft", "include_labor", "include_materials", "full_service_materials", "manual_total") + RATE_FIELDS
+
+# Diff report columns, in order (the header is written even when nothing changed).
+REPORT_SCHEMA = pa.schema([
+    ("quote_id", pa.int64()),
+    ("created_at", pa.timestamp("s")),
+    ("trade_id", pa.string()),
+    ("preset_id", pa.string()),
+    ("client_name", pa.string()),
+    ("old_subtotal", pa.float64()),
+    ("new_subtotal", pa.float64()),
+    ("old_gst", pa.float64()),
+    ("new_gst", pa.float64()),
+    ("old_total", pa.float64()),
+    ("new_total", pa.float64()),
+    ("delta_total", pa.float64()),
+    ("rule", pa.string()),
+    ("error", pa.string()),
+])
+
+# Batch flag -> rule name in the report (several rules join with "+"; null = plain auto pricing).
+_RULES = (
+    ("labor_rate_clamped", "min_labor_rate"),
+    ("min_total_applied", "min_total"),
+    ("manual_total_used", "manual_total"),
+)
+
+_CHANGED = 0.005  # dollars; below this the total is unchanged
+
+
+def reprice_table(trades: Dict[str, TradeConfig], table: pa.Table, *, keep_rates: bool = False, fixed_point: bool = False) -> pa.Table:
+    """One chunk of SOURCE_COLUMNS -> REPORT_SCHEMA (every row)."""
+    fields = REQUEST_FIELDS if keep_rates else tuple(f for f in REQUEST_FIELDS if f not in RATE_FIELDS)
+    columns: Dict[str, Any] = {name: table.column(name) for name in fields}
+    columns["trade_id"] = pc.fill_null(table.column("trade_id"), "")
+    columns["preset_id"] = pc.fill_null(table.column("preset_id"), "")
+    columns["use_manual_total"] = pc.is_valid(table.column("manual_total"))
+
+    out = calculate_quote_batch(trades, columns, fixed_point=fixed_point)
+    errors = out["error"]
+    failed = errors != None  # noqa: E711
+
+    def money(name: str) -> np.ndarray:
+        values = out[name]
+        return values / CENTS if fixed_point else values
+
+    new_subtotal, new_gst, new_total = money("subtotal"), money("gst"), money("total")
+    old_total = np.asarray(pc.fill_null(table.column("old_total"), np.nan).to_numpy(zero_copy_only=False), dtype=np.float64)
+
+    rules = np.full(table.num_rows, None, dtype=object)
+    for flag, name in _RULES:
+        for i in np.flatnonzero(out[flag] & ~failed):
+            rules[i] = name if rules[i] is None else f"{rules[i]}+{name}"
+
+    return pa.table({
+        "quote_id": table.column("quote_id"),
+        "created_at": table.column("created_at"),
+        "trade_id": table.column("trade_id"),
+        "preset_id": table.column("preset_id"),
+        "client_name": table.column("client_name"),
+        "old_subtotal": table.column("old_subtotal"),
+        "new_subtotal": pa.array(new_subtotal, pa.float64(), mask=failed),
+        "old_gst": table.column("old_gst"),
+        "new_gst": pa.array(new_gst, pa.float64(), mask=failed),
+        "old_total": table.column("old_total"),
+        "new_total": pa.array(new_total, pa.float64(), mask=failed),
+        "delta_total": pa.array(np.round(new_total - old_total, 2), pa.float64(), mask=failed | np.isnan(old_total)),
+        "rule": pa.array(rules.tolist(), pa.string()),
+        "error": pa.array(errors.tolist(), pa.string()),
+    }).cast(REPORT_SCHEMA)
+
+
+# Per-process state of pool workers (trades loaded once per worker).
+_worker_trades: Optional[Dict[str, TradeConfig]] = None
+_worker_options: Dict[str, bool] = {}
+
+
+def _init_worker(trades_path: str, keep_rates: bool, fixed_point: bool) -> None:
+    global _worker_trades, _worker_options
+    _worker_trades = load_trades(Path(trades_path))
+    _worker_options = {"keep_rates": keep_rates, "fixed_point": fixed_point}
+
+
+def _reprice_in_worker(table: pa.Table) -> pa.Table:
+    return reprice_table(_worker_trades, table, **_worker_options)
+
+
+# ---------- SUMMARY ----------
+
+@dataclass
+class RepriceStats:
+    quotes: int = 0  # re-priced
+    skipped_decided: int = 0  # won / lost quotes left out
+    errors: int = 0
+    changed: int = 0
+    increased: int = 0
+    decreased: int = 0
+    old_total: float = 0.0  # sums over rows without errors
+    new_total: float = 0.0
+    max_increase: float = 0.0
+    max_decrease: float = 0.0
+    rules: Dict[str, int] = field(default_factory=dict)  # rule -> rows where it fired
+    seconds: float = 0.0
+
+    @property
+    def delta_total(self) -> float:
+        return self.new_total - self.old_total
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.quotes / self.seconds if self.seconds else 0.0
+
+    def add(self, report: pa.Table) -> np.ndarray:
+        """Folds one report chunk in; returns its "total changed" mask."""
+        self.quotes += report.num_rows
+        ok = np.asarray(pc.is_null(report.column("error")).to_numpy(zero_copy_only=False), dtype=bool)
+        self.errors += int((~ok).sum())
+
+        delta = np.asarray(pc.fill_null(report.column("delta_total"), 0.0).to_numpy(zero_copy_only=False))
+        changed = ok & (np.abs(delta) >= _CHANGED)
+        self.changed += int(changed.sum())
+        self.increased += int((changed & (delta > 0)).sum())
+        self.decreased += int((changed & (delta < 0)).sum())
+        if changed.any():
+            self.max_increase = max(self.max_increase, float(delta[changed].max()))
+            self.max_decrease = min(self.max_decrease, float(delta[changed].min()))
+
+        valid = pa.array(ok)
+        self.old_total += pc.sum(pc.filter(report.column("old_total"), valid)).as_py() or 0.0
+        self.new_total += pc.sum(pc.filter(report.column("new_total"), valid)).as_py() or 0.0
+
+        for item in pc.value_counts(pc.drop_null(report.column("rule"))).to_pylist():
+            for name in item["values"].split("+"):
+                self.rules[name] = self.rules.get(name, 0) + item["counts"]
+        return changed | ~ok
+
+    def as_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        for name in ("old_total", "new_total", "max_increase", "max_decrease"):
+            data[name] = round(data[name], 2)
+        data["delta_total"] = round(self.delta_total, 2)
+        data["seconds"] = round(self.seconds, 3)
+        return data
+
+
+# ---------- RUN ----------
+
+def _source_chunks(
+    history: HistoryStore,
+    outcomes: Optional[OutcomeStore],
+    stats: RepriceStats,
+    *,
+    filter: Optional[str],
+    chunk_rows: int,
+) -> Iterator[pa.Table]:
+    """History in chunks of SOURCE_COLUMNS; quotes already won / lost are dropped (outcomes given)."""
+    decided = pa.array(list(outcomes.latest()) if outcomes is not None else [], pa.int64())
+    for batch in history.iter_batches(SOURCE_COLUMNS, filter=filter, batch_size=chunk_rows):
+        table = pa.Table.from_batches([batch])
+        if len(decided):
+            keep = pc.invert(pc.is_in(table.column("quote_id"), value_set=decided))
+            before = table.num_rows
+            table = table.filter(keep)
+            stats.skipped_decided += before - table.num_rows
+        if table.num_rows:
+            yield table
+
+
+def reprice_history(
+    history: HistoryStore,
+    *,
+    outcomes: Optional[OutcomeStore] = None,
+    filter: Optional[str] = None,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    workers: int = 0,
+    keep_rates: bool = False,
+    fixed_point: bool = False,
+    changed_only: bool = True,
+    trades_path: Path = TRADES_PATH,
+    trades: Optional[Dict[str, TradeConfig]] = None,
+    stats: Optional[RepriceStats] = None,
+) -> Iterator[pa.Table]:
+    """
+    Re-prices saved quotes against the current trades file and yields diff
+    report chunks in history order. Only changed (or failed) rows are
+    yielded when `changed_only`; `stats` (pass your own to read it) covers
+    every row. `outcomes` given: won / lost quotes are skipped (open quotes
+    only). workers > 1 prices chunks in a process pool with at most 2 chunks
+    per worker in flight, so memory is bounded by chunk size. Workers load
+    `trades_path`; in-process pricing uses `trades` when given (e.g. the
+    server's live snapshot).
+    """
+    if chunk_rows <= 0:
+        raise ValueError("chunk_rows must be > 0")
+    stats = stats if stats is not None else RepriceStats()
+    start = time.perf_counter()
+    chunks = _source_chunks(history, outcomes, stats, filter=filter, chunk_rows=chunk_rows)
+
+    def emit(report: pa.Table) -> Optional[pa.Table]:
+        keep = stats.add(report)
+        stats.seconds = time.perf_counter() - start
+        if changed_only:
+            report = report.filter(pa.array(keep))
+        return report if report.num_rows else None
+
+    if workers > 1:
+        # spawn: the parent holds Lance (not fork-safe) threads; workers only need the trades file.
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker, initargs=(str(trades_path), keep_rates, fixed_point)) as pool:
+            in_flight: Deque[Future] = deque()
+            for chunk in chunks:
+                in_flight.append(pool.submit(_reprice_in_worker, chunk))
+                if len(in_flight) >= 2 * workers:
+                    report = emit(in_flight.popleft().result())
+                    if report is not None:
+                        yield report
+            while in_flight:
+                report = emit(in_flight.popleft().result())
+                if report is not None:
+                    yield report
+    else:
+        trades = trades if trades is not None else load_trades(trades_path)
+        for chunk in chunks:
+            report = emit(reprice_table(trades, chunk, keep_rates=keep_rates, fixed_point=fixed_point))
+            if report is not None:
+                yield report
+    stats.seconds = time.perf_counter() - start
+
+
+def reprice_options(q: RepriceQuery, outcomes: Optional[OutcomeStore]) -> Dict[str, Any]:
+    """RepriceQuery -> reprice_history() keyword arguments."""
+    filters = HistoryQuery(**q.model_dump(exclude={"include_decided", "keep_rates", "changed_only"}))
+    return {
+        "filter": history_filter(filters),
+        "outcomes": None if q.include_decided else outcomes,
+        "keep_rates": q.keep_rates,
+        "changed_only": q.changed_only,
+    }
+
+
+def reprice_to_file(dst: Path, history: HistoryStore, **options: Any) -> RepriceStats:
+    """reprice_history() written to a CSV / Parquet diff report; returns the summary."""
+    file_format(dst)  # fail before reading anything
+    stats = RepriceStats()
+    writer = _Writer(dst)
+    try:
+        for report in reprice_history(history, stats=stats, **options):
+            writer.write(report)
+        if stats.changed + stats.errors == 0 and options.get("changed_only", True):
+            writer.write(REPORT_SCHEMA.empty_table())
+    finally:
+        writer.close()
+    return stats
@@ -0,0 +1,166 @@
+# core/solver.py
+# Зворотний розрахунок: цільовий total (з GST) -> потрібна ставка / площа / markup. Аналітично, O(1) на рядок.
+
+from __future__ import annotations
+
+from typing import Any, Dict
+
+import numpy as np
+
+from .batch import _PRICING_CODES, calculate_quote_batch, resolve_batch
+from .calculator import calculate_quote
+from .fixedpoint import CENTS
+from .models import PricingType, SolveRequest, SolveResult, TradeConfig
+
+SOLVE_PARAMS = ("labor_rate_per_sqft", "material_rate_per_sqft", "area_sqft", "materials_markup_pct")
+
+# Money compares within half a cent (totals are rounded to cents).
+_HALF_CENT = 0.005
+
+
+def _round_up(x: np.ndarray) -> np.ndarray:
+    return np.ceil(np.round(x * 100.0, 6)) / 100.0
+
+
+def _round_down(x: np.ndarray) -> np.ndarray:
+    return np.floor(np.round(x * 100.0, 6)) / 100.0
+
+
+def solve_batch(
+    trades: Dict[str, TradeConfig],
+    columns: Any,
+    solve_for: str,
+    target_total: Any,
+    *,
+    fixed_point: bool = False,
+) -> Dict[str, np.ndarray]:
+    """
+    Inverts calculate_quote row by row: the value of `solve_for` that makes
+    the total (incl. GST) equal `target_total` (array or scalar), all other
+    inputs as in `columns` (same format as calculate_quote_batch).
+
+    The auto subtotal is linear in each solvable input once the pricing rule is
+    fixed, so each row is one division:
+
+      subtotal = labor + material * (1 + markup%) + handling,  total = subtotal * (1 + gst)
+
+    MIN_RATE_PER_SQFT: the labor rate is clamped before use, so a solution
+    below the minimum rate does not exist. FLAT_MIN_TOTAL: targets below the
+    minimum have no solution; a target equal to it is a plateau (on_minimum),
+    and `value` is the largest input that still lands on it.
+
+    Returns {"value", "exact_value", "achieved_total" (float64, NaN when
+    unsolved), "on_minimum" (bool), "error" (object: None or the reason)}.
+    `value` is `exact_value` rounded up to 0.01 (the break-even point), and
+    `achieved_total` is what calculate_quote_batch gives for it.
+    """
+    if solve_for not in SOLVE_PARAMS:
+        raise ValueError(f"solve_for must be one of {', '.join(SOLVE_PARAMS)}")
+    if hasattr(columns, "column_names"):  # pyarrow.Table
+        columns = {name: columns.column(name) for name in columns.column_names}
+
+    errors, rows = resolve_batch(trades, columns)
+    n = errors.size
+    target = np.array(np.broadcast_to(np.asarray(target_total, dtype=np.float64), (n,)))
+    errors[(errors == None) & ~(target >= 0)] = "Invalid target_total"  # noqa: E711
+
+    pricing = rows["pricing"]
+    include_labor = rows["include_labor"]
+    include_materials = rows["include_materials"]
+    full_service = rows["full_service"] & include_materials
+    area = rows["area"]
+    gst_rate = rows["gst_rate"]
+
+    # Same resolution as the forward path.
+    min_rate = pricing == _PRICING_CODES[PricingType.MIN_RATE_PER_SQFT]
+    min_labor = rows["min_labor"]
+    labor_rate = np.where(min_rate & (rows["labor_rate"] < min_labor), min_labor, rows["labor_rate"])
+    waste_factor = np.where(include_materials, 1.0 + rows["waste"] / 100.0, 1.0)
+    markup_factor = np.where(full_service, 1.0 + rows["markup_pct"] / 100.0, 1.0)
+    handling = np.where(full_service, rows["handling_fee"], 0.0)
+
+    labor = np.where(include_labor, area * labor_rate, 0.0)
+    material = np.where(include_materials, area * waste_factor * rows["material_rate"], 0.0)
+
+    # Required pre-GST subtotal; FLAT_MIN_TOTAL plateau and floor.
+    need = target / (1.0 + gst_rate)
+    min_total = rows["min_total"]
+    flat = (pricing == _PRICING_CODES[PricingType.FLAT_MIN_TOTAL]) & ~np.isnan(min_total)
+    below_min = flat & (need < min_total - _HALF_CENT)
+    on_minimum = flat & ~below_min & (need <= min_total + _HALF_CENT)
+    need = np.where(on_minimum, min_total, need)
+
+    def fail(mask: np.ndarray, message: str) -> None:
+        mask = mask & (errors == None)  # noqa: E711
+        errors[mask] = message
+
+    fail(rows["use_manual"], "manual_total overrides the calculated price")
+    for i in np.flatnonzero(below_min & (errors == None)):  # noqa: E711
+        floor = round(min_total[i] * (1.0 + gst_rate[i]) + 1e-9, 2)
+        errors[i] = f"Target is below the preset minimum total (${floor:,.2f} incl. GST)"
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if solve_for == "labor_rate_per_sqft":
+            fail(~include_labor, "Labor is not included")
+            fail(~(area > 0), "area_sqft is 0")
+            rest = material * markup_factor + handling
+            exact = (need - rest) / area
+            fail(exact < -1e-9, "Target is below the price without labor")
+            below_rate = min_rate & (exact < min_labor - 1e-9) & ~on_minimum
+            for i in np.flatnonzero(below_rate & (errors == None)):  # noqa: E711
+                errors[i] = f"Target needs a labor rate below the minimum (${min_labor[i]:g}/sqft)"
+        elif solve_for == "material_rate_per_sqft":
+            fail(~include_materials, "Materials are not included")
+            fail(~(area > 0), "area_sqft is 0")
+            exact = (need - labor - handling) / (area * waste_factor * markup_factor)
+            fail(exact < -1e-9, "Target is below the price without materials")
+        elif solve_for == "materials_markup_pct":
+            fail(~full_service, "Full-service materials are off")
+            fail(~(material > 0), "Material cost is 0")
+            exact = (need - labor - material - handling) / material * 100.0
+            fail(exact < -1e-9, "Target is below the price without markup")
+        else:  # area_sqft
+            per_sqft = np.where(include_labor, labor_rate, 0.0) + np.where(
+                include_materials, waste_factor * rows["material_rate"] * markup_factor, 0.0
+            )
+            fail(~(per_sqft > 0), "Price does not depend on area")
+            exact = (need - handling) / per_sqft
+            fail(exact < -1e-9, "Target is below the fixed fees")
+
+    solved = errors == None  # noqa: E711
+    exact = np.where(solved, np.maximum(exact, 0.0), np.nan)
+    value = np.where(on_minimum, _round_down(exact), _round_up(exact))
+
+    # Forward check with the rounded value.
+    check = dict(columns)
+    check[solve_for] = np.where(solved, value, 0.0)
+    priced = calculate_quote_batch(trades, check, fixed_point=fixed_point)
+    achieved = priced["total"] / CENTS if fixed_point else priced["total"]
+
+    return {
+        "value": value,
+        "exact_value": exact,
+        "achieved_total": np.where(solved, achieved, np.nan),
+        "on_minimum": on_minimum & solved,
+        "error": errors,
+    }
+
+
+def solve(trades: Dict[str, TradeConfig], req: SolveRequest, *, fixed_point: bool = False) -> SolveResult:
+    """solve_batch for one request, plus the full QuoteResult (with notes) at the solved value."""
+    out = solve_batch(trades, req.base.model_dump(), req.solve_for, req.target_total, fixed_point=fixed_point)
+    if out["error"][0] is not None:
+        return SolveResult(solve_for=req.solve_for, target_total=req.target_total, reason=out["error"][0])
+
+    value = float(out["value"][0])
+    base = req.base.model_copy(update={req.solve_for: value})
+    _preset, _trade, result = calculate_quote(trades, base, fixed_point=fixed_point)
+    return SolveResult(
+        solve_for=req.solve_for,
+        target_total=req.target_total,
+        value=value,
+        exact_value=float(out["exact_value"][0]),
+        achieved_total=result.total,
+        on_minimum=bool(out["on_minimum"][0]),
+        result=result,
+    )
@@ -0,0 +1,89 @@
+# core/sweep.py
+# What-if: ціна по сітці значень (area / waste / rates) за один векторизований прохід.
+
+from __future__ import annotations
+
+from typing import Any, Dict, List
+
+import numpy as np
+
+from .batch import calculate_quote_batch
+from .fixedpoint import CENTS
+from .models import SweepAxis, SweepRequest, TradeConfig
+
+MAX_SWEEP_POINTS = 1_000_000
+
+# Allowed value range per swept field (same limits as QuoteRequest).
+_LIMITS = {
+    "area_sqft": (0.0, None),
+    "waste_pct": (0.0, 100.0),
+    "labor_rate_per_sqft": (0.0, None),
+    "material_rate_per_sqft": (0.0, None),
+    "materials_handling_fee": (0.0, None),
+    "materials_markup_pct": (0.0, None),
+}
+
+
+def axis_size(axis: SweepAxis) -> float:
+    """Number of points on `axis`, computed without building them (may be huge or inf)."""
+    if axis.values is not None:
+        return float(len(axis.values))
+    return float(np.floor((axis.stop - axis.start) / axis.step + 1e-9)) + 1
+
+
+def axis_points(axis: SweepAxis) -> np.ndarray:
+    if axis.values is not None:
+        points = np.asarray(axis.values, dtype=np.float64)
+    else:
+        count = int(axis_size(axis))
+        # start + i*step (not cumulative), rounded so 0.1 steps give 0.3, not 0.30000000000000004
+        points = np.round(axis.start + axis.step * np.arange(count), 9)
+
+    low, high = _LIMITS[axis.param]
+    if points.size == 0:
+        raise ValueError(f"{axis.param}: no points")
+    if points.min() < low or (high is not None and points.max() > high):
+        raise ValueError(f"{axis.param}: values must be within [{low}, {high if high is not None else 'inf'}]")
+    return points
+
+
+def sweep_quote(trades: Dict[str, TradeConfig], req: SweepRequest, *, fixed_point: bool = False) -> Dict[str, Any]:
+    """
+    Prices the Cartesian grid of req.axes around req.base.
+
+    Returns {"axes": [{"param", "values"}], "shape", "subtotal", "gst", "total",
+    "labor_rate_clamped", "min_total_applied"}; result arrays are flattened in
+    row-major order over `shape` (the last axis varies fastest). Money is in
+    dollars in both modes; fixed_point=True prices in integer cents first.
+    """
+    # Checked before any array is allocated: a fine step over a wide range is one request away.
+    size = 1.0
+    for axis in req.axes:
+        count = axis_size(axis)
+        if not count <= MAX_SWEEP_POINTS:
+            raise ValueError(f"{axis.param}: {count:.0f} points, max is {MAX_SWEEP_POINTS}")
+        size *= count
+    if size > MAX_SWEEP_POINTS:
+        raise ValueError(f"Sweep has {size:.0f} points, max is {MAX_SWEEP_POINTS}")
+
+    points: List[np.ndarray] = [axis_points(axis) for axis in req.axes]
+    shape = tuple(p.size for p in points)
+
+    columns: Dict[str, Any] = req.base.model_dump()
+    for axis, grid in zip(req.axes, np.meshgrid(*points, indexing="ij")):
+        columns[axis.param] = grid.ravel()
+
+    out = calculate_quote_batch(trades, columns, fixed_point=fixed_point)
+    errors = out["error"]
+    failed = errors != None  # noqa: E711
+    if failed.any():
+        raise ValueError(errors[np.flatnonzero(failed)[0]])
+
+    money = {name: out[name] / CENTS if fixed_point else out[name] for name in ("subtotal", "gst", "total")}
+    return {
+        "axes": [{"param": axis.param, "values": p} for axis, p in zip(req.axes, points)],
+        "shape": list(shape),
+        **money,
+        "labor_rate_clamped": out["labor_rate_clamped"],
+        "min_total_applied": out["min_total_applied"],
+    }
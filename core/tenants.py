@@ -0,0 +1,224 @@
+# core/tenants.py
+# Конфіг на тенанта: data/tenants/<id>.json парситься ліниво при першому запиті; LRU за кількістю і пам'яттю; reload окремо.
+
+from __future__ import annotations
+
+import logging
+import re
+import sys
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from enum import Enum
+from pathlib import Path
+from types import BuiltinFunctionType, FunctionType, MethodType, ModuleType
+from typing import Any, Callable, Dict, Optional
+
+from .config import TRADES_PATH, ConfigSnapshot, ConfigStore
+from .plans import forget_plans, reserve_plan_cache
+
+log = logging.getLogger(__name__)
+
+TENANTS_DIR = TRADES_PATH.parent / "tenants"
+
+# Tenant ids double as file names: no dots or slashes, so no path escapes.
+TENANT_ID = re.compile(r"^[a-z0-9][a-z0-9_-]{0,62}$")
+
+# Shared by every snapshot (or not owned by it): not counted.
+_SHARED = (type, ModuleType, FunctionType, BuiltinFunctionType, MethodType, Enum, bool, type(None))
+
+
+class UnknownTenant(LookupError):
+    """No config file for this tenant id (or the id is malformed)."""
+
+
+def approx_size(root: Any) -> int:
+    """
+    Deep sys.getsizeof of an object graph (dicts, sequences, __dict__ and
+    __slots__), each object counted once. An estimate: interned strings and
+    small ints are counted as if owned.
+    """
+    seen = set()
+    total = 0
+    stack = [root]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, _SHARED):
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        if isinstance(obj, (str, bytes, int, float)):
+            continue
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        attrs = getattr(obj, "__dict__", None)
+        if attrs is not None:
+            stack.append(attrs)
+        for cls in type(obj).__mro__:
+            for slot in getattr(cls, "__slots__", ()):
+                if slot not in ("__dict__", "__weakref__") and hasattr(obj, slot):
+                    stack.append(getattr(obj, slot))
+    return total
+
+
+@dataclass
+class _Entry:
+    store: ConfigStore
+    nbytes: int
+
+
+class TenantRegistry:
+    """
+    ConfigStores of tenants, loaded on first use from `directory/<id>.json`
+    (same format as trades.json) and kept in an LRU bounded by both the number
+    of tenants and the estimated resident size of their snapshots. Evicted
+    tenants are simply loaded again on their next request.
+
+    Each tenant reloads on its own: reload_if_changed() stats the files of the
+    resident tenants only. An invalid edit keeps the tenant's previous snapshot,
+    exactly like ConfigStore; a deleted file evicts the tenant.
+    """
+
+    def __init__(
+        self,
+        directory: Path = TENANTS_DIR,
+        *,
+        max_tenants: int = 256,
+        max_bytes: int = 64 << 20,
+        on_reload: Optional[Callable[[float, Optional[Exception]], None]] = None,
+    ) -> None:
+        if max_tenants < 1 or max_bytes < 1:
+            raise ValueError("max_tenants and max_bytes must be >= 1")
+        self.directory = Path(directory)
+        self.max_tenants = max_tenants
+        self.max_bytes = max_bytes
+        self.on_reload = on_reload
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()  # least recently used first
+        self._bytes = 0
+        self._lock = threading.Lock()  # guards _entries / counters; never held while parsing
+        self._loading: Dict[str, threading.Lock] = {}  # one loader per tenant, others wait for it
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+        self.reloads = 0
+        reserve_plan_cache(max_tenants)
+
+    def path(self, tenant_id: str) -> Path:
+        if not TENANT_ID.match(tenant_id):
+            raise UnknownTenant(f"Unknown tenant: {tenant_id!r}")
+        return self.directory / f"{tenant_id}.json"
+
+    def snapshot(self, tenant_id: str) -> ConfigSnapshot:
+        """
+        The tenant's current snapshot, loading it if not resident.
+        Raises UnknownTenant, or OSError / ValueError for a file that cannot be loaded.
+        """
+        return self.store(tenant_id).snapshot
+
+    def store(self, tenant_id: str) -> ConfigStore:
+        entry = self._touch(tenant_id)
+        if entry is not None:
+            return entry.store
+
+        path = self.path(tenant_id)
+        with self._lock:
+            loading = self._loading.setdefault(tenant_id, threading.Lock())
+        try:
+            with loading:
+                entry = self._touch(tenant_id)  # loaded by a concurrent request meanwhile
+                if entry is not None:
+                    return entry.store
+                if not path.is_file():
+                    raise UnknownTenant(f"Unknown tenant: {tenant_id!r}")
+                store = ConfigStore(path, on_reload=self.on_reload)  # parses + validates
+                entry = _Entry(store, approx_size(store.snapshot))
+                with self._lock:
+                    self._entries[tenant_id] = entry
+                    self._bytes += entry.nbytes
+                    self.loads += 1
+                    self._shrink(keep=tenant_id)
+                log.info("Loaded tenant %s (version %s, ~%d KiB)", tenant_id, store.snapshot.version, entry.nbytes >> 10)
+                return store
+        finally:
+            with self._lock:
+                self._loading.pop(tenant_id, None)
+
+    def _touch(self, tenant_id: str) -> Optional[_Entry]:
+        with self._lock:
+            entry = self._entries.get(tenant_id)
+            if entry is not None:
+                self._entries.move_to_end(tenant_id)
+                self.hits += 1
+            return entry
+
+    def _shrink(self, *, keep: Optional[str] = None) -> None:
+        """Evicts least recently used tenants until both bounds hold (never `keep`). Lock held."""
+        while len(self._entries) > 1 and (len(self._entries) > self.max_tenants or self._bytes > self.max_bytes):
+            tenant_id = next(iter(self._entries))
+            if tenant_id == keep:
+                self._entries.move_to_end(tenant_id)
+                tenant_id = next(iter(self._entries))
+            self._drop(tenant_id)
+            self.evictions += 1
+
+    def _drop(self, tenant_id: str) -> None:
+        entry = self._entries.pop(tenant_id)
+        self._bytes -= entry.nbytes
+        forget_plans(entry.store.snapshot.trades)
+
+    def evict(self, tenant_id: str) -> bool:
+        """Forgets a resident tenant (its next request loads the file again)."""
+        with self._lock:
+            if tenant_id not in self._entries:
+                return False
+            self._drop(tenant_id)
+            return True
+
+    def reload_if_changed(self) -> int:
+        """Cheap mtime/size check of every resident tenant; returns how many were swapped."""
+        with self._lock:
+            resident = list(self._entries.items())
+        swapped = 0
+        for tenant_id, entry in resident:
+            if not entry.store.path.exists():
+                log.warning("Tenant %s: %s is gone, evicting", tenant_id, entry.store.path)
+                self.evict(tenant_id)
+                continue
+            before = entry.store.snapshot
+            if not entry.store.reload_if_changed():
+                continue
+            swapped += 1
+            nbytes = approx_size(entry.store.snapshot)
+            with self._lock:
+                self.reloads += 1
+                forget_plans(before.trades)
+                if self._entries.get(tenant_id) is entry:
+                    self._bytes += nbytes - entry.nbytes
+                    entry.nbytes = nbytes
+                    self._shrink(keep=tenant_id)
+        return swapped
+
+    async def watch(self, interval: float = 2.0) -> None:
+        """Polls the resident tenants' files forever; run it as an asyncio task."""
+        import asyncio
+
+        while True:
+            await asyncio.sleep(interval)
+            await asyncio.to_thread(self.reload_if_changed)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "resident": len(self._entries),
+                "resident_bytes": self._bytes,
+                "max_tenants": self.max_tenants,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "loads": self.loads,
+                "evictions": self.evictions,
+                "reloads": self.reloads,
+            }
+
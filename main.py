@@ -1,7 +1,15 @@
 # main.py
-# Запуск проекту: python3 main.py
+# Запуск проекту: python3 main.py              -> інтерактивний CLI
+#                 python3 main.py <command> ... -> команди (див. cli/commands.py)
 
-from cli.app import run_cli
+import sys
 
 if __name__ == "__main__":
-    run_cli()
\ No newline at end of file
+    if len(sys.argv) > 1:
+        from cli.commands import main
+
+        sys.exit(main(sys.argv[1:]))
+
+    from cli.app import run_cli
+
+    run_cli()
@@ -0,0 +1,260 @@
+"""Benchmark suite for the pricing core, the API, CLI startup and history I/O.
+Run: python scripts/bench.py [--baseline FILE] [--threshold 0.25] [--history-sizes 1000,100000,1000000]
+Writes a JSON report (default: bench_output.txt in the project root). Exits with
+code 1 when a benchmark is slower than the baseline report by more than the
+threshold (0.25 = 25%), 0 otherwise.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import numpy as np  # noqa: E402
+
+from core.batch import calculate_quote_batch  # noqa: E402
+from core.calculator import calculate_quote  # noqa: E402
+from core.config import load_trades  # noqa: E402
+from core.models import PricingType, QuoteRequest  # noqa: E402
+
+Results = Dict[str, Dict[str, float]]
+
+
+def timed(fn: Callable[[], Any], *, number: int, repeat: int) -> float:
+    """Best-of-`repeat` seconds per call."""
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / number
+
+
+def record(results: Results, name: str, seconds_per_op: float, n: int) -> None:
+    results[name] = {
+        "seconds_per_op": seconds_per_op,
+        "ops_per_second": 1.0 / seconds_per_op if seconds_per_op else float("inf"),
+        "n": n,
+    }
+    print(f"{name:<40} {seconds_per_op * 1e6:>12.2f} us/op  (n={n})")
+
+
+# ---------- CORE ----------
+
+def bench_core(results: Results, *, number: int, repeat: int) -> None:
+    trades = load_trades()
+
+    # One preset per pricing type.
+    by_type: Dict[PricingType, QuoteRequest] = {}
+    for trade_id, trade in trades.items():
+        for preset_id, preset in trade.presets.items():
+            by_type.setdefault(
+                preset.pricing_type,
+                QuoteRequest(trade_id=trade_id, preset_id=preset_id, area_sqft=113, full_service_materials=True),
+            )
+    for pricing_type, req in by_type.items():
+        seconds = timed(lambda: calculate_quote(trades, req), number=number, repeat=repeat)
+        record(results, f"calculate_quote.{pricing_type.value}", seconds, number)
+
+    payload = {"trade_id": "tile", "preset_id": "kitchen_splash", "area_sqft": 113, "waste_pct": 10, "labor_rate_per_sqft": 12.5}
+    seconds = timed(lambda: QuoteRequest.model_validate(payload), number=number, repeat=repeat)
+    record(results, "QuoteRequest.validate", seconds, number)
+
+    rows = 100_000
+    presets = [(t, p) for t, trade in trades.items() for p in trade.presets]
+    pick = np.arange(rows) % len(presets)
+    columns = {
+        "trade_id": np.array([presets[i][0] for i in pick], dtype=object),
+        "preset_id": np.array([presets[i][1] for i in pick], dtype=object),
+        "area_sqft": np.linspace(0, 500, rows),
+    }
+    seconds = timed(lambda: calculate_quote_batch(trades, columns), number=1, repeat=repeat)
+    record(results, "calculate_quote_batch.per_row", seconds / rows, rows)
+
+
+# ---------- API ----------
+
+async def _bench_api(results: Results, *, number: int, repeat: int) -> None:
+    import httpx
+
+    from web.api import app
+
+    payload = {"trade_id": "tile", "preset_id": "kitchen_splash", "area_sqft": 113, "waste_pct": 10}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        etag = (await client.get("/api/trades")).headers.get("etag", "")
+
+        async def run(method: str, url: str, **kwargs) -> float:
+            best = float("inf")
+            for _ in range(repeat):
+                start = time.perf_counter()
+                for _ in range(number):
+                    response = await client.request(method, url, **kwargs)
+                    if response.status_code >= 400:
+                        raise RuntimeError(f"{method} {url} -> {response.status_code}: {response.text}")
+                best = min(best, (time.perf_counter() - start) / number)
+            return best
+
+        record(results, "api.POST /api/quote", await run("POST", "/api/quote", json=payload), number)
+        record(results, "api.GET /api/trades", await run("GET", "/api/trades"), number)
+        record(results, "api.GET /api/trades (304)", await run("GET", "/api/trades", headers={"If-None-Match": etag}), number)
+
+
+def bench_api(results: Results, *, number: int, repeat: int) -> None:
+    asyncio.run(_bench_api(results, number=number, repeat=repeat))
+
+
+# ---------- CLI ----------
+
+def bench_cli(results: Results, *, number: int, repeat: int) -> None:
+    """Process startup of `main.py quote` vs. a round trip to a warm `main.py serve --stdio`."""
+    cmd = [sys.executable, str(ROOT / "main.py"), "quote", "--preset", "shower", "--area", "113", "--json"]
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL)
+        best = min(best, time.perf_counter() - start)
+    record(results, "cli.quote.startup", best, 1)
+
+    daemon = subprocess.Popen(
+        [sys.executable, str(ROOT / "main.py"), "serve", "--stdio"],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    line = json.dumps({"preset_id": "shower", "area_sqft": 113}) + "\n"
+    try:
+        def round_trip() -> None:
+            daemon.stdin.write(line)
+            daemon.stdin.flush()
+            daemon.stdout.readline()
+
+        round_trip()  # wait for startup
+        record(results, "cli.serve_stdio.round_trip", timed(round_trip, number=number, repeat=repeat), number)
+    finally:
+        daemon.stdin.close()
+        daemon.wait()
+
+
+# ---------- HISTORY ----------
+
+def _history_record(i: int, start: datetime) -> Dict[str, Any]:
+    total = 200.0 + (i * 37) % 5000
+    return {
+        "meta": {
+            "created_at": (start + timedelta(minutes=i)).isoformat(timespec="seconds"),
+            "trade_id": "tile",
+            "trade_label": "Tile",
+            "preset_id": ("kitchen_splash", "shower", "floor")[i % 3],
+            "preset_label": "Preset",
+            "pricing_type": ("FLAT_MIN_TOTAL", "CUSTOM", "MIN_RATE_PER_SQFT")[i % 3],
+            "client_name": f"client_{i % 1000}",
+            "job_address": f"{i % 5000} Main St",
+        },
+        "input": {"area_sqft": 10.0 + i % 300, "waste_pct": 10.0, "include_labor": True, "include_materials": True},
+        "output": {"subtotal": total / 1.05, "gst": total - total / 1.05, "total": total, "notes": []},
+    }
+
+
+def bench_history(results: Results, *, sizes: List[int]) -> None:
+    from core.history import HistoryStore
+    from core.models import HistoryQuery
+
+    start = datetime(2024, 1, 1)
+    with tempfile.TemporaryDirectory(prefix="quote-bench-") as tmp:
+        for size in sizes:
+            store = HistoryStore(Path(tmp) / f"history_{size}.lance", batch_size=10_000)
+
+            t0 = time.perf_counter()
+            for i in range(size):
+                store.append(_history_record(i, start))
+            store.flush()
+            record(results, f"history.write.{size}.per_quote", (time.perf_counter() - t0) / size, size)
+
+            t0 = time.perf_counter()
+            total = store.scan(["output.total"]).column(0)
+            record(results, f"history.scan_total.{size}", time.perf_counter() - t0, len(total))
+
+            q = HistoryQuery(client_name="client_7", total_min=1000, limit=50)
+            store.query(q)  # warm-up: opens indexes
+            t0 = time.perf_counter()
+            page = store.query(q)
+            record(results, f"history.query_page.{size}", time.perf_counter() - t0, len(page.items))
+
+            # Unfiltered pages: newest, and one from the middle of the history by
+            # cursor; both should stay flat as the history grows.
+            middle = int(store.scan(["quote_id"]).column(0)[size // 2].as_py())
+            for name, q in (("newest", HistoryQuery(limit=50)), ("cursor", HistoryQuery(limit=50, cursor=middle))):
+                store.query(q)
+                t0 = time.perf_counter()
+                page = store.query(q)
+                record(results, f"history.query_{name}.{size}", time.perf_counter() - t0, len(page.items))
+
+
+# ---------- REPORT ----------
+
+def compare(results: Results, baseline: Results, threshold: float) -> List[Dict[str, Any]]:
+    regressions = []
+    for name, current in results.items():
+        before = baseline.get(name)
+        if not before or not before.get("seconds_per_op"):
+            continue
+        ratio = current["seconds_per_op"] / before["seconds_per_op"]
+        if ratio > 1.0 + threshold:
+            regressions.append({"name": name, "baseline": before["seconds_per_op"], "current": current["seconds_per_op"], "ratio": ratio})
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", type=Path, default=ROOT / "bench_output.txt")
+    parser.add_argument("--baseline", type=Path, help="earlier report to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown vs baseline (0.25 = 25%%)")
+    parser.add_argument("--number", type=int, default=2000, help="calls per timing run")
+    parser.add_argument("--repeat", type=int, default=5, help="timing runs (best is kept)")
+    parser.add_argument("--history-sizes", default="1000,100000,1000000", help="comma-separated record counts ('' = skip)")
+    parser.add_argument("--only", choices=["core", "api", "cli", "history"], action="append", help="run only these groups")
+    args = parser.parse_args()
+
+    groups = set(args.only or ["core", "api", "cli", "history"])
+    results: Results = {}
+    if "core" in groups:
+        bench_core(results, number=args.number, repeat=args.repeat)
+    if "api" in groups:
+        bench_api(results, number=max(1, args.number // 10), repeat=args.repeat)
+    if "cli" in groups:
+        bench_cli(results, number=max(1, args.number // 10), repeat=args.repeat)
+    if "history" in groups and args.history_sizes:
+        bench_history(results, sizes=[int(s) for s in args.history_sizes.split(",")])
+
+    regressions: List[Dict[str, Any]] = []
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        regressions = compare(results, baseline.get("results", {}), args.threshold)
+
+    report = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "threshold": args.threshold,
+        "baseline": str(args.baseline) if args.baseline else None,
+        "results": results,
+        "regressions": regressions,
+    }
+    args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"\nReport: {args.output}")
+
+    for r in regressions:
+        print(f"❌ {r['name']}: {r['ratio']:.2f}x slower than baseline")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,17 +2,264 @@
 Run: python scripts/quickcheck.py
 Exits with code 0 on success, non-zero on failure.
 """
-from core.calculator import calculate_quote
-from core.models import QuoteRequest
+import random
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from core.analytics import DIMENSIONS, AnalyticsStore, group_history  # noqa: E402
+from core.batch import BATCH_RESULT_FIELDS, FIXED_OVERFLOW_ERROR, calculate_quote_batch  # noqa: E402
+from core.calculator import calculate_quote, calculate_with_plan  # noqa: E402
+from core.config import load_trades  # noqa: E402
+from core.fixedpoint import fixed_quote  # noqa: E402
+from core.live import LiveQuote  # noqa: E402
+from core.models import AnalyticsQuery, QuoteRequest, TradeConfig  # noqa: E402
+from core.plans import get_plan  # noqa: E402
 
 
 def approx(a, b, tol=1e-6):
     return abs(a - b) <= tol
 
 
+def maybe(rng, value, none=0.3):
+    return None if rng.random() < none else value
+
+
+# Random value of each editable QuoteRequest field (None = preset default).
+FIELDS = {
+    "area_sqft": lambda rng: round(rng.uniform(0, 400), 2),
+    "waste_pct": lambda rng: maybe(rng, round(rng.uniform(0, 30), 1)),
+    "include_labor": lambda rng: rng.choice((None, True, False)),
+    "include_materials": lambda rng: rng.choice((None, True, False)),
+    "labor_rate_per_sqft": lambda rng: maybe(rng, round(rng.uniform(0, 12), 2)),
+    "material_rate_per_sqft": lambda rng: maybe(rng, round(rng.uniform(0, 12), 2)),
+    "full_service_materials": lambda rng: rng.random() < 0.5,
+    "materials_handling_fee": lambda rng: maybe(rng, round(rng.uniform(0, 200), 2)),
+    "materials_markup_pct": lambda rng: maybe(rng, round(rng.uniform(0, 30), 1)),
+    "use_manual_total": lambda rng: rng.random() < 0.2,
+    "manual_total": lambda rng: maybe(rng, round(rng.uniform(0, 5000), 2), none=0.1),
+}
+
+
+def random_fields(rng):
+    return {name: make(rng) for name, make in FIELDS.items()}
+
+
+def priced(fn):
+    """fn() or the ValueError message it raises (both paths must agree on errors too)."""
+    try:
+        return fn()
+    except ValueError as e:
+        return str(e)
+
+
+def check_live(trades, steps=20000, seed=20):
+    """LiveQuote.update over random delta sequences == calculate_with_plan on the same request."""
+    rng = random.Random(seed)
+    presets = [(trade_id, preset_id) for trade_id, trade in trades.items() for preset_id in trade.presets]
+    trade_id, preset_id = rng.choice(presets)
+    fields = random_fields(rng)
+    live = LiveQuote()
+    for _ in range(steps):
+        if rng.random() < 0.05:
+            trade_id, preset_id = rng.choice(presets)  # new plan: full recompute
+        for name in rng.sample(sorted(FIELDS), rng.randint(1, 3)):
+            fields[name] = FIELDS[name](rng)
+        plan = get_plan(trades, trade_id, preset_id)
+        req = QuoteRequest(trade_id=trade_id, preset_id=preset_id, **fields)
+        got = priced(lambda: live.update(plan, req)[0])
+        want = priced(lambda: calculate_with_plan(plan, req))
+        assert got == want, (fields, got, want)
+    print(f"Live stages == calculate_with_plan: {steps} random deltas")
+
+
+# Version fields and a random value for each (min_total may be set to null).
+VERSION_FIELDS = {
+    "default_waste_pct": lambda rng: round(rng.uniform(0, 20), 1),
+    "default_labor_rate_per_sqft": lambda rng: round(rng.uniform(1, 15), 2),
+    "default_material_rate_per_sqft": lambda rng: round(rng.uniform(1, 15), 2),
+    "min_total": lambda rng: maybe(rng, round(rng.uniform(100, 3000), 2)),
+    "min_labor_rate_per_sqft": lambda rng: round(rng.uniform(1, 10), 2),
+    "default_full_service_handling_fee": lambda rng: round(rng.uniform(0, 300), 2),
+    "default_full_service_markup_pct": lambda rng: round(rng.uniform(0, 25), 1),
+}
+
+
+def check_as_of(trades, queries=2000, seed=21):
+    """get_plan(as_of=...) (bisect over merged versions) == replaying the versions in order by hand."""
+    rng = random.Random(seed)
+    base = datetime(2025, 1, 1)
+    days = [base + timedelta(days=d, hours=rng.randint(0, 23)) for d in rng.sample(range(730), 12)]
+    versioned = {}
+    for trade_id, trade in trades.items():
+        data = trade.model_dump(exclude={"versions"})
+        # Trade (GST) versions share some starts with the preset versions.
+        data["versions"] = [
+            {"effective_from": when, "gst_rate": round(rng.uniform(0, 0.15), 5)}
+            for when in rng.sample(days, 4)
+        ]
+        for preset in data["presets"].values():
+            preset["versions"] = [
+                {"effective_from": when, **{name: VERSION_FIELDS[name](rng) for name in rng.sample(sorted(VERSION_FIELDS), rng.randint(1, 3))}}
+                for when in rng.sample(days, 6)
+            ]
+        versioned[trade_id] = TradeConfig.model_validate(data)
+
+    def reference(trade_id, preset_id, when):
+        trade = versioned[trade_id]
+        preset = trade.presets[preset_id]
+        rates, gst_rate = {}, trade.gst_rate
+        for version in preset.versions:
+            if version.effective_from <= when:
+                rates.update(version.changes())
+        for version in trade.versions:
+            if version.effective_from <= when:
+                gst_rate = version.gst_rate
+        flat = trade.model_copy(update={
+            "gst_rate": gst_rate,
+            "versions": [],
+            "presets": {preset_id: preset.model_copy(update={**rates, "versions": []})},
+        })
+        return {trade_id: flat}
+
+    presets = [(trade_id, preset_id) for trade_id, trade in versioned.items() for preset_id in trade.presets]
+    edges = [when + delta for when in days for delta in (timedelta(0), -timedelta(microseconds=1))]
+    for i in range(queries):
+        when = edges[i] if i < len(edges) else base + timedelta(seconds=rng.uniform(-86400, 800 * 86400))
+        trade_id, preset_id = rng.choice(presets)
+        fields = random_fields(rng)
+        fields["use_manual_total"] = False
+        req = QuoteRequest(trade_id=trade_id, preset_id=preset_id, **fields)
+        got = calculate_quote(versioned, req, as_of=when)[2]
+        want = calculate_quote(reference(trade_id, preset_id, when), req)[2]
+        assert got == want, (trade_id, preset_id, when, got, want)
+    print(f"as_of lookup == linear version replay: {queries} random times")
+
+
+def check_fixed_batch(trades, rows=5000, seed=12):
+    """calculate_quote_batch(fixed_point=True) == fixed_quote row by row; int64 overflow is a row error."""
+    rng = random.Random(seed)
+    presets = [(trade_id, preset_id) for trade_id, trade in trades.items() for preset_id in trade.presets]
+    reqs = []
+    for _ in range(rows):
+        trade_id, preset_id = rng.choice(presets)
+        fields = random_fields(rng)
+        if rng.random() < 0.02:
+            fields["area_sqft"] = 1e15  # past the int64 batch range
+        reqs.append(QuoteRequest(trade_id=trade_id, preset_id=preset_id, **fields))
+
+    columns = {name: [getattr(req, name) for req in reqs] for name in ("trade_id", "preset_id", *FIELDS)}
+    out = calculate_quote_batch(trades, columns, fixed_point=True)
+    overflow = 0
+    for i, req in enumerate(reqs):
+        error = out["error"][i]
+        if error == FIXED_OVERFLOW_ERROR:
+            overflow += 1
+            continue
+        want = priced(lambda: fixed_quote(get_plan(trades, req.trade_id, req.preset_id), req))
+        if isinstance(want, str):
+            assert error == want, (req, error, want)
+            continue
+        assert error is None, (req, error)
+        got = {name: int(out[name][i]) for name in BATCH_RESULT_FIELDS}
+        assert got == {name: getattr(want, name) for name in BATCH_RESULT_FIELDS}, (req, got, want)
+    assert overflow, "no row hit the int64 overflow check"
+    print(f"Fixed-point batch == scalar: {rows} random rows ({overflow} overflow errors)")
+
+
+def check_analytics(trades, seed=18):
+    """Incremental aggregates == a full group_history after a burst import, later saves, compaction and outcomes."""
+    from core.history import HistoryStore, OutcomeStore, quote_record
+    from core.history_writer import HistoryWriter
+
+    rng = random.Random(seed)
+    presets = [(trade_id, preset_id) for trade_id, trade in trades.items() for preset_id in trade.presets]
+
+    def record():
+        trade_id, preset_id = rng.choice(presets)
+        fields = random_fields(rng)
+        fields["use_manual_total"] = False
+        req = QuoteRequest(trade_id=trade_id, preset_id=preset_id, **fields)
+        plan = get_plan(trades, trade_id, preset_id)
+        return quote_record(plan, req, calculate_with_plan(plan, req), client_name=rng.choice(["", "Ann", "Bob"]))
+
+    def agree(analytics, history, outcomes, step):
+        analytics.refresh()
+        for dimension in DIMENSIONS:
+            want = group_history(history, outcomes, AnalyticsQuery(by=[dimension]))
+            assert analytics.report(dimension) == want, (step, dimension)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        history = HistoryStore(Path(tmp) / "history.lance", batch_size=250, max_fragments=4)
+        outcomes = OutcomeStore(Path(tmp) / "outcomes.lance")
+        analytics = AnalyticsStore(history, outcomes, refresh_seconds=0)
+        ids = history.extend(record() for _ in range(2000))  # burst import
+        history.flush()
+        agree(analytics, history, outcomes, "import")
+
+        writer = HistoryWriter(history, on_write=analytics.observe)
+        ids.append(writer.submit(record()))  # one more save, folded by the hook
+        writer.flush()
+        other = HistoryStore(history.path, batch_size=50, maintain_on_write=False)  # another process: no hook
+        ids += other.extend(record() for _ in range(120))
+        other.flush()
+        agree(analytics, history, outcomes, "save")
+
+        for quote_id in rng.sample(ids, 40):
+            analytics.set_outcome(quote_id, rng.choice(("won", "lost", "open")))
+        history.maintain()  # compaction rewrites rows already folded
+        ids.append(writer.submit(record()))
+        writer.flush()
+        agree(analytics, history, outcomes, "outcomes")
+    print(f"Incremental analytics == group_history: {len(ids)} quotes")
+
+
+def check_history_pages(trades, seed=6):
+    """HistoryStore.query() (quote_id windows) pages == one plain newest-first sort, on uneven id density."""
+    from core.history import HistoryStore, quote_record, record_to_row
+    from core.models import HistoryQuery
+
+    rng = random.Random(seed)
+    plan = get_plan(trades, "tile", "floor")
+    ids = sorted(rng.sample(range(1, 1 << 40), 1500) + list(range(1 << 41, (1 << 41) + 1500)))  # sparse, then dense
+    rows = []
+    for quote_id in ids:
+        req = QuoteRequest(trade_id="tile", preset_id="floor", area_sqft=rng.randint(1, 400))
+        record = quote_record(plan, req, calculate_with_plan(plan, req), client_name=rng.choice(["Ann", "Bob", "Cy"]))
+        rows.append(record_to_row(record, quote_id=quote_id))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        history = HistoryStore(Path(tmp) / "history.lance")
+        for i in range(0, len(rows), 500):
+            history.write_rows(rows[i:i + 500])
+        pages = 0
+        for filters in ({}, {"client_name": "Cy"}, {"total_min": 2000}):
+            want = [row["quote_id"] for row in reversed(rows) if all(
+                row["meta"]["client_name"] == v if k == "client_name" else row["output"]["total"] >= v
+                for k, v in filters.items()
+            )]
+            got, cursor = [], None
+            while True:
+                page = history.query(HistoryQuery(limit=97, cursor=cursor, **filters))
+                got += [item["quote_id"] for item in page.items]
+                pages += 1
+                cursor = page.next_cursor
+                if cursor is None:
+                    break
+            assert got == want, (filters, len(got), len(want))
+    print(f"History pages == newest-first sort: {pages} pages")
+
+
 def main():
+    trades = load_trades()
+
     req = QuoteRequest(
-        sqft=100,
+        trade_id="tile",
+        preset_id="shower",  # CUSTOM, auto-calculated
+        area_sqft=100,
         waste_pct=5,
         include_labor=True,
         include_materials=True,
@@ -20,13 +267,21 @@ def main():
         material_rate_per_sqft=3.0,
     )
 
-    res = calculate_quote(trade="tile", preset=None, req=req)
+    _preset, _trade, res = calculate_quote(trades, req)
+
+    assert approx(res.actual_area_sqft, 100.0)
+    assert approx(res.effective_area_sqft, 105.0)
+    assert approx(res.labor_cost, 250.0)  # labor uses actual area
+    assert approx(res.material_cost, 315.0)  # materials use area w/ waste
+    assert approx(res.subtotal, 565.0)
+    assert approx(res.gst, 28.25)
+    assert approx(res.total, 593.25)
 
-    assert approx(res.sqft_input, 100.0)
-    assert approx(res.sqft_with_waste, 105.0)
-    assert approx(res.labor_cost, 262.5)
-    assert approx(res.material_cost, 315.0)
-    assert approx(res.subtotal, 577.5)
+    check_live(trades)
+    check_as_of(trades)
+    check_fixed_batch(trades)
+    check_analytics(trades)
+    check_history_pages(trades)
 
     print("Quickcheck OK")
 
@@ -1,26 +1,136 @@
 # web/api.py
 from __future__ import annotations
 
+import asyncio
+import hmac
 import json
-from pathlib import Path
-from typing import Any, Dict
+import os
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from typing import Annotated, Any, AsyncIterator, Iterable, Iterator, List, Tuple
 
-from fastapi import FastAPI, Body, HTTPException
+import numpy as np
+from fastapi import FastAPI, Body, Depends, HTTPException, Query, Request, Response, WebSocket
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from starlette.requests import HTTPConnection
 
-from core.models import TradeConfig, QuoteRequest, QuoteResult
+from core.analytics import AnalyticsStore, group_history
+from core.cache import QuoteCache
+from core.config import ConfigSnapshot, ConfigStore
+from core.history import HistoryStore, OutcomeStore, history_filter, quote_record
+from core.history_writer import HistoryWriter
+from core.render import MEDIA_TYPES, document_name, export_documents, render_quote
+from core.reprice import RepriceStats, reprice_history, reprice_options
+from core.job import price_job
+from core.solver import solve, solve_batch
+from core.models import QuoteRequest, QuoteResult, JobRequest, JobResult, SolveRequest, SolveResult, HistoryQuery, HistoryPage, HistorySaveRequest, HistorySaveResult, SweepRequest, AnalyticsDimension, AnalyticsQuery, AnalyticsReport, OutcomeRequest, OutcomeResult, RepriceQuery, DocumentFormat, ExportQuery
 from core.calculator import calculate_quote
+from core.plans import get_plan
+from core.sweep import sweep_quote
+from core.tenants import TENANTS_DIR, TenantRegistry, UnknownTenant
+from web.assets import StaticSite, asset_response
+from web.live import serve_session
+from web.profiling import Profiler, ProfilerBusy, SlowLog, SlowRequestMiddleware, StackRing, collapsed, note_stages
+from web.tenancy import TenantMiddleware
+from web.metrics import CONFIG_RELOAD_SECONDS, CONTENT_TYPE as METRICS_CONTENT_TYPE, ERRORS, REGISTRY, STAGE_SECONDS, MetricsMiddleware
 
+# data/trades.json is polled for changes every N seconds (0 = never reload).
+CONFIG_POLL_SECONDS = float(os.environ.get("QUOTE_CONFIG_POLL_SECONDS", "2"))
 
-def _load_trades() -> Dict[str, TradeConfig]:
-    data_path = Path(__file__).resolve().parents[1] / "data" / "trades.json"
-    raw = json.loads(data_path.read_text(encoding="utf-8"))
-    return {trade_id: TradeConfig(**cfg) for trade_id, cfg in raw.items()}
+# Opt-in LRU cache of quote results (entries); 0 = off.
+QUOTE_CACHE_SIZE = int(os.environ.get("QUOTE_CACHE_SIZE", "0"))
 
+# Price in integer cents (core.fixedpoint) instead of binary floats.
+FIXED_POINT = os.environ.get("QUOTE_FIXED_POINT", "0").lower() in ("1", "true", "yes")
 
-TRADES: Dict[str, TradeConfig] = _load_trades()
+# Saved quotes are written in groups: up to N records or every T seconds.
+HISTORY_GROUP_SIZE = int(os.environ.get("QUOTE_HISTORY_GROUP_SIZE", "500"))
+HISTORY_GROUP_SECONDS = float(os.environ.get("QUOTE_HISTORY_GROUP_SECONDS", "0.05"))
 
-app = FastAPI(title="Quote Builder API", version="1.0.0")
+# The maintaining process (the only one; web.server picks worker 0) also indexes and
+# compacts what other processes appended, every N seconds (0 = only after its own writes).
+HISTORY_MAINTAIN_SECONDS = float(os.environ.get("QUOTE_HISTORY_MAINTAIN_SECONDS", "30"))
+
+# Inline the trades JSON into index.html (no /api/trades request before first paint).
+STATIC_INLINE_TRADES = os.environ.get("QUOTE_STATIC_INLINE_TRADES", "1").lower() in ("1", "true", "yes")
+
+# Live-quote WebSocket: deltas arriving within this window are priced once.
+LIVE_COALESCE_SECONDS = float(os.environ.get("QUOTE_LIVE_COALESCE_SECONDS", "0.05"))
+
+# Dashboard aggregates pick up quotes saved by other processes at most this stale.
+ANALYTICS_REFRESH_SECONDS = float(os.environ.get("QUOTE_ANALYTICS_REFRESH_SECONDS", "1"))
+
+# Per-tenant trades files (<dir>/<tenant>.json), loaded on first use; resident
+# tenants are bounded by count and by estimated snapshot memory.
+TENANTS_PATH = os.environ.get("QUOTE_TENANTS_DIR", str(TENANTS_DIR))
+TENANT_CACHE_SIZE = int(os.environ.get("QUOTE_TENANT_CACHE_SIZE", "256"))
+TENANT_CACHE_MB = float(os.environ.get("QUOTE_TENANT_CACHE_MB", "64"))
+
+# /api/admin/* (on-demand profile, slow-request log) needs this bearer token; unset = no admin routes.
+ADMIN_TOKEN = os.environ.get("QUOTE_ADMIN_TOKEN", "")
+PROFILE_MAX_SECONDS = float(os.environ.get("QUOTE_PROFILE_MAX_SECONDS", "60"))
+
+# Requests slower than N ms are kept (payload, stage timings, sampled stacks); 0 = off,
+# and then neither the middleware nor the background sampler exists.
+SLOW_REQUEST_MS = float(os.environ.get("QUOTE_SLOW_REQUEST_MS", "0"))
+SLOW_SAMPLE_MS = float(os.environ.get("QUOTE_SLOW_SAMPLE_MS", "10"))
+SLOW_LOG_SIZE = int(os.environ.get("QUOTE_SLOW_LOG_SIZE", "100"))
+
+
+
+def _record_reload(seconds: float, error: Exception | None) -> None:
+    CONFIG_RELOAD_SECONDS.labels("ok" if error is None else "rejected").observe(seconds)
+    if error is not None:
+        ERRORS.inc("config_reload")
+
+
+CONFIG = ConfigStore(on_reload=_record_reload)
+TENANTS = TenantRegistry(TENANTS_PATH, max_tenants=TENANT_CACHE_SIZE, max_bytes=int(TENANT_CACHE_MB * (1 << 20)), on_reload=_record_reload)
+HISTORY = HistoryStore()
+OUTCOMES = OutcomeStore()
+ANALYTICS = AnalyticsStore(HISTORY, OUTCOMES, refresh_seconds=ANALYTICS_REFRESH_SECONDS)
+HISTORY_WRITER = HistoryWriter(HISTORY, max_batch=HISTORY_GROUP_SIZE, max_delay=HISTORY_GROUP_SECONDS, on_write=ANALYTICS.observe)
+STATIC = StaticSite(inline_trades=STATIC_INLINE_TRADES)
+QUOTE_CACHE = QuoteCache(QUOTE_CACHE_SIZE, fixed_point=FIXED_POINT) if QUOTE_CACHE_SIZE > 0 else None
+PROFILER = Profiler()
+SLOW_LOG = SlowLog(SLOW_LOG_SIZE) if SLOW_REQUEST_MS > 0 else None
+SLOW_RING = StackRing(SLOW_SAMPLE_MS / 1000) if SLOW_LOG is not None else None
+
+
+async def _maintain_history(interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        await asyncio.to_thread(HISTORY.maintain)
+        await asyncio.to_thread(OUTCOMES.maintain)
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
+    watchers = []
+    if CONFIG_POLL_SECONDS > 0:
+        watchers = [asyncio.create_task(CONFIG.watch(CONFIG_POLL_SECONDS)), asyncio.create_task(TENANTS.watch(CONFIG_POLL_SECONDS))]
+    if HISTORY.maintain_on_write and HISTORY_MAINTAIN_SECONDS > 0:
+        watchers.append(asyncio.create_task(_maintain_history(HISTORY_MAINTAIN_SECONDS)))
+    writer = asyncio.create_task(HISTORY_WRITER.run())
+    if SLOW_RING is not None:
+        SLOW_RING.start()
+    try:
+        yield
+    finally:
+        for watcher in watchers:
+            watcher.cancel()
+        if SLOW_RING is not None:
+            SLOW_RING.stop()
+        # Graceful shutdown: everything already accepted is written before exit.
+        await HISTORY_WRITER.aclose()
+        await writer
+
+
+app = FastAPI(title="Quote Builder API", version="1.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -29,6 +139,95 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
+if SLOW_LOG is not None:
+    app.add_middleware(SlowRequestMiddleware, threshold=SLOW_REQUEST_MS / 1000, slow_log=SLOW_LOG, ring=SLOW_RING)
+app.add_middleware(TenantMiddleware)  # outermost: routing and metrics see the path without /t/<tenant>
+
+
+# ---------- TENANTS ----------
+
+def _snapshot(conn: HTTPConnection) -> ConfigSnapshot:
+    """Config of the request's tenant (X-Tenant-ID or /t/<tenant>/), or the default trades.json."""
+    tenant = getattr(conn.state, "tenant", None)
+    if tenant is None:
+        return CONFIG.snapshot
+    try:
+        return TENANTS.snapshot(tenant)
+    except UnknownTenant as e:
+        ERRORS.inc("unknown_tenant")
+        raise HTTPException(status_code=404, detail=str(e))
+    except (OSError, ValueError) as e:
+        ERRORS.inc("tenant_config")
+        raise HTTPException(status_code=503, detail=f"Tenant {tenant!r} config cannot be loaded: {e}")
+
+
+def _shared_store(conn: HTTPConnection) -> None:
+    """History and analytics are one store for the whole deployment: refuse tenant-scoped calls."""
+    if getattr(conn.state, "tenant", None) is not None:
+        ERRORS.inc("bad_request")
+        raise HTTPException(status_code=400, detail="History and analytics are not tenant-scoped; call without a tenant")
+
+
+Config = Annotated[ConfigSnapshot, Depends(_snapshot)]
+SharedOnly = [Depends(_shared_store)]
+
+
+@app.get("/api/tenants")
+def tenant_stats() -> dict[str, Any]:
+    """Resident tenant configs: count, estimated bytes, hits / loads / evictions / reloads."""
+    return TENANTS.stats()
+
+
+# ---------- ADMIN ----------
+
+def _admin(request: Request) -> None:
+    """Bearer QUOTE_ADMIN_TOKEN; without a configured token the admin routes do not exist (404)."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        ERRORS.inc("admin_auth")
+        raise HTTPException(status_code=401, detail="Admin token required", headers={"WWW-Authenticate": "Bearer"})
+
+
+AdminOnly = [Depends(_admin)]
+
+
+@app.post("/api/admin/profile", include_in_schema=False, dependencies=AdminOnly)
+async def admin_profile(
+    seconds: float = Query(5, gt=0),
+    interval_ms: float = Query(5, ge=1, le=1000),
+    idle: bool = False,
+) -> Response:
+    """
+    Samples every thread's stack for `seconds` and returns the counts in
+    collapsed format (flamegraph.pl, speedscope). The sampler runs on its
+    own thread only for the duration; one profile at a time (409).
+    """
+    if seconds > PROFILE_MAX_SECONDS:
+        ERRORS.inc("bad_request")
+        raise HTTPException(status_code=400, detail=f"seconds must be <= {PROFILE_MAX_SECONDS:g}")
+    try:
+        counts, samples = await PROFILER.profile(seconds, interval_ms / 1000, idle=idle)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return Response(content=collapsed(counts), media_type="text/plain; charset=utf-8", headers={"X-Profile-Samples": str(samples)})
+
+
+@app.get("/api/admin/slow", include_in_schema=False, dependencies=AdminOnly)
+def admin_slow(limit: int = Query(20, ge=1, le=1000)) -> dict[str, Any]:
+    """Newest slow requests (QUOTE_SLOW_REQUEST_MS) with payload, timings and collapsed stacks."""
+    if SLOW_LOG is None:
+        return {"enabled": False, "threshold_ms": None, "total": 0, "requests": []}
+    return {"enabled": True, "threshold_ms": SLOW_REQUEST_MS, "total": SLOW_LOG.total, "requests": SLOW_LOG.entries()[:limit]}
+
+
+@app.delete("/api/admin/slow", include_in_schema=False, dependencies=AdminOnly)
+def admin_slow_clear() -> dict[str, bool]:
+    if SLOW_LOG is not None:
+        SLOW_LOG.clear()
+    return {"ok": True}
 
 
 @app.get("/health")
@@ -36,21 +235,448 @@ def health() -> dict[str, str]:
     return {"status": "ok"}
 
 
+@app.get("/metrics", include_in_schema=False)
+def metrics() -> Response:
+    """Prometheus text exposition."""
+    return Response(content=REGISTRY.render(), media_type=METRICS_CONTENT_TYPE)
+
+
+# ---------- UI ----------
+
+@app.api_route("/", methods=["GET", "HEAD"], include_in_schema=False)
+def index(request: Request, snapshot: Config) -> Response:
+    page = STATIC.index(snapshot.trades_json, snapshot.version, snapshot.mtime_ns // 1_000_000_000)
+    if page is None:
+        raise HTTPException(status_code=404, detail="UI not installed")
+    return asset_response(page, request)
+
+
+@app.api_route("/static/{path:path}", methods=["GET", "HEAD"], include_in_schema=False)
+def static_file(path: str, request: Request) -> Response:
+    """Files of web/static, precompressed at startup; fingerprinted names are cached for a year."""
+    asset = STATIC.get(path)
+    if asset is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    return asset_response(asset, request, immutable=STATIC.immutable(path, request, asset))
+
+
 @app.get("/api/trades")
-def get_trades() -> dict[str, Any]:
-    # pydantic v1/v2 safe dump
-    def dump(m):
-        return m.model_dump() if hasattr(m, "model_dump") else m.dict()
+def get_trades(request: Request, snapshot: Config) -> Response:
+    # Pre-serialized per config snapshot; clients revalidate with If-None-Match.
+    headers = {
+        "ETag": snapshot.etag,
+        "Cache-Control": "no-cache",
+        "X-Config-Version": snapshot.version,
+    }
+    if snapshot.etag in _etags(request.headers.get("if-none-match")):
+        return Response(status_code=304, headers=headers)
+    return Response(content=snapshot.trades_json, media_type="application/json", headers=headers)
+
+
+def _etags(header: str | None) -> list[str]:
+    if not header:
+        return []
+    return [tag.strip().removeprefix("W/") for tag in header.split(",")]
+
+
+def _calculate(snapshot: ConfigSnapshot, req: QuoteRequest) -> QuoteResult:
+    if QUOTE_CACHE is not None:
+        return QUOTE_CACHE.calculate(snapshot.trades, req, snapshot.version)
+    _preset, _trade, result = calculate_quote(snapshot.trades, req, fixed_point=FIXED_POINT)
+    return result
+
+
+@app.get("/api/cache")
+def cache_stats() -> dict[str, Any]:
+    """Hit/miss/eviction counters of the quote result cache (QUOTE_CACHE_SIZE)."""
+    if QUOTE_CACHE is None:
+        return {"enabled": False}
+    return {"enabled": True, **QUOTE_CACHE.stats()}
+
 
-    return {k: dump(v) for k, v in TRADES.items()}
+_UNKNOWN_LABELS = ("unknown", "unknown", "unknown")
 
 
-@app.post("/api/quote", response_model=QuoteResult)
-def quote(req: QuoteRequest = Body(...)) -> QuoteResult:
+def _stage_labels(snapshot: ConfigSnapshot, req: QuoteRequest, *, tenant: bool = False) -> Tuple[str, str, str]:
+    # Only configured presets become label values (bounded cardinality); tenants
+    # bring their own trade / preset ids, so those are folded into one label.
+    plan = snapshot.plans.get((req.trade_id, req.preset_id))
+    if plan is None:
+        return _UNKNOWN_LABELS
+    if tenant:
+        return "tenant", "tenant", plan.pricing_type.value
+    return plan.trade_id, plan.preset_id, plan.pricing_type.value
+
+
+# The body is validated by hand (to time it); keep the schema in the OpenAPI docs.
+_QUOTE_BODY = {
+    "required": True,
+    "content": {"application/json": {"schema": QuoteRequest.model_json_schema()}},
+}
+
+
+@app.post("/api/quote", response_model=QuoteResult, openapi_extra={"requestBody": _QUOTE_BODY})
+async def quote(request: Request) -> Response:
+    body = await request.body()
+
+    t0 = time.perf_counter()
     try:
-        _preset, _trade, result = calculate_quote(TRADES, req)
-        return result
+        req = QuoteRequest.model_validate_json(body)
+    except ValidationError as e:
+        ERRORS.inc("validation")
+        errors = [{**err, "loc": ("body", *err["loc"])} for err in e.errors(include_url=False)]
+        raise RequestValidationError(errors, body=body)
+
+    t1 = time.perf_counter()
+    snapshot = _snapshot(request)
+    try:
+        result = _calculate(snapshot, req)
     except ValueError as e:
+        ERRORS.inc("bad_request")
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Invalid request: {e}")
\ No newline at end of file
+        ERRORS.inc("invalid_request")
+        raise HTTPException(status_code=400, detail=f"Invalid request: {e}")
+
+    t2 = time.perf_counter()
+    content = result.model_dump_json()
+    t3 = time.perf_counter()
+
+    labels = _stage_labels(snapshot, req, tenant=getattr(request.state, "tenant", None) is not None)
+    STAGE_SECONDS.labels("validate", *labels).observe(t1 - t0)
+    STAGE_SECONDS.labels("calculate", *labels).observe(t2 - t1)
+    STAGE_SECONDS.labels("serialize", *labels).observe(t3 - t2)
+    if SLOW_LOG is not None:
+        note_stages(validate=t1 - t0, calculate=t2 - t1, serialize=t3 - t2)
+    return Response(content=content, media_type="application/json")
+
+
+# ---------- LIVE QUOTE ----------
+
+@app.websocket("/ws/quote")
+async def live_quote(websocket: WebSocket) -> None:
+    """Live quote session: field deltas in, QuoteResult out (protocol in web/live.py)."""
+    # The tenant is resolved (and loaded) before accepting; each update re-reads it for reloads.
+    try:
+        _snapshot(websocket)
+    except HTTPException as e:
+        await websocket.close(code=1008, reason=str(e.detail)[:120])
+        return
+    await serve_session(websocket, lambda: _snapshot(websocket), coalesce_seconds=LIVE_COALESCE_SECONDS, fixed_point=FIXED_POINT)
+
+
+# ---------- JOB (multi-item) ----------
+
+@app.post("/api/job", response_model=JobResult)
+def job_quote(snapshot: Config, job: JobRequest = Body(...)) -> JobResult:
+    """
+    Prices all line items of a job in one request. Per-item preset rules
+    apply as in /api/quote; the optional job min_total applies to the sum;
+    GST is rounded once per trade rate, so line items add up to the total.
+    """
+    try:
+        return price_job(snapshot.trades, job, fixed_point=FIXED_POINT)
+    except ValueError as e:
+        ERRORS.inc("bad_request")
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+# ---------- BATCH (NDJSON) ----------
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def _iter_ndjson(body: bytes) -> Iterator[Tuple[int, Any]]:
+    """Yields (index, parsed line); blank lines are skipped."""
+    lines = (line for line in body.split(b"\n") if line.strip())
+    for index, line in enumerate(lines):
+        yield index, _parse_line(line)
+
+
+def _parse_line(line: bytes) -> Any:
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        return _BadLine(str(e))
+
+
+class _BadLine:
+    __slots__ = ("error",)
+
+    def __init__(self, error: str) -> None:
+        self.error = error
+
+
+def _quote_line(snapshot: ConfigSnapshot, index: int, item: Any) -> str:
+    """One NDJSON record: {"index", "result"} or {"index", "status", "error"}."""
+    if isinstance(item, _BadLine):
+        error: Any = f"Invalid JSON: {item.error}"
+        status = 400
+        ERRORS.inc("invalid_json")
+    else:
+        try:
+            req = QuoteRequest.model_validate(item)
+            result = _calculate(snapshot, req)
+            return f'{{"index":{index},"result":{result.model_dump_json()}}}\n'
+        except ValidationError as e:
+            error = json.loads(e.json(include_url=False))
+            status = 422
+        except ValueError as e:
+            error = str(e)
+            status = 400
+        except Exception as e:
+            error = f"Invalid request: {e}"
+            status = 400
+    record = {"index": index, "status": status, "error": error}
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+@app.post("/api/quote/batch")
+async def quote_batch(request: Request) -> StreamingResponse:
+    """
+    Prices many QuoteRequest payloads in one round trip.
+
+    Body: a JSON list, or NDJSON (Content-Type: application/x-ndjson, one request
+    per line). Response: NDJSON, one line per item in input order, streamed as
+    each item is computed. A bad item produces an error line, not a failed batch.
+    """
+    # The whole body is read up front: Starlette's StreamingResponse listens for
+    # client disconnect on the same receive channel, so the request body cannot
+    # be consumed while the response is streaming.
+    body = await request.body()
+
+    items: Iterable[Tuple[int, Any]]
+    if request.headers.get("content-type", "").startswith(NDJSON_MEDIA_TYPE):
+        items = _iter_ndjson(body)
+    else:
+        try:
+            data = json.loads(body)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid JSON: {e}")
+        if not isinstance(data, list):
+            raise HTTPException(status_code=400, detail="Expected a JSON list of quote requests")
+        items = enumerate(data)
+
+    # One snapshot for the whole batch, even if the config reloads mid-stream.
+    snapshot = _snapshot(request)
+    return StreamingResponse(
+        (_quote_line(snapshot, index, item) for index, item in items),
+        media_type=NDJSON_MEDIA_TYPE,
+    )
+
+
+# ---------- WHAT-IF SWEEP ----------
+
+@app.post("/api/sweep")
+def sweep(snapshot: Config, req: SweepRequest = Body(...)) -> Response:
+    """
+    Prices a 1-3 axis grid around `base` in one pass. Result arrays are flat,
+    row-major over `shape`; flag arrays are 0/1 (where FLAT_MIN_TOTAL /
+    MIN_RATE_PER_SQFT kicked in).
+    """
+    try:
+        grid = sweep_quote(snapshot.trades, req, fixed_point=FIXED_POINT)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Encoded by hand: response_model validation of 100k+ floats costs more than the pricing.
+    body = {
+        "axes": [{"param": a["param"], "values": a["values"].tolist()} for a in grid["axes"]],
+        "shape": grid["shape"],
+    }
+    for name in ("subtotal", "gst", "total"):
+        body[name] = grid[name].tolist()
+    for name in ("labor_rate_clamped", "min_total_applied"):
+        body[name] = grid[name].astype(np.uint8).tolist()
+    return Response(content=json.dumps(body, separators=(",", ":")), media_type="application/json")
+
+
+# ---------- REVERSE SOLVER ----------
+
+@app.post("/api/solve", response_model=SolveResult)
+def solve_quote(snapshot: Config, req: SolveRequest = Body(...)) -> SolveResult:
+    """
+    The labor rate, material rate, area or markup % that makes `base` cost
+    `target_total` incl. GST. No solution -> value null and a `reason`.
+    """
+    try:
+        return solve(snapshot.trades, req, fixed_point=FIXED_POINT)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/api/solve/batch", response_model=List[SolveResult])
+def solve_quote_batch(snapshot: Config, reqs: List[SolveRequest] = Body(...)) -> Response:
+    """
+    Many solver queries in one pass (vectorized per solve_for). Same fields as
+    /api/solve, in input order, without the per-item `result` breakdown.
+    """
+    out: List[Any] = [None] * len(reqs)
+    groups: dict[str, List[int]] = {}
+    for i, req in enumerate(reqs):
+        groups.setdefault(req.solve_for, []).append(i)
+
+    for solve_for, idx in groups.items():
+        bases = [reqs[i].base.model_dump() for i in idx]
+        columns = {name: [b[name] for b in bases] for name in bases[0]}
+        columns = {name: np.array(values, dtype=object) if name.endswith("_id") or None in values else np.array(values)
+                   for name, values in columns.items()}
+        try:
+            solved = solve_batch(snapshot.trades, columns, solve_for, [reqs[i].target_total for i in idx], fixed_point=FIXED_POINT)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        for j, i in enumerate(idx):
+            error = solved["error"][j]
+            item = {"solve_for": solve_for, "target_total": reqs[i].target_total}
+            if error is None:
+                item.update(
+                    value=float(solved["value"][j]),
+                    exact_value=float(solved["exact_value"][j]),
+                    achieved_total=float(solved["achieved_total"][j]),
+                    on_minimum=bool(solved["on_minimum"][j]),
+                    reason=None,
+                )
+            else:
+                item.update(value=None, exact_value=None, achieved_total=None, on_minimum=False, reason=error)
+            item["result"] = None
+            out[i] = item
+    return Response(content=json.dumps(out, separators=(",", ":")), media_type="application/json")
+
+
+# ---------- HISTORY ----------
+
+@app.get("/api/history", response_model=HistoryPage, dependencies=SharedOnly)
+def history(q: Annotated[HistoryQuery, Query()]) -> HistoryPage:
+    """Saved quotes, newest first. Page on with ?cursor=<next_cursor>."""
+    return HISTORY.query(q)
+
+
+@app.post("/api/history", response_model=HistorySaveResult, dependencies=SharedOnly)
+def save_history(body: HistorySaveRequest = Body(...), durable: bool = False) -> HistorySaveResult:
+    """
+    Prices `quote` and queues it for history. Returns as soon as the record is
+    queued; it is written (fsynced, visible in GET /api/history) with the next
+    group, QUOTE_HISTORY_GROUP_SECONDS at most. durable=true answers only once
+    the record is on disk (503 if the write fails; it stays queued).
+    """
+    snapshot = CONFIG.snapshot
+    try:
+        plan = get_plan(snapshot.trades, body.quote.trade_id, body.quote.preset_id, body.quote.as_of)
+        result = _calculate(snapshot, body.quote)
+    except ValueError as e:
+        ERRORS.inc("bad_request")
+        raise HTTPException(status_code=400, detail=str(e))
+
+    record = quote_record(plan, body.quote, result, client_name=body.client_name, job_address=body.job_address)
+    quote_id = HISTORY_WRITER.submit(record)
+    if durable:
+        try:
+            HISTORY_WRITER.flush()
+        except Exception as e:
+            ERRORS.inc("history_write")
+            raise HTTPException(status_code=503, detail=f"Quote {quote_id} is queued but not yet stored: {e}")
+    return HistorySaveResult(quote_id=quote_id, result=result)
+
+
+@app.get("/api/history/writer", dependencies=SharedOnly)
+def history_writer_stats() -> dict[str, int]:
+    """Queue depth and group-commit counters of the history writer."""
+    return HISTORY_WRITER.stats()
+
+
+@app.post("/api/history/{quote_id}/outcome", response_model=OutcomeResult, dependencies=SharedOnly)
+def set_outcome(quote_id: int, body: OutcomeRequest = Body(...)) -> OutcomeResult:
+    """Marks a saved quote won / lost ("open" takes the decision back)."""
+    if not HISTORY.count(filter=f"quote_id = {quote_id}"):
+        ERRORS.inc("not_found")
+        raise HTTPException(status_code=404, detail=f"Quote {quote_id} not found")
+    event_id = ANALYTICS.set_outcome(quote_id, body.outcome)
+    return OutcomeResult(quote_id=quote_id, outcome=body.outcome, event_id=event_id)
+
+
+def _reprice_lines(snapshot: ConfigSnapshot, q: RepriceQuery) -> Iterator[str]:
+    stats = RepriceStats()
+    for report in reprice_history(HISTORY, trades=snapshot.trades, stats=stats, **reprice_options(q, OUTCOMES)):
+        for row in report.to_pylist():
+            row["created_at"] = row["created_at"] and row["created_at"].isoformat()
+            yield json.dumps(row, ensure_ascii=False, separators=(",", ":")) + "\n"
+    yield json.dumps({"summary": stats.as_dict()}, separators=(",", ":")) + "\n"
+
+
+@app.post("/api/history/reprice", dependencies=SharedOnly)
+def reprice(q: RepriceQuery = Body(default_factory=RepriceQuery)) -> StreamingResponse:
+    """
+    Re-prices saved quotes (open ones unless include_decided) against the
+    current config. Response: NDJSON diff rows (old vs new subtotal / GST /
+    total, rule fired, error) in history order, then one {"summary": {...}}
+    line. For the full history use `main.py reprice` (process pool, file output).
+    """
+    return StreamingResponse(_reprice_lines(CONFIG.snapshot, q), media_type=NDJSON_MEDIA_TYPE)
+
+
+# ---------- DOCUMENTS ----------
+
+def _document(record: dict, fmt: DocumentFormat) -> Response:
+    headers = {"Content-Disposition": f'inline; filename="{document_name(record, fmt)}"'}
+    return Response(content=render_quote(record, fmt), media_type=MEDIA_TYPES[fmt], headers=headers)
+
+
+@app.post("/api/quote/document")
+def quote_document(snapshot: Config, body: HistorySaveRequest = Body(...), format: DocumentFormat = "html") -> Response:
+    """Prices `quote` and renders it as a document (not saved; no quote number)."""
+    try:
+        plan = get_plan(snapshot.trades, body.quote.trade_id, body.quote.preset_id, body.quote.as_of)
+        result = _calculate(snapshot, body.quote)
+    except ValueError as e:
+        ERRORS.inc("bad_request")
+        raise HTTPException(status_code=400, detail=str(e))
+    return _document(quote_record(plan, body.quote, result, client_name=body.client_name, job_address=body.job_address), format)
+
+
+@app.get("/api/history/export", dependencies=SharedOnly)
+def export_history(q: Annotated[ExportQuery, Query()]) -> StreamingResponse:
+    """
+    Matching saved quotes rendered into one zip: quote-<id>.<format> per quote
+    plus index.csv. For very large exports use `main.py export --workers N`.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=32 << 20)
+    export_documents(spool, HISTORY, fmt=q.format, filter=history_filter(HistoryQuery(**q.model_dump(exclude={"format"}))))
+    spool.seek(0)
+
+    def chunks() -> Iterator[bytes]:
+        with spool:
+            while block := spool.read(1 << 16):
+                yield block
+
+    headers = {"Content-Disposition": f'attachment; filename="quotes-{q.format}.zip"'}
+    return StreamingResponse(chunks(), media_type="application/zip", headers=headers)
+
+
+@app.get("/api/history/{quote_id}/document", dependencies=SharedOnly)
+def history_document(quote_id: int, format: DocumentFormat = "html") -> Response:
+    """One saved quote as a text / HTML document (templates in core/templates)."""
+    record = HISTORY.get(quote_id)
+    if record is None:
+        ERRORS.inc("not_found")
+        raise HTTPException(status_code=404, detail=f"Quote {quote_id} not found")
+    return _document(record, format)
+
+
+# ---------- ANALYTICS ----------
+
+@app.get("/api/analytics", response_model=AnalyticsReport, dependencies=SharedOnly)
+def analytics(
+    by: AnalyticsDimension = "trade",
+    limit: Annotated[int | None, Query(ge=1, le=10_000)] = None,
+) -> AnalyticsReport:
+    """
+    Dashboard totals by one dimension, from the incrementally maintained
+    aggregates: cost depends on the number of groups, not on history size.
+    """
+    return ANALYTICS.report(by, limit=limit)
+
+
+@app.get("/api/analytics/query", response_model=AnalyticsReport, dependencies=SharedOnly)
+def analytics_query(q: Annotated[AnalyticsQuery, Query()]) -> AnalyticsReport:
+    """Ad-hoc group-by (several dimensions, filters) over the matching history rows."""
+    return group_history(HISTORY, OUTCOMES, q)
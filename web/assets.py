@@ -0,0 +1,215 @@
+# web/assets.py
+# Статика UI: файли читаються і стискаються (gzip/brotli) один раз при старті; ETag, 304, довгий кеш для версіонованих.
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import mimetypes
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Dict, Mapping, Optional
+
+from fastapi import Request, Response
+
+try:  # optional: gzip only without it
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+STATIC_DIR = Path(__file__).resolve().parent / "static"
+
+# Compressing tiny bodies or already-compressed formats only costs CPU.
+MIN_COMPRESS_BYTES = 256
+COMPRESSIBLE = ("text/", "application/json", "application/javascript", "application/xml", "image/svg+xml")
+
+# Fingerprinted names (app.3f2a9c1b.js) never change content: cache them for a year.
+VERSIONED_NAME = re.compile(r"\.[0-9a-f]{8,}\.[A-Za-z0-9]+$")
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+# index.html placeholder replaced by the trades JSON when inlining is on.
+INITIAL_STATE_MARKER = b"<!--INITIAL_STATE-->"
+
+_ETAG_SUFFIX = {"br": "-br", "gzip": "-gz"}
+
+
+@dataclass(frozen=True)
+class Asset:
+    """One file, ready to send: identity body plus smaller precompressed variants."""
+
+    body: bytes
+    media_type: str
+    version: str  # content hash
+    mtime: int  # seconds
+    encodings: Dict[str, bytes] = field(default_factory=dict, repr=False)  # "br" / "gzip" -> body
+
+    @property
+    def last_modified(self) -> str:
+        return formatdate(self.mtime, usegmt=True)
+
+    def etag(self, encoding: Optional[str] = None) -> str:
+        return f'"{self.version}{_ETAG_SUFFIX.get(encoding, "")}"'
+
+    @classmethod
+    def build(cls, body: bytes, media_type: str, mtime: int) -> "Asset":
+        encodings: Dict[str, bytes] = {}
+        if len(body) >= MIN_COMPRESS_BYTES and media_type.startswith(COMPRESSIBLE):
+            variants = {"gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+            if brotli is not None:
+                variants["br"] = brotli.compress(body, quality=11)
+            encodings = {name: data for name, data in variants.items() if len(data) < len(body)}
+        return cls(
+            body=body,
+            media_type=media_type,
+            version=hashlib.sha256(body).hexdigest()[:16],
+            mtime=int(mtime),
+            encodings=encodings,
+        )
+
+
+def _media_type(path: Path) -> str:
+    media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+    if media_type.startswith("text/") or media_type in ("application/javascript", "application/json"):
+        media_type += "; charset=utf-8"
+    return media_type
+
+
+def load_assets(directory: Path = STATIC_DIR) -> Dict[str, Asset]:
+    """Every file under `directory`, keyed by its relative URL path ("index.html", "css/app.css")."""
+    assets: Dict[str, Asset] = {}
+    if not directory.is_dir():
+        return assets
+    for path in sorted(directory.rglob("*")):
+        if path.is_file() and not path.name.startswith("."):
+            stat = path.stat()
+            assets[path.relative_to(directory).as_posix()] = Asset.build(path.read_bytes(), _media_type(path), stat.st_mtime)
+    return assets
+
+
+def inline_state(page: Asset, trades_json: bytes, config_version: str, config_mtime: int) -> Asset:
+    """
+    `page` with the trades JSON in place of INITIAL_STATE_MARKER, so the UI
+    needs no /api/trades round trip before the first paint.
+    """
+    # "<" only occurs inside JSON strings, where \\u003c is equivalent; this keeps
+    # "</script>" in a label from closing the tag.
+    payload = trades_json.replace(b"<", b"\\u003c")
+    script = (
+        b'<script id="initial-state" type="application/json" data-version="'
+        + config_version.encode() + b'">' + payload + b"</script>"
+    )
+    body = page.body.replace(INITIAL_STATE_MARKER, script, 1)
+    return Asset.build(body, page.media_type, max(page.mtime, config_mtime))
+
+
+# ---------- HTTP ----------
+
+def _accepted(header: Optional[str]) -> Dict[str, float]:
+    """Accept-Encoding -> {coding: q}."""
+    accepted: Dict[str, float] = {}
+    for part in (header or "").split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    return accepted
+
+
+def choose_encoding(asset: Asset, header: Optional[str]) -> Optional[str]:
+    accepted = _accepted(header)
+    for name in ("br", "gzip"):
+        if name in asset.encodings and accepted.get(name, accepted.get("*", 0.0)) > 0:
+            return name
+    return None
+
+
+def _not_modified(asset: Asset, headers: Mapping[str, str]) -> bool:
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        # Weak comparison; any encoding variant of the same content matches.
+        if if_none_match.strip() == "*":
+            return True
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return any(asset.etag(encoding) in tags for encoding in (None, "gzip", "br"))
+
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return asset.mtime <= int(parsedate_to_datetime(if_modified_since).timestamp())
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def asset_response(asset: Asset, request: Request, *, immutable: bool = False) -> Response:
+    """GET/HEAD response for `asset`: 304 on a matching validator, else the best encoding."""
+    encoding = choose_encoding(asset, request.headers.get("accept-encoding"))
+    headers = {
+        "ETag": asset.etag(encoding),
+        "Last-Modified": asset.last_modified,
+        "Cache-Control": IMMUTABLE if immutable else REVALIDATE,
+        "Vary": "Accept-Encoding",
+    }
+    if _not_modified(asset, request.headers):
+        return Response(status_code=304, headers=headers)
+
+    body = asset.encodings[encoding] if encoding else asset.body
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    if request.method == "HEAD":
+        headers["Content-Length"] = str(len(body))
+        body = b""
+    return Response(content=body, media_type=asset.media_type, headers=headers)
+
+
+class StaticSite:
+    """
+    The static UI, loaded once (at import, so forked workers share it).
+    index.html is re-rendered with the inline trades state once per config
+    version and cached (the last `max_pages` versions: one per active
+    tenant); every other file is served as loaded.
+    """
+
+    def __init__(self, directory: Path = STATIC_DIR, *, inline_trades: bool = True, max_pages: int = 32) -> None:
+        self.directory = directory
+        self.inline_trades = inline_trades
+        self.max_pages = max_pages
+        self.assets = load_assets(directory)
+        self._pages: "OrderedDict[str, Asset]" = OrderedDict()  # config version -> rendered index.html
+        self._lock = threading.Lock()  # the index route runs in the threadpool
+
+    def index(self, trades_json: bytes, config_version: str, config_mtime: int) -> Optional[Asset]:
+        page = self.assets.get("index.html")
+        if page is None or not self.inline_trades or INITIAL_STATE_MARKER not in page.body:
+            return page
+        with self._lock:
+            rendered = self._pages.get(config_version)
+            if rendered is not None:
+                self._pages.move_to_end(config_version)
+                return rendered
+        rendered = inline_state(page, trades_json, config_version, config_mtime)
+        with self._lock:
+            self._pages[config_version] = rendered
+            while len(self._pages) > self.max_pages:
+                self._pages.popitem(last=False)
+        return rendered
+
+    def get(self, path: str) -> Optional[Asset]:
+        return self.assets.get(path)
+
+    @staticmethod
+    def immutable(path: str, request: Request, asset: Asset) -> bool:
+        """Fingerprinted file name, or ?v=<content hash> in the URL."""
+        return bool(VERSIONED_NAME.search(path)) or request.query_params.get("v") == asset.version
@@ -0,0 +1,134 @@
+# web/live.py
+# WebSocket-сесії живої квоти: дельти полів -> злиття "пачок" натискань -> інкрементальний перерахунок -> QuoteResult.
+
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import WebSocket, WebSocketDisconnect
+from pydantic import ValidationError
+
+from core.config import ConfigSnapshot
+from core.live import LiveQuote, merge_fields
+from core.models import QuoteRequest
+from core.plans import get_plan
+from web.metrics import ERRORS
+
+# Protocol (JSON text frames):
+#   client -> {"seq": 7, "fields": {"waste_pct": 12}}     field delta; null resets a field
+#   server -> {"seq": 7, "result": {...QuoteResult}, "stages": ["eff_area", ...]}
+#          or {"seq": 7, "error": "..."}                   the form keeps the delta; fix and resend
+# Deltas that arrive within the coalescing window are merged (last value per
+# field wins) and answered once, with the seq of the last one.
+
+
+class LiveSession:
+    def __init__(self, snapshot: Callable[[], ConfigSnapshot], *, fixed_point: bool = False) -> None:
+        self.snapshot = snapshot
+        self.fields: Dict[str, Any] = {}
+        self.quote = LiveQuote(fixed_point=fixed_point)
+
+    def apply(self, delta: Dict[str, Any]) -> Dict[str, Any]:
+        """Merges one (coalesced) delta and prices the form; returns the reply without seq."""
+        try:
+            self.fields = merge_fields(self.fields, delta)
+            req = QuoteRequest.model_validate(self.fields)
+            # A config reload yields new plan objects, so LiveQuote recomputes everything.
+            plan = get_plan(self.snapshot().trades, req.trade_id, req.preset_id, req.as_of)
+            result, stages = self.quote.update(plan, req)
+        except ValidationError as e:
+            ERRORS.inc("live_invalid")
+            return {"error": "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())}
+        except ValueError as e:
+            ERRORS.inc("live_invalid")
+            return {"error": str(e)}
+        except ArithmeticError as e:  # e.g. fixed-point cents of an amount too large for any int
+            ERRORS.inc("live_invalid")
+            return {"error": f"Invalid request: {e}"}
+        return {"result": result.model_dump(), "stages": stages}
+
+
+def _no_constant(name: str) -> Any:
+    raise ValueError(f"{name} is not a valid JSON number")
+
+
+def _delta(message: str) -> Dict[str, Any]:
+    data = json.loads(message, parse_constant=_no_constant)  # NaN / Infinity are not JSON
+    if not isinstance(data, dict) or not isinstance(data.get("fields", {}), dict):
+        raise ValueError('Expected {"seq": n, "fields": {...}}')
+    return data
+
+
+async def serve_session(
+    websocket: WebSocket,
+    snapshot: Callable[[], ConfigSnapshot],
+    *,
+    coalesce_seconds: float = 0.05,
+    fixed_point: bool = False,
+) -> None:
+    """
+    Runs one session until the client disconnects. A reader task queues the
+    incoming frames; the pricing loop waits for the first one, then keeps
+    merging whatever arrives within `coalesce_seconds` before pricing once.
+    """
+    await websocket.accept()
+    session = LiveSession(snapshot, fixed_point=fixed_point)
+    inbox: "asyncio.Queue[Optional[str]]" = asyncio.Queue()
+
+    async def read() -> None:
+        try:
+            while True:
+                await inbox.put(await websocket.receive_text())
+        except WebSocketDisconnect:
+            pass
+        finally:
+            await inbox.put(None)
+
+    reader = asyncio.create_task(read())
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            message = await inbox.get()
+            if message is None:
+                return
+            delta: Dict[str, Any] = {}
+            seq: Any = None
+            closed = False
+            deadline = loop.time() + coalesce_seconds
+            while True:
+                try:
+                    data = _delta(message)
+                except ValueError as e:  # JSONDecodeError included
+                    ERRORS.inc("live_invalid")
+                    await websocket.send_text(json.dumps({"seq": None, "error": str(e)}))
+                else:
+                    seq = data.get("seq", seq)
+                    delta.update(data.get("fields", {}))
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break  # a steady stream still gets one reply per window
+                if not inbox.empty():
+                    message = inbox.get_nowait()
+                else:
+                    try:
+                        message = await asyncio.wait_for(inbox.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                if message is None:
+                    closed = True
+                    break
+
+            if delta or seq is not None:
+                reply = session.apply(delta)
+                try:
+                    text = json.dumps({"seq": seq, **reply}, ensure_ascii=False, separators=(",", ":"), allow_nan=False)
+                except ValueError:  # float amounts overflowed to inf
+                    ERRORS.inc("live_invalid")
+                    text = json.dumps({"seq": seq, "error": "Amounts out of range"})
+                await websocket.send_text(text)
+            if closed:
+                return
+    finally:
+        reader.cancel()
@@ -0,0 +1,293 @@
+# web/profiling.py
+# Профілювання під навантаженням: семплер стеків (sys._current_frames) за запитом адміна + журнал повільних запитів.
+
+from __future__ import annotations
+
+import json
+import logging
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from datetime import datetime
+from pathlib import Path
+from types import CodeType, FrameType
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+MAX_DEPTH = 64  # frames kept per stack (innermost)
+
+# Python frames that only wait (idle pool workers, the event loop's select):
+# left out unless idle=True, like py-spy without --idle.
+_IDLE = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+}
+
+_labels: Dict[CodeType, str] = {}
+_samplers: set = set()  # idents of sampler threads: never part of a sample
+
+
+def _label(code: CodeType) -> str:
+    label = _labels.get(code)
+    if label is None:
+        path = Path(code.co_filename)
+        label = _labels[code] = f"{path.parent.name}/{path.name}:{code.co_name}"
+    return label
+
+
+def _stack(frame: Optional[FrameType]) -> Tuple[Optional[str], Tuple[str, ...]]:
+    """(leaf file:function, collapsed frames root first)."""
+    frames: List[str] = []
+    leaf: Optional[str] = None
+    if frame is not None:
+        leaf = f"{Path(frame.f_code.co_filename).name}:{frame.f_code.co_name}"
+    while frame is not None and len(frames) < MAX_DEPTH:
+        frames.append(_label(frame.f_code))
+        frame = frame.f_back
+    frames.reverse()
+    return leaf, tuple(frames)
+
+
+def sample_stacks(*, idle: bool = False) -> List[str]:
+    """One sample of every thread's stack (samplers excluded), collapsed: "thread;file:func;file:func"."""
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    stacks: List[str] = []
+    for ident, frame in sys._current_frames().items():
+        if ident in _samplers:
+            continue
+        leaf, frames = _stack(frame)
+        if not idle and leaf is not None and tuple(leaf.split(":", 1)) in _IDLE:
+            continue
+        stacks.append(";".join((names.get(ident, str(ident)),) + frames))
+    return stacks
+
+
+def collapsed(counts: Counter, *, limit: Optional[int] = None) -> str:
+    """Counter of stacks -> collapsed text ("stack count" per line, flamegraph.pl / speedscope input)."""
+    return "".join(f"{stack} {count}\n" for stack, count in counts.most_common(limit))
+
+
+# ---------- ON-DEMAND PROFILE ----------
+
+class ProfilerBusy(RuntimeError):
+    pass
+
+
+class Profiler:
+    """
+    Samples every thread's stack each `interval` seconds for a bounded time,
+    from its own daemon thread; nothing runs between profiles. One profile
+    at a time per process.
+    """
+
+    def __init__(self) -> None:
+        self._busy = threading.Lock()
+
+    def run(self, seconds: float, interval: float, *, idle: bool = False) -> Tuple[Counter, int]:
+        """Blocks for `seconds`; returns (stack counts, samples taken)."""
+        if not self._busy.acquire(blocking=False):
+            raise ProfilerBusy("A profile is already running")
+        try:
+            counts: Counter = Counter()
+            _samplers.add(threading.get_ident())
+            samples = 0
+            deadline = time.monotonic() + seconds
+            while True:
+                counts.update(sample_stacks(idle=idle))
+                samples += 1
+                pause = min(interval, deadline - time.monotonic())
+                if pause <= 0:
+                    return counts, samples
+                time.sleep(pause)
+        finally:
+            _samplers.discard(threading.get_ident())
+            self._busy.release()
+
+    async def profile(self, seconds: float, interval: float, *, idle: bool = False) -> Tuple[Counter, int]:
+        """run() on a dedicated thread; the event loop (and the requests on it) keeps going meanwhile."""
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        done: "asyncio.Future[Tuple[Counter, int]]" = loop.create_future()
+
+        def target() -> None:
+            try:
+                result = self.run(seconds, interval, idle=idle)
+            except BaseException as e:  # handed to the awaiting request
+                loop.call_soon_threadsafe(_settle, done, None, e)
+            else:
+                loop.call_soon_threadsafe(_settle, done, result, None)
+
+        threading.Thread(target=target, name="quote-profiler", daemon=True).start()
+        return await done
+
+
+def _settle(future, result, error: Optional[BaseException]) -> None:
+    if future.done():  # the request went away meanwhile
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+# ---------- SLOW REQUESTS ----------
+
+# Stage timings of the current request (seconds); set only while the slow log is on.
+_STAGES: ContextVar[Optional[Dict[str, float]]] = ContextVar("quote_request_stages", default=None)
+
+
+def note_stages(**seconds: float) -> None:
+    """Adds stage timings to the current request's slow-log entry (no-op outside one)."""
+    stages = _STAGES.get()
+    if stages is not None:
+        stages.update(seconds)
+
+
+class StackRing:
+    """
+    Background sampler keeping the last `window` seconds of stacks, so a slow
+    request can be given the samples taken while it ran.
+    """
+
+    def __init__(self, interval: float = 0.01, window: float = 30.0) -> None:
+        self.interval = interval
+        self.window = window
+        self._samples: Deque[Tuple[float, List[str]]] = deque()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="quote-slow-sampler", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def _run(self) -> None:
+        _samplers.add(threading.get_ident())
+        try:
+            while not self._stop.wait(self.interval):
+                now = time.monotonic()
+                stacks = sample_stacks()
+                with self._lock:
+                    self._samples.append((now, stacks))
+                    while self._samples and self._samples[0][0] < now - self.window:
+                        self._samples.popleft()
+        finally:
+            _samplers.discard(threading.get_ident())
+
+    def between(self, start: float, end: float) -> Counter:
+        """Stack counts sampled in [start, end] (time.monotonic())."""
+        counts: Counter = Counter()
+        with self._lock:
+            for at, stacks in self._samples:
+                if start <= at <= end:
+                    counts.update(stacks)
+        return counts
+
+
+class SlowLog:
+    """The last `size` slow requests, newest first; each is also logged as one JSON line."""
+
+    def __init__(self, size: int = 100) -> None:
+        self._entries: Deque[Dict[str, Any]] = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self.total = 0
+
+    def add(self, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries.appendleft(entry)
+            self.total += 1
+        log.warning("Slow request: %s", json.dumps({k: v for k, v in entry.items() if k != "profile"}, ensure_ascii=False))
+
+    def entries(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_CAPTURED_TYPES = (b"application/json", b"application/x-ndjson", b"text/")
+
+
+class SlowRequestMiddleware:
+    """
+    Pure ASGI middleware, installed only when the slow log is on. Requests
+    slower than `threshold` seconds are recorded with their method, path,
+    query, status, the first `max_body` bytes of a JSON / text body (no
+    headers: they may carry credentials), stage timings from note_stages()
+    and the stacks `ring` sampled while they ran.
+    """
+
+    def __init__(self, app, *, threshold: float, slow_log: SlowLog, ring: StackRing, max_body: int = 4096, profile_lines: int = 50) -> None:
+        self.app = app
+        self.threshold = threshold
+        self.slow_log = slow_log
+        self.ring = ring
+        self.max_body = max_body
+        self.profile_lines = profile_lines
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        capture = any(
+            name == b"content-type" and value.startswith(_CAPTURED_TYPES)
+            for name, value in scope.get("headers", ())
+        )
+        body = bytearray()
+        size = [0]
+        status = [500]
+
+        async def receive_wrapper():
+            message = await receive()
+            if message["type"] == "http.request":
+                chunk = message.get("body", b"")
+                size[0] += len(chunk)
+                if capture and len(body) < self.max_body:
+                    body.extend(chunk[: self.max_body - len(body)])
+            return message
+
+        async def send_wrapper(message) -> None:
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        stages: Dict[str, float] = {}
+        token = _STAGES.set(stages)
+        started_at = datetime.now()
+        start = time.monotonic()
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            _STAGES.reset(token)
+            end = time.monotonic()
+            if end - start >= self.threshold:
+                self.slow_log.add({
+                    "at": started_at.isoformat(timespec="milliseconds"),
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "query": scope.get("query_string", b"").decode("latin-1"),
+                    "tenant": scope.get("state", {}).get("tenant"),
+                    "status": status[0],
+                    "ms": round((end - start) * 1000, 3),
+                    "stages_ms": {name: round(seconds * 1000, 3) for name, seconds in stages.items()},
+                    "body": body.decode("utf-8", "replace") if capture else None,
+                    "body_bytes": size[0],
+                    "profile": collapsed(self.ring.between(start, end), limit=self.profile_lines),
+                })
@@ -0,0 +1,270 @@
+# web/server.py
+# Прод-запуск: конфіг валідується один раз у master, далі fork N воркерів uvicorn (copy-on-write).
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Dict, List, Optional
+
+log = logging.getLogger(__name__)
+
+# How long a worker may keep serving in-flight requests after SIGTERM.
+DEFAULT_GRACEFUL_TIMEOUT = 30
+
+
+def _env_int(name: str, default: int) -> int:
+    raw = os.environ.get(name, "")
+    return int(raw) if raw.strip() else default
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="main_server.py",
+        description="Production server: preloaded config, N forked uvicorn workers, graceful drain on SIGTERM.",
+    )
+    parser.add_argument("--host", default=os.environ.get("QUOTE_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=_env_int("QUOTE_PORT", 8000))
+    parser.add_argument("--workers", type=int, default=_env_int("QUOTE_WORKERS", os.cpu_count() or 1),
+                        help="worker processes (default: QUOTE_WORKERS or CPU count)")
+    parser.add_argument("--keep-alive", type=int, default=_env_int("QUOTE_KEEP_ALIVE", 5),
+                        help="seconds an idle keep-alive connection stays open")
+    parser.add_argument("--graceful-timeout", type=int, default=_env_int("QUOTE_GRACEFUL_TIMEOUT", DEFAULT_GRACEFUL_TIMEOUT),
+                        help="seconds to drain in-flight requests on SIGTERM")
+    parser.add_argument("--backlog", type=int, default=_env_int("QUOTE_BACKLOG", 2048))
+    parser.add_argument("--limit-concurrency", type=int, default=_env_int("QUOTE_LIMIT_CONCURRENCY", 0) or None,
+                        help="max concurrent connections per worker before 503 (default: unlimited)")
+    parser.add_argument("--config-poll", type=float,
+                        default=float(os.environ.get("QUOTE_CONFIG_POLL_SECONDS", "2")),
+                        help="seconds between trades.json checks in the master (0 = only on SIGHUP)")
+    parser.add_argument("--access-log", action="store_true", help="log every request (off by default)")
+    parser.add_argument("--log-level", default=os.environ.get("QUOTE_LOG_LEVEL", "info"))
+    return parser
+
+
+def bind_socket(host: str, port: int, backlog: int) -> socket.socket:
+    """Listening socket created once in the master and inherited by every worker."""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _uvicorn_config(app, args: argparse.Namespace):
+    import uvicorn
+
+    return uvicorn.Config(
+        app,
+        lifespan="on",
+        timeout_keep_alive=args.keep_alive,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        backlog=args.backlog,
+        limit_concurrency=args.limit_concurrency,
+        access_log=args.access_log,
+        log_level=args.log_level,
+    )
+
+
+# ---------- WORKER ----------
+
+def run_worker(sock: socket.socket, args: argparse.Namespace, slot: int) -> None:
+    """Worker body (in the forked child). Never returns."""
+    import uvicorn
+
+    from core.history import set_id_node
+    from web import api
+
+    # Unique quote ids across workers: the slot is the id node (see core.history).
+    set_id_node(slot)
+    # The master watches trades.json and sends SIGHUP after a validated change.
+    api.CONFIG_POLL_SECONDS = 0
+    # Every worker appends to the history datasets; only worker 0 compacts and
+    # indexes them, so maintenance commits never race each other.
+    api.HISTORY.maintain_on_write = api.OUTCOMES.maintain_on_write = slot == 0
+
+    server = uvicorn.Server(_uvicorn_config(api.app, args))
+
+    async def serve() -> None:
+        loop = asyncio.get_running_loop()
+
+        def on_hup() -> None:
+            loop.create_task(asyncio.to_thread(api.CONFIG.reload_if_changed))
+
+        loop.add_signal_handler(signal.SIGHUP, on_hup)
+        await server.serve(sockets=[sock])
+
+    code = 0
+    try:
+        asyncio.run(serve())
+    except BaseException:
+        log.exception("Worker %d crashed", os.getpid())
+        code = 1
+    finally:
+        logging.shutdown()
+        os._exit(code)
+
+
+# ---------- MASTER ----------
+
+class Master:
+    """
+    Preforking supervisor. Loads and validates the config, imports the app,
+    then forks workers that share those pages copy-on-write. Restarts workers
+    that die, polls trades.json and tells every worker to reload (SIGHUP) once
+    the new file has validated here. SIGTERM / SIGINT: forwarded to workers,
+    which stop accepting and drain in-flight requests.
+    """
+
+    def __init__(self, args: argparse.Namespace) -> None:
+        self.args = args
+        self.workers: Dict[int, float] = {}  # pid -> start time
+        self.slots: Dict[int, int] = {}  # pid -> worker number, kept by its replacement
+        self.sock: Optional[socket.socket] = None
+        self._stopping = False
+        self._reload_requested = False
+
+    def run(self) -> int:
+        # Fails fast (before binding) if trades.json is invalid.
+        from web import api
+
+        snapshot = api.CONFIG.snapshot
+        log.info("Config %s: version %s, %d trades", api.CONFIG.path, snapshot.version, len(snapshot.trades))
+
+        self.sock = bind_socket(self.args.host, self.args.port, self.args.backlog)
+        log.info("Listening on http://%s:%d with %d workers", self.args.host, self.args.port, self.args.workers)
+
+        # Objects created so far are never freed; keep the GC from touching
+        # (and so un-sharing) their pages in every worker.
+        gc.collect()
+        gc.freeze()
+
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+        signal.signal(signal.SIGHUP, self._on_hup)
+
+        for slot in range(self.args.workers):
+            self._spawn(slot)
+
+        next_poll = time.monotonic() + self.args.config_poll if self.args.config_poll > 0 else float("inf")
+        while not self._stopping:
+            self._reap(respawn=True)
+            if self._reload_requested or time.monotonic() >= next_poll:
+                self._reload_requested = False
+                self._propagate_reload(api.CONFIG)
+                if self.args.config_poll > 0:
+                    next_poll = time.monotonic() + self.args.config_poll
+            time.sleep(0.2)
+
+        self._drain()
+        self.sock.close()
+        return 0
+
+    def _spawn(self, slot: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            # Child: default signal dispositions; uvicorn installs its own for SIGTERM/SIGINT.
+            for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+                signal.signal(sig, signal.SIG_DFL)
+            run_worker(self.sock, self.args, slot)
+        self.workers[pid] = time.monotonic()
+        self.slots[pid] = slot
+        log.info("Started worker %d (#%d)", pid, slot)
+
+    def _reap(self, *, respawn: bool) -> None:
+        while self.workers:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self.workers.clear()
+                self.slots.clear()
+                return
+            if pid == 0:
+                return
+            started = self.workers.pop(pid, None)
+            slot = self.slots.pop(pid, None)
+            if started is None:
+                continue
+            if respawn and not self._stopping:
+                log.warning("Worker %d exited (status %d), restarting", pid, status)
+                if time.monotonic() - started < 1.0:
+                    time.sleep(1.0)  # crash loop: do not spin
+                self._spawn(slot)
+
+    def _propagate_reload(self, config) -> None:
+        try:
+            changed = config.reload_if_changed()
+        except Exception as e:  # reload_if_changed already logs invalid files
+            log.error("Config check failed: %s", e)
+            return
+        if changed:
+            log.info("Config version %s: reloading %d workers", config.snapshot.version, len(self.workers))
+            self._signal_workers(signal.SIGHUP)
+
+    def _signal_workers(self, sig: int) -> None:
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, sig)
+            except ProcessLookupError:
+                self.workers.pop(pid, None)
+
+    def _drain(self) -> None:
+        log.info("Shutting down: draining %d workers (up to %ds)", len(self.workers), self.args.graceful_timeout)
+        self._signal_workers(signal.SIGTERM)
+        deadline = time.monotonic() + self.args.graceful_timeout + 5
+        while self.workers and time.monotonic() < deadline:
+            self._reap(respawn=False)
+            time.sleep(0.1)
+        if self.workers:
+            log.warning("Killing %d workers that did not stop in time", len(self.workers))
+            self._signal_workers(signal.SIGKILL)
+            while self.workers:
+                self._reap(respawn=False)
+                time.sleep(0.05)
+
+    def _on_stop(self, signum, _frame) -> None:
+        self._stopping = True
+
+    def _on_hup(self, signum, _frame) -> None:
+        self._reload_requested = True
+
+
+def run_single(args: argparse.Namespace) -> int:
+    """One in-process worker (platforms without fork, or --workers 1)."""
+    import uvicorn
+
+    from core.history import set_id_node
+    from web import api
+
+    set_id_node(0)
+    sock = bind_socket(args.host, args.port, args.backlog)
+    uvicorn.Server(_uvicorn_config(api.app, args)).run(sockets=[sock])
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s [%(process)d] %(levelname)s %(name)s: %(message)s")
+    if args.workers < 1:
+        print("❌ --workers must be >= 1", file=sys.stderr)
+        return 2
+    from core.history import ID_NODES
+
+    if args.workers >= ID_NODES:  # one id node per worker; the last is for the CLI
+        print(f"❌ --workers must be <= {ID_NODES - 1}", file=sys.stderr)
+        return 2
+    # Env for modules imported below (web.api reads it at import).
+    os.environ["QUOTE_CONFIG_POLL_SECONDS"] = str(args.config_poll)
+
+    if args.workers == 1 or not hasattr(os, "fork"):
+        return run_single(args)
+    return Master(args).run()
@@ -0,0 +1,64 @@
+# web/tenancy.py
+# Вибір тенанта для запиту: заголовок X-Tenant-ID або префікс шляху /t/<id>/...; результат -> request.state.tenant.
+
+from __future__ import annotations
+
+import json
+from typing import Optional
+
+TENANT_HEADER = "x-tenant-id"
+PATH_PREFIX = "/t/"
+
+
+class TenantMiddleware:
+    """
+    Pure ASGI middleware (HTTP and WebSocket). `/t/acme/api/quote` is routed
+    as `/api/quote` (the prefix moves into root_path) with tenant "acme"; so
+    is `/api/quote` with the header `X-Tenant-ID: acme`. The tenant lands in
+    scope["state"]["tenant"] (request.state.tenant); None means the default
+    data/trades.json. `/t/acme` redirects to `/t/acme/` so the UI's relative
+    URLs resolve.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        tenant: Optional[str] = None
+        root_path = scope.get("root_path", "")
+        path = scope["path"][len(root_path):] if scope["path"].startswith(root_path) else scope["path"]
+        if path.startswith(PATH_PREFIX):
+            tenant, slash, _rest = path[len(PATH_PREFIX):].partition("/")
+            if not slash and scope["type"] == "http":
+                await _respond(send, 307, {"detail": "Redirect"}, location=root_path + path + "/")
+                return
+            # The prefix becomes part of root_path; routing sees the rest of the path.
+            scope = {**scope, "root_path": root_path + PATH_PREFIX + tenant}
+
+        for name, value in scope.get("headers", ()):
+            if name == TENANT_HEADER.encode():
+                header = value.decode("latin-1").strip()
+                if tenant is not None and header != tenant:
+                    if scope["type"] == "http":
+                        await _respond(send, 400, {"detail": "X-Tenant-ID does not match the /t/<tenant>/ path"})
+                    else:
+                        await send({"type": "websocket.close", "code": 1008})
+                    return
+                tenant = header or None
+                break
+
+        scope["state"] = {**scope.get("state", {}), "tenant": tenant}
+        await self.app(scope, receive, send)
+
+
+async def _respond(send, status: int, body: dict, *, location: Optional[str] = None) -> None:
+    content = json.dumps(body).encode()
+    headers = [(b"content-type", b"application/json"), (b"content-length", str(len(content)).encode())]
+    if location is not None:
+        headers.append((b"location", location.encode()))
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": content})